@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import time
+from utils.batch import *
+
+# Headless entry point: scores recorded videos without the Tk GUI.
+#   python analyze.py session.mp4 --gender female --out results
+#   python analyze.py sessions/ "archive/**/*.mp4" --workers 8 --threads 2
+#   python analyze.py session.mp4 --keyframe-budget 15 --keyframe-report
+
+def main():
+    parser = argparse.ArgumentParser(description="Score recorded exercise videos without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="Video files, directories or glob patterns")
+    parser.add_argument("--out", default="results", help="Directory for the per-rep CSVs and JSON summaries")
+    parser.add_argument("--gender", choices=["male", "female"], default="male")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=1)
+    parser.add_argument("--thresholds", default="txt//thresholds.json")
+    parser.add_argument("--render", action="store_true", help="Also write an annotated video next to the results")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV/MediaPipe threads per worker")
+    parser.add_argument("--cache-dir", default="cache//landmarks", help="Landmark cache location")
+    parser.add_argument("--no-cache", action="store_true", help="Always run pose estimation and leave the cache untouched")
+    parser.add_argument("--keyframe-budget", type=float, default=None, metavar="MS",
+                        help="Run pose only on keyframes so that it fits this per-frame budget, propagating landmarks in between")
+    parser.add_argument("--max-stride", type=int, default=4, help="Longest run of propagated frames between keyframes")
+    parser.add_argument("--keyframe-report", action="store_true", help="Compare keyframe against full-rate rep counts for each video")
+    args = parser.parse_args()
+
+    reference_data = load_thresholds(args.thresholds)
+    cache_dir = None if args.no_cache else args.cache_dir
+    videos = find_videos(args.inputs)
+    if not videos:
+        parser.error("no video files found")
+
+    keyframes = {"budget_ms": args.keyframe_budget, "max_stride": args.max_stride} if args.keyframe_budget or args.keyframe_report else None
+
+    if args.keyframe_report:
+        reports = [keyframe_divergence(video, reference_data, args.out, args.gender, args.model_complexity, keyframes) for video in videos]
+        os.makedirs(args.out, exist_ok=True)
+        with open(os.path.join(args.out, "keyframe_report.json"), "w") as f:
+            json.dump(reports, f, indent=2)
+        for report in reports:
+            print(f"{report['video']}: {report['keyframes']['keyframe_ratio']:.0%} of frames inferred "
+                  f"({report['full_rate']['processing_fps']} -> {report['keyframes']['processing_fps']} fps), "
+                  f"rep count divergence {report['divergence']}")
+        return
+
+    if len(videos) == 1:
+        summary = score_video(videos[0], reference_data, args.out, args.gender, args.model_complexity, args.render, cache_dir, keyframes)
+        print(f"{summary['video']}: {summary['frames']} frames in {summary['processing_seconds']}s "
+              f"({summary['processing_fps']} fps), correct reps {summary['correct_reps']}, raw reps {summary['raw_reps']}")
+        return
+
+    os.makedirs(args.out, exist_ok=True)
+    started = time.perf_counter()
+    summaries = []
+    for summary in score_videos(videos, reference_data, args.out, args.gender, args.model_complexity, args.render, args.workers, args.threads, cache_dir, keyframes):
+        summaries.append(summary)
+        if "error" in summary:
+            print(f"[{len(summaries)}/{len(videos)}] {summary['video']}: FAILED ({summary['error']})")
+        else:
+            print(f"[{len(summaries)}/{len(videos)}] {summary['video']}: {summary['processing_fps']} fps, "
+                  f"correct reps {summary['correct_reps']}, raw reps {summary['raw_reps']}")
+
+    report = write_batch_report(summaries, args.out)
+    print(f"Scored {report['videos'] - len(report['failed'])}/{report['videos']} videos in {time.perf_counter() - started:.1f}s, "
+          f"correct reps {report['correct_reps']}, raw reps {report['raw_reps']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from utils.benchmarks import *
+from utils.thresholds import load_threshold_model
+
+# Performance-regression check for the scoring core; no camera or GPU needed.
+#   python benchmark.py                    # compare against benchmarks/baseline.json
+#   python benchmark.py --update-baseline  # after an intended change, on the reference machine
+#   python benchmark.py --filter [--filter-labels labels.json]  # landmark filter accuracy report only
+# Exits non-zero when a rate drops more than the threshold below the baseline, or when any
+# scenario's rep counts or scores differ from the baseline at all.
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the feature, feedback, counting and scoring code.")
+    parser.add_argument("--baseline", default="benchmarks//baseline.json")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=None, help="Allowed slowdown as a fraction (default: the baseline's, else 0.3)")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed runs per benchmark; the fastest counts")
+    parser.add_argument("--thresholds", default="txt//thresholds.json")
+    parser.add_argument("--clips", default="benchmarks//clips", help="Directory of short videos for the end-to-end pass")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=1)
+    parser.add_argument("--no-e2e", action="store_true", help="Skip pose estimation on the bundled clips")
+    parser.add_argument("--filter", action="store_true", help="Report rep-count error with and without the landmark filter instead")
+    parser.add_argument("--filter-labels", default=None, help="Labelled clips (tune.py format): compare complexity 0 + filter against complexity 1")
+    parser.add_argument("--cache-dir", default="cache//landmarks")
+    args = parser.parse_args()
+
+    thresholds = load_threshold_model(args.thresholds)
+    if args.filter or args.filter_labels:
+        print("Synthetic sessions, summed rep-count error (unfiltered -> filtered):")
+        for name, errors in run_filter_accuracy(thresholds).items():
+            print(f"  {name:<12} {errors['unfiltered']:>4} -> {errors['filtered']:>4}")
+        if args.filter_labels:
+            print("Labelled clips, rep-count error:")
+            for video, row in compare_models_on_clips(args.filter_labels, thresholds, args.cache_dir).items():
+                print(f"  {video:<28} " + "  ".join(f"{name} {error}" for name, error in row.items()))
+        return
+    scenarios = build_scenarios()
+    outputs = scenario_outputs(scenarios, thresholds)
+    problems = check_expected(scenarios, outputs)
+    for problem in problems:
+        print(f"❌ {problem}")
+
+    rates = run_micro(scenarios, thresholds, args.repeat)
+    clips = [] if args.no_e2e else sorted(glob.glob(os.path.join(args.clips, "*.mp4")) + glob.glob(os.path.join(args.clips, "*.avi")))
+    for clip in clips:
+        name = f"e2e/{os.path.basename(clip)}"
+        rates[name], outputs[name] = run_end_to_end(clip, thresholds, args.model_complexity)
+    if not clips and not args.no_e2e:
+        print(f"No clips in {args.clips}, skipping the end-to-end pass.")
+
+    results = {"machine": machine_info(), "rates": rates, "outputs": outputs}
+    for name, rate in rates.items():
+        print(f"{name:<28} {rate:>12,.0f}/s")
+
+    if args.update_baseline:
+        results["threshold"] = args.threshold if args.threshold is not None else 0.3
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline written to {args.baseline}")
+        sys.exit(1 if problems else 0)
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        sys.exit(1 if problems else 0)
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    threshold = args.threshold if args.threshold is not None else baseline.get("threshold", 0.3)
+    if baseline.get("machine") != results["machine"]:
+        print("Note: baseline was recorded on a different machine, rates are not directly comparable.")
+    regressions, mismatches = compare(results, baseline, threshold)
+    for regression in regressions:
+        print(f"❌ Slower than baseline: {regression}")
+    for name in mismatches:
+        print(f"❌ Output changed: {name} (rep counts or scores differ from the baseline)")
+    if problems or regressions or mismatches:
+        sys.exit(1)
+    print(f"✅ Outputs identical to the baseline, no stage more than {threshold:.0%} slower")
+
+if __name__ == "__main__":
+    main()
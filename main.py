@@ -1,41 +1,126 @@
+import time
+STARTED = time.perf_counter()
+import os
 import tkinter as tk
-import cv2
-import mediapipe as mp
-import json
-from utils.utils import *
-from utils.repetition import *
-from utils.functions import *
-from utils.gui import *
+from utils.startup import StartupTimer, Deferred
+from utils.utils import Logger, setup_directories, run_main_loop
+from utils.repetition import RepetitionCounter
+from utils.exercises import new_counters
+from utils.thresholds import ThresholdStore
+from utils.profiler import StageProfiler
+from utils.landmark_cache import LandmarkCache
+from utils.recorder import Recorder
+from utils.gui import GUI
 
 # Setup
+timer = StartupTimer(STARTED)
+timer.mark("imports")
 setup_directories()
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(static_image_mode=False, model_complexity=1, enable_segmentation=False, min_detection_confidence=0.5)
-counter = RepetitionCounter()
+MODEL_COMPLEXITY = 1
+POSE_OPTIONS = dict(static_image_mode=False, enable_segmentation=False, min_detection_confidence=0.5)
+# STRAPS_POSE_BUDGET_MS=30 times model_complexity 0/1/2 at startup, keeps the heaviest whose p90 fits 30 ms per frame,
+# and steps down at runtime if pose latency stays over budget (decisions go to logs/model_selection.jsonl)
+POSE_BUDGET_MS = float(os.environ.get("STRAPS_POSE_BUDGET_MS", 0))
+# STRAPS_SCORE_SPILL=1 appends every rep's full scores to logs/scores_<timestamp>.jsonl; in memory only
+# the running session aggregates and the last 100 reps are kept
+SCORE_SPILL = f"logs//scores_{time.strftime('%Y%m%d_%H%M%S')}.jsonl" if os.environ.get("STRAPS_SCORE_SPILL") == "1" else None
+
+# mediapipe takes about a second to import and the first pose.process initialises the graph, so both
+# happen on background threads while the welcome popup is up. The proxies block only if used earlier.
+# Modules behind a STRAPS_* switch are imported only when it is set.
+def import_mediapipe():
+    import mediapipe as mp
+    timer.mark("mediapipe imported")
+    return mp.solutions.pose
+
+def build_pose():
+    global MODEL_COMPLEXITY
+    from utils.complexity import calibrate_complexity, calibration_frames, AdaptivePose
+    if POSE_BUDGET_MS:
+        MODEL_COMPLEXITY, _ = calibrate_complexity(mp_pose.get(), POSE_BUDGET_MS, **POSE_OPTIONS)
+        pose = AdaptivePose(mp_pose.get(), MODEL_COMPLEXITY, POSE_BUDGET_MS, **POSE_OPTIONS)
+    else:
+        pose = mp_pose.Pose(model_complexity=MODEL_COMPLEXITY, **POSE_OPTIONS)
+    for frame in calibration_frames():
+        pose.process(frame)
+    timer.mark("pose warm")
+    return pose
+
+def build_landmark_cache():
+    pose.get()  # the chosen model complexity is part of the cache key
+    return LandmarkCache(model_complexity=MODEL_COMPLEXITY)
+
+mp_pose = Deferred(import_mediapipe, "mediapipe-import")
+pose = Deferred(build_pose, "pose-warmup")
+landmark_cache = Deferred(build_landmark_cache, "landmark-cache")
+counter = RepetitionCounter(spill_path=SCORE_SPILL)
 logger = Logger()
 recorder = Recorder()
+# STRAPS_PROFILE=1 times every pipeline stage, overlays p50/p95/p99 and saves a Chrome trace on exit
+PROFILE = os.environ.get("STRAPS_PROFILE") == "1"
+# STRAPS_TELEMETRY=1 writes one record per frame (angles, stages, phases, stage timings) to logs/telemetry/
+TELEMETRY = os.environ.get("STRAPS_TELEMETRY") == "1"
+profiler = StageProfiler(enabled=PROFILE or TELEMETRY, overlay=PROFILE)
+telemetry = None
+if TELEMETRY:
+    from utils.telemetry import TelemetryWriter
+    telemetry = TelemetryWriter().start()
+# STRAPS_KEYFRAME_BUDGET_MS=15 runs pose only as often as fits 15 ms per frame and tracks landmarks in between
+KEYFRAME_BUDGET_MS = float(os.environ.get("STRAPS_KEYFRAME_BUDGET_MS", 0))
+keyframes = None
+if KEYFRAME_BUDGET_MS:
+    from utils.keyframes import KeyframeEstimator
+    keyframes = KeyframeEstimator(pose, budget_ms=KEYFRAME_BUDGET_MS, profiler=profiler)
+# STRAPS_LANDMARK_FILTER=1 smooths landmarks with the One-Euro filter configured under "landmark_filter" in thresholds.json
+landmark_filter = None
+if os.environ.get("STRAPS_LANDMARK_FILTER") == "1":
+    from utils.smoothing import LandmarkFilter
+    landmark_filter = LandmarkFilter()
+# STRAPS_SESSION_FILE=1 also saves recordings as compact landmark files (recordings/session_<timestamp>.straps);
+# STRAPS_SESSION_THUMBNAILS=2 adds a small JPEG every 2 seconds
+session_file = None
+if os.environ.get("STRAPS_SESSION_FILE") == "1":
+    from utils.session_file import SessionWriter
+    session_file = SessionWriter(thumbnail_interval=float(os.environ.get("STRAPS_SESSION_THUMBNAILS", 0)))
 
 # Define video source constants but do not initialize VideoCapture here
 IP_ADDRESS = "192.168.1.141"
 WEBCAM_URL = f"http://{IP_ADDRESS}:4747/mjpegfeed?640x480"
 DEFAULT_WEBCAM = 0  # Use 0 for the default built-in webcam
 
-# Load thresholds
-with open("txt//thresholds.json", "r") as f:
-    reference_data = json.load(f)
+# Load thresholds (reloaded automatically when the file changes)
+thresholds = ThresholdStore("txt//thresholds.json")
 
-exercise_counters = {"hammer_curl": 0, "overhead_press": 0}
+exercise_counters = new_counters()
 
-# Launch GUI
+# Launch GUI (returns once the welcome popup is closed)
 root = tk.Tk()
+timer.mark("window")
 gui = GUI(root, exercise_counters, counter)
+timer.mark("welcome closed")
+
+def on_analysis(analysis):
+    timer.mark("first frame")
+    if analysis.rep_summary and "first rep" not in timer.marks:
+        timer.mark("first rep")
+        timer.report()
 
 # Pass webcam source info to the main loop; it will handle the source switching
-run_main_loop(gui, pose, mp_pose, counter, logger, recorder, reference_data, exercise_counters, WEBCAM_URL, DEFAULT_WEBCAM)
+run_main_loop(gui, pose, mp_pose, counter, logger, recorder, thresholds, exercise_counters, WEBCAM_URL, DEFAULT_WEBCAM, landmark_cache, profiler, telemetry, keyframes, on_analysis, landmark_filter, session_file)
 
 try:
     root.mainloop()
 finally:
-    logger.stop()
+    if "first rep" not in timer.marks: timer.report()
+    logger.stop(counter.session)
+    counter.session.close()
     recorder.stop()
-    cv2.destroyAllWindows()
\ No newline at end of file
+    if session_file: session_file.stop()
+    # Stopped recordings finish in the background; wait for them before exiting.
+    recorder.join()
+    if session_file: session_file.join()
+    if telemetry: telemetry.stop()
+    if keyframes: print(f"Keyframe inference: {keyframes.stats()}")
+    if PROFILE:
+        print("\n".join(profiler.summary_lines()))
+        profiler.dump_chrome_trace(f"logs//trace_{time.strftime('%Y%m%d_%H%M%S')}.json")
\ No newline at end of file
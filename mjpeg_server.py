@@ -0,0 +1,32 @@
+import argparse
+import time
+from utils.mjpeg import MJPEGServer
+
+# Local stand-in for the DroidCam MJPEG stream, to run the app and the stream source without a phone:
+#   python mjpeg_server.py --port 4747 [--video clip.mp4 | --video phone.mjpeg (a recorded stream, replayed as is)]
+#   python serve.py --webcam http://127.0.0.1:4747/mjpegfeed
+# Ctrl+C stops it; start it again to watch the app reconnect.
+
+parser = argparse.ArgumentParser(description="Serve a video file or a test pattern as an MJPEG stream")
+parser.add_argument("--video", default=None, help="Video file or recorded .mjpeg stream to loop (default: a numbered test pattern)")
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=4747)
+parser.add_argument("--fps", type=float, default=30.0)
+parser.add_argument("--size", default="640x480", help="WIDTHxHEIGHT")
+parser.add_argument("--quality", type=int, default=80, help="JPEG quality")
+
+def main():
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    server = MJPEGServer(args.video, args.host, args.port, args.fps, (width, height), args.quality).start()
+    print(f"✅ MJPEG stream on {server.url}")
+    try:
+        while True: time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"✅ MJPEG server stopped ({server.frames_sent} frames sent)")
+
+if __name__ == "__main__":
+    main()
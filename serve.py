@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import signal
+import mediapipe as mp
+from utils.utils import Logger, setup_directories, run_main_loop
+from utils.repetition import RepetitionCounter
+from utils.exercises import new_counters
+from utils.thresholds import ThresholdStore
+from utils.landmark_cache import LandmarkCache
+from utils.recorder import Recorder
+from utils.session_file import SessionWriter
+from utils.smoothing import LandmarkFilter
+from utils.complexity import calibrate_complexity, AdaptivePose
+from utils.replay import SPEEDS
+from utils.service import ServiceFrontEnd, ServiceServer
+
+# Headless service mode: the same engine as main.py, controlled and watched over HTTP.
+#   python serve.py --port 8765
+#   curl -X POST "localhost:8765/start?video=session.mp4"
+#   curl -X POST "localhost:8765/start?video=recordings/session_x.straps"; curl -X POST "localhost:8765/replay?paused=1&step=1"
+#   open http://localhost:8765/ (stream + events), or GET /stream.mjpg and ws://localhost:8765/events
+
+async def serve(args):
+    setup_directories()
+    mp_pose = mp.solutions.pose
+    pose_options = dict(static_image_mode=False, enable_segmentation=False, min_detection_confidence=0.5)
+    if args.pose_budget:
+        args.model_complexity, _ = calibrate_complexity(mp_pose, args.pose_budget, **pose_options)
+        pose = AdaptivePose(mp_pose, args.model_complexity, args.pose_budget, **pose_options)
+    else:
+        pose = mp_pose.Pose(model_complexity=args.model_complexity, **pose_options)
+    counter = RepetitionCounter(spill_path=args.score_spill)
+    logger = Logger()
+    recorder = Recorder()
+    landmark_cache = LandmarkCache(model_complexity=args.model_complexity)
+    thresholds = ThresholdStore(args.thresholds)
+    session_file = SessionWriter(thumbnail_interval=args.thumbnails) if args.session_file else None
+    exercise_counters = new_counters()
+
+    loop = asyncio.get_running_loop()
+    front = ServiceFrontEnd(loop, exercise_counters, counter, gender=args.gender)
+    front.is_logging = args.log
+    server = await ServiceServer(front, port=args.port).start()
+    pipeline_idle = run_main_loop(front, pose, mp_pose, counter, logger, recorder, thresholds, exercise_counters, args.webcam, args.default_webcam,
+                  landmark_cache, on_analysis=front.on_analysis, landmark_filter=LandmarkFilter() if args.landmark_filter else None,
+                  session_file=session_file)
+    front.replay.speed = args.replay_speed
+    if args.video:
+        front.video_path, front.source_type = args.video, 'replay' if args.video.endswith(".straps") else 'video'
+        front.toggle()
+
+    stopped = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+    try:
+        await stopped.wait()
+    finally:
+        if front.is_running: front.toggle()
+        for _ in range(200):  # let the loop tear the pipeline down (at most 2 s)
+            if pipeline_idle(): break
+            await asyncio.sleep(0.01)
+        await server.close()
+        logger.stop(counter.session)
+        counter.session.close()
+        recorder.stop()
+        if session_file: session_file.stop()
+        # Stopped recordings finish in the background; wait for them before exiting.
+        recorder.join()
+        if session_file: session_file.join()
+        pose.close()
+        print(f"✅ Service stopped ({front.frames_encoded} frames encoded, counters {exercise_counters})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the trainer headless with an HTTP/WebSocket front end on localhost.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--gender", choices=["male", "female"], default="male")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=1)
+    parser.add_argument("--pose-budget", type=float, default=None, metavar="MS",
+                        help="Pick the heaviest model_complexity whose pose latency fits this budget and step down at runtime if it stops fitting")
+    parser.add_argument("--landmark-filter", action="store_true", help="Smooth landmarks with the One-Euro filter from thresholds.json")
+    parser.add_argument("--thresholds", default="txt//thresholds.json")
+    parser.add_argument("--webcam", default=0, help="Camera index or stream URL")
+    parser.add_argument("--default-webcam", type=int, default=0, help="Fallback camera index")
+    parser.add_argument("--video", default=None, help="Start right away on this video file or .straps session file")
+    parser.add_argument("--replay-speed", type=float, choices=SPEEDS, default=1.0, help="Session file replay speed (0: as fast as possible)")
+    parser.add_argument("--log", action="store_true", help="Log reps to CSV and record the session, like Start Record")
+    parser.add_argument("--session-file", action="store_true", help="While logging, also write a compact landmark session file")
+    parser.add_argument("--thumbnails", type=float, default=0.0, metavar="SECONDS", help="Thumbnail interval in the session file (0: none)")
+    parser.add_argument("--score-spill", default=None, metavar="PATH", help="Append every rep's full scores to this JSON-lines file")
+    args = parser.parse_args()
+    if isinstance(args.webcam, str) and args.webcam.isdigit(): args.webcam = int(args.webcam)
+    asyncio.run(serve(args))
+
+if __name__ == "__main__":
+    main()
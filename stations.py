@@ -0,0 +1,82 @@
+import argparse
+import datetime
+import json
+import os
+import time
+import cv2
+from utils.stations import *
+
+# Several cameras and athletes on one host, each with its own counter, gender thresholds and log.
+#   python stations.py 0 1 rtsp://cam3/stream --workers 3
+#   python stations.py stations.json --headless --out results
+#   python stations.py a.mp4 b.mp4 c.mp4 d.mp4 --loop --grid-video grid.avi
+# stations.json: [{"name": "rack1", "source": "0", "gender": "female"}, ...]
+
+def main():
+    parser = argparse.ArgumentParser(description="Count and score reps for several camera stations at once.")
+    parser.add_argument("stations", nargs="+", help="Camera indices, video files, stream URLs or a stations .json file")
+    parser.add_argument("--gender", choices=["male", "female"], default="male", help="Gender for stations that do not set one")
+    parser.add_argument("--workers", type=int, default=None, help="Inference processes (default: one per station, at most one per core)")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV/MediaPipe threads per worker")
+    parser.add_argument("--no-affinity", action="store_true", help="Do not pin workers to CPU cores")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=1)
+    parser.add_argument("--thresholds", default="txt//thresholds.json")
+    parser.add_argument("--out", default="results", help="Directory for per-station rep CSVs and the session summary")
+    parser.add_argument("--loop", action="store_true", help="Restart video files when they end")
+    parser.add_argument("--headless", action="store_true", help="No window; print reps and a status line instead")
+    parser.add_argument("--grid-video", default=None, help="Also write the grid view to this video file")
+    parser.add_argument("--tile", default="320x240", help="Grid tile size WxH")
+    args = parser.parse_args()
+
+    stations = load_station_config(args.stations, args.gender)
+    tile_size = tuple(int(v) for v in args.tile.lower().split("x"))
+    show = not args.headless
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    log_dir = os.path.join(args.out, f"stations_{timestamp}")
+    engine = StationEngine(stations, args.workers, args.threads, model_complexity=args.model_complexity, thresholds_path=args.thresholds,
+                           log_dir=log_dir, loop_files=args.loop, affinity=not args.no_affinity,
+                           tile_size=tile_size if show or args.grid_video else None)
+    print(f"✅ {len(engine.stations)} stations on {engine.workers} workers ({args.threads} threads each)")
+
+    writer = None
+    started = time.perf_counter()
+    next_status = started + 5.0
+    engine.start()
+    try:
+        while not engine.done:
+            for st, analysis in engine.poll():
+                if analysis.rep_summary:
+                    scores = analysis.rep_summary.get('scores', {})
+                    print(f"[{st.name}] {analysis.current_exercise} rep {analysis.raw_reps} "
+                          f"({'correct' if analysis.completed else 'incorrect'}) {analysis.rep_summary.get('feedback', '')} "
+                          f"hull {scores.get('Hull Score', '-')} wrist {scores.get('Wrist Distance Score', '-')}")
+            if show or args.grid_video:
+                grid = render_grid(engine.stations, tile_size)
+                if args.grid_video:
+                    if writer is None:
+                        writer = cv2.VideoWriter(args.grid_video, cv2.VideoWriter_fourcc(*"MJPG"), 20.0, grid.shape[1::-1])
+                    writer.write(grid)
+                if show:
+                    cv2.imshow("Stations", grid)
+                    if cv2.waitKey(1) & 0xFF in (27, ord('q')): break
+            if args.headless and time.perf_counter() > next_status:
+                next_status += 5.0
+                print("  ".join(f"{st.name}: {st.processed} frames, {st.inference_ms:.0f} ms, {st.dropped} dropped" for st in engine.stations))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        if writer: writer.release()
+        if show: cv2.destroyAllWindows()
+
+    elapsed = time.perf_counter() - started
+    summary = {"elapsed": round(elapsed, 2), "workers": engine.workers, "threads": args.threads, "stations": engine.summary()}
+    with open(os.path.join(log_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    for st in summary["stations"]:
+        print(f"{st['name']}: {st['frames_processed']}/{st['frames_captured']} frames ({st['frames_processed'] / elapsed:.1f} fps), "
+              f"{st['frames_dropped']} dropped, correct reps {st['correct_reps']}")
+    print(f"✅ Summary written to {log_dir}")
+
+if __name__ == "__main__":
+    main()
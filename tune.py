@@ -0,0 +1,63 @@
+import argparse
+import os
+import copy
+import json
+import time
+from utils.batch import load_thresholds
+from utils.tuner import *
+
+# Grid/random search over thresholds.json against labelled clips.
+#   python tune.py labels.json space.json --samples 5000 --write-best txt//thresholds_tuned.json
+#
+# space.json maps dotted threshold paths to candidate values, e.g.
+#   {"global_config.bad_frame_tolerance": [3, 5, 7],
+#    "hammer_curl.male.wrist_distance": [[0.1, 0.25], [0.12, 0.3]]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune thresholds.json by replaying cached landmarks.")
+    parser.add_argument("labels", help="JSON mapping clip paths to their gender and true rep counts")
+    parser.add_argument("space", help="JSON mapping dotted threshold paths to candidate values")
+    parser.add_argument("--thresholds", default="txt//thresholds.json", help="Base config the candidates modify")
+    parser.add_argument("--samples", type=int, default=None, help="Random-search this many candidates instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--target", choices=["correct", "raw"], default="correct", help="Which rep count the labels refer to")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=1)
+    parser.add_argument("--cache-dir", default="cache//landmarks")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--out", default="results//tuning_results.json")
+    parser.add_argument("--write-best", default=None, help="Write the best config as a full thresholds file")
+    args = parser.parse_args()
+
+    base_config = load_thresholds(args.thresholds)
+    with open(args.space, "r") as f:
+        space = json.load(f)
+
+    clips = {}
+    for video, info in load_labels(args.labels).items():
+        landmarks = load_clip_landmarks(video, args.cache_dir, args.model_complexity)
+        clips[video] = (precompute_clip(landmarks), info["gender"], info["reps"])
+
+    baseline_error, _ = evaluate_config(clips, base_config, args.target)
+    started = time.perf_counter()
+    results = tune(clips, base_config, space, args.samples, args.workers, args.target, args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"Evaluated {len(results)} configs on {len(clips)} clips in {elapsed:.1f}s "
+          f"({len(results) / elapsed * 60:.0f} configs/min). Current thresholds: error {baseline_error}")
+    for rank, result in enumerate(results[:args.top], 1):
+        print(f"{rank:3d}. error {result['error']}: {json.dumps(result['params'])}")
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump({"baseline_error": baseline_error, "results": results[:max(args.top, 1) * 10]}, f, indent=2)
+
+    if args.write_best and results:
+        best = copy.deepcopy(base_config)
+        for path, value in results[0]["params"].items():
+            set_path(best, path, value)
+        with open(args.write_best, "w") as f:
+            json.dump(best, f, indent=2)
+        print(f"Best config written to {args.write_best}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from utils.functions import *
+from utils.feedback import *
+from utils.features import *
+from utils.profiler import NULL_PROFILER
+
+class FrameAnalysis:
+    """Everything the renderer and loggers need to know about one processed frame."""
+    __slots__ = ("landmarks", "current_exercise", "stage_r", "stage_l", "raw_reps",
+                 "completed", "rep_summary", "feedback_lines", "static_feedback", "violations", "keypoints",
+                 "dynamic_angles", "joint_angles", "wrist_dist", "hull_area")
+
+    def __init__(self, landmarks=None):
+        self.landmarks = landmarks
+        self.current_exercise = "-"
+        self.stage_r = "-"
+        self.stage_l = "-"
+        self.raw_reps = 0
+        self.completed = False
+        self.rep_summary = {}
+        self.feedback_lines = []
+        self.static_feedback = {}
+        self.violations = []
+        self.keypoints = {}
+        self.dynamic_angles = None
+        self.joint_angles = None
+        self.wrist_dist = None
+        self.hull_area = None
+
+def analyze_frame(image, pose, counter, thresholds, gender, frame_time, profiler=NULL_PROFILER, landmark_filter=None):
+    """Runs pose estimation, feature math, feedback and rep counting on a resized BGR frame."""
+    with profiler.stage("color"):
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    with profiler.stage("pose"):
+        results = pose.process(rgb)
+    landmarks = landmarks_to_array(results.pose_landmarks) if results.pose_landmarks else None
+    return analyze_landmarks(landmarks, counter, thresholds, gender, frame_time, profiler, landmark_filter)
+
+def analyze_landmarks(landmarks, counter, thresholds, gender, frame_time, profiler=NULL_PROFILER, landmark_filter=None):
+    """Feature math, feedback and rep counting for a (33, 4) landmark array (None or NaN: no pose).
+    `thresholds` is a compiled ThresholdModel. A LandmarkFilter, if given, smooths the landmarks
+    first with the parameters of the exercise being counted."""
+    if landmarks is not None and np.isnan(landmarks[0, 0]): landmarks = None
+    if landmark_filter is not None:
+        with profiler.stage("filter"):
+            landmarks = landmark_filter(landmarks, frame_time, thresholds.filter_params(counter.current_exercise))
+    analysis = FrameAnalysis(landmarks)
+    if landmarks is None:
+        return analysis
+
+    with profiler.stage("features"):
+        joint_angles, dynamic_angles, wrist_dist, hull_area = frame_features(landmarks)
+    counter.update_angles(*dynamic_angles)
+    current_exercise = counter.detect_exercise(thresholds)
+
+    exercise_thresholds = thresholds.exercises.get(current_exercise)
+    gender_thresholds = exercise_thresholds.genders.get(gender) if exercise_thresholds else None
+    static_tolerance = thresholds.global_config.static_angle_tolerance
+
+    with profiler.stage("feedback"):
+        feedback_lines = generate_feedback(current_exercise, dynamic_angles, gender_thresholds, joint_angles, wrist_dist, hull_area, static_tolerance)
+        visual_dynamic, log_dynamic = get_dynamic_feedback_lines(exercise_thresholds, dynamic_angles)
+        violations = check_dynamic_angle_violations(exercise_thresholds, dynamic_angles)
+
+    feedback_text_list = [item[0] if isinstance(item, tuple) else item for item in feedback_lines] + log_dynamic
+
+    with profiler.stage("counting"):
+        stage_r, stage_l, completed, rep_summary = counter.count_repetitions(dynamic_angles, wrist_dist, hull_area, thresholds, gender_thresholds, joint_angles, feedback_text_list, frame_time)
+
+    insert_idx = next((i + 1 for i, item in enumerate(feedback_lines) if "Wrist Distance" in (item[0] if isinstance(item, tuple) else item)), len(feedback_lines))
+    feedback_lines[insert_idx:insert_idx] = visual_dynamic
+
+    analysis.dynamic_angles, analysis.joint_angles = dynamic_angles, joint_angles
+    analysis.wrist_dist, analysis.hull_area = wrist_dist, hull_area
+    analysis.current_exercise = current_exercise
+    analysis.stage_r, analysis.stage_l = stage_r, stage_l
+    analysis.raw_reps = counter.get_raw_reps(current_exercise)
+    analysis.completed = completed
+    analysis.rep_summary = rep_summary
+    analysis.feedback_lines = feedback_lines
+    analysis.violations = violations
+    if exercise_thresholds:
+        analysis.keypoints = exercise_thresholds.keypoints
+    if gender_thresholds:
+        analysis.static_feedback = check_static_angles(joint_angles, gender_thresholds.static_angles, static_tolerance)
+    return analysis
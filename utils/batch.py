@@ -0,0 +1,246 @@
+import os
+import csv
+import glob
+import json
+import time
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+import numpy as np
+import mediapipe as mp
+from utils.utils import Logger, render_frame
+from utils.panel import FeedbackPanel
+from utils.analysis import analyze_frame, analyze_landmarks
+from utils.keyframes import KeyframeEstimator
+from utils.landmark_cache import LandmarkCache
+from utils.thresholds import compile_thresholds
+from utils.repetition import RepetitionCounter
+from utils.exercises import new_counters
+
+# Headless scoring of recorded videos. Nothing here may import tkinter or PIL.
+
+PROCESS_SIZE = (640, 480)
+VIDEO_EXTENSIONS = (".avi", ".mp4", ".mov", ".mkv")
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS")
+
+def load_thresholds(path="txt//thresholds.json"):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _decoded_frames(cap):
+    while True:
+        ret, frame = cap.read()
+        if not ret: return
+        yield cv2.resize(frame, PROCESS_SIZE)
+
+def score_video(video_path, reference_data, output_dir, gender="male", model_complexity=1, render=False, cache_dir="cache//landmarks", keyframes=None):
+    """Runs one video through the same pose -> features -> counter -> score chain as the GUI,
+    as fast as the machine allows. Writes `<name>_reps.csv` (Logger schema) and
+    `<name>_summary.json` into `output_dir` and returns the summary dict.
+
+    With a `cache_dir`, landmarks are read from the LandmarkCache when this exact video was
+    already processed at the same model complexity, and stored there after a full pass otherwise.
+
+    `keyframes` (KeyframeEstimator keyword arguments, e.g. {"budget_ms": 15}) runs pose only on
+    keyframes; the cache is bypassed then, since it must hold full-rate landmarks.
+    """
+    thresholds = compile_thresholds(reference_data)
+    if keyframes is not None: cache_dir = None
+    cache = LandmarkCache(cache_dir, model_complexity, PROCESS_SIZE) if cache_dir else None
+    cache_key = cache.key(video_path) if cache else None
+    cached = cache.load(cache_key) if cache else None
+    cache_writer = cache.writer(cache_key) if cache and cached is None else None
+
+    cap = None
+    fps = 30.0
+    if cached is None or render:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError(f"Error opening video: {video_path}")
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if not 1.0 <= fps <= 240.0: fps = 30.0
+    elif len(cached[1]) > 1:
+        fps = (len(cached[1]) - 1) / (cached[1][-1] - cached[1][0])
+
+    os.makedirs(output_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    csv_path = os.path.join(output_dir, f"{name}_reps.csv")
+    summary_path = os.path.join(output_dir, f"{name}_summary.json")
+
+    mp_pose = mp.solutions.pose
+    pose = None
+    if cached is None:
+        pose = mp_pose.Pose(static_image_mode=False, model_complexity=model_complexity, enable_segmentation=False, min_detection_confidence=0.5)
+    estimator = KeyframeEstimator(pose, target_fps=fps, **keyframes) if keyframes is not None else None
+    counter = RepetitionCounter()
+    logger = Logger()
+    logger.start(csv_path)
+    exercise_counters = new_counters()
+    writer = None
+    panel = FeedbackPanel()
+    if render:
+        writer = cv2.VideoWriter(os.path.join(output_dir, f"{name}_annotated.avi"), cv2.VideoWriter_fourcc(*'MJPG'), fps, (PROCESS_SIZE[0] * 2, PROCESS_SIZE[1]))
+
+    if cached is not None:
+        images = _decoded_frames(cap) if render else itertools.repeat(None)
+        source = zip(cached[0], images)
+    else:
+        source = ((None, image) for image in _decoded_frames(cap))
+
+    frames = frames_with_pose = 0
+    reps = []
+    last_rep_score = {}
+    started = time.perf_counter()
+    last_frame_start = None
+    try:
+        for landmarks, image in source:
+            frame_start = time.perf_counter()
+            frame_time = frame_start - last_frame_start if last_frame_start is not None else 1.0 / fps
+            last_frame_start = frame_start
+            if cached is not None:
+                analysis = analyze_landmarks(landmarks, counter, thresholds, gender, frame_time)
+            elif estimator:
+                analysis = analyze_landmarks(estimator.estimate(image, counter, thresholds), counter, thresholds, gender, frame_time)
+            else:
+                analysis = analyze_frame(image, pose, counter, thresholds, gender, frame_time)
+                if cache_writer: cache_writer.append(analysis.landmarks, frames / fps)
+            frames += 1
+
+            if analysis.landmarks is not None:
+                frames_with_pose += 1
+                if analysis.rep_summary:
+                    correct_reps = exercise_counters.get(analysis.current_exercise, 0) + (1 if analysis.completed else 0)
+                    video_time = frames / fps
+                    logger.log(analysis.current_exercise, analysis.raw_reps, correct_reps, gender, analysis.rep_summary, timestamp=video_time)
+                    reps.append({"time": round(video_time, 3), "exercise": analysis.current_exercise, "completed": analysis.completed,
+                                 "scores": analysis.rep_summary.get('scores', {}), "feedback": analysis.rep_summary.get('feedback', '')})
+                    last_rep_score = analysis.rep_summary.get('scores', {})
+                if analysis.completed and analysis.current_exercise in exercise_counters:
+                    exercise_counters[analysis.current_exercise] += 1
+
+            if writer:
+                display_frame, feedback_frame = render_frame(image, analysis, last_rep_score, mp_pose, panel)
+                writer.write(np.hstack([display_frame, feedback_frame]))
+        if cache_writer: cache_writer.close()
+    finally:
+        if cap: cap.release()
+        if pose: pose.close()
+        logger.stop(counter.session)
+        if writer: writer.release()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "video": video_path,
+        "gender": gender,
+        "model_complexity": model_complexity,
+        "landmark_cache": "off" if cache is None else "hit" if cached is not None else "miss",
+        "frames": frames,
+        "frames_with_pose": frames_with_pose,
+        "video_seconds": round(frames / fps, 3),
+        "processing_seconds": round(elapsed, 3),
+        "processing_fps": round(frames / elapsed, 2) if elapsed > 0 else 0,
+        "correct_reps": exercise_counters,
+        "raw_reps": dict(counter.raw_reps),
+        "reps_csv": csv_path,
+        "reps": reps,
+        "session": counter.session.export(),
+    }
+    if estimator: summary["keyframes"] = estimator.stats()
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2, default=float)
+    return summary
+
+def keyframe_divergence(video_path, reference_data, output_dir, gender="male", model_complexity=1, keyframes=None):
+    """Scores a video at full rate and with keyframe inference (both without the cache) and
+    reports how far the rep counts drift apart and what the keyframes saved."""
+    keyframes = keyframes or {}
+    full = score_video(video_path, reference_data, os.path.join(output_dir, "full_rate"), gender, model_complexity, cache_dir=None)
+    sparse = score_video(video_path, reference_data, os.path.join(output_dir, "keyframes"), gender, model_complexity, cache_dir=None, keyframes=keyframes)
+    divergence = {}
+    for key in ("correct_reps", "raw_reps"):
+        exercises = sorted(set(full[key]) | set(sparse[key]))
+        divergence[key] = {ex: sparse[key].get(ex, 0) - full[key].get(ex, 0) for ex in exercises}
+    return {
+        "video": video_path,
+        "full_rate": {k: full[k] for k in ("correct_reps", "raw_reps", "processing_fps")},
+        "keyframes": {**{k: sparse[k] for k in ("correct_reps", "raw_reps", "processing_fps")}, **sparse["keyframes"]},
+        "divergence": divergence,
+        "total_abs_divergence": sum(abs(d) for counts in divergence.values() for d in counts.values()),
+    }
+
+def find_videos(inputs):
+    """Expands files, directories and glob patterns into a sorted, de-duplicated list of videos."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in os.listdir(item)]
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = glob.glob(item, recursive=True)
+        paths.extend(p for p in candidates if os.path.isfile(p) and p.lower().endswith(VIDEO_EXTENSIONS))
+    return sorted(set(paths))
+
+def _init_worker(threads):
+    cv2.setNumThreads(threads)
+
+def _score_video_job(video_path, reference_data, output_dir, gender, model_complexity, render, cache_dir, keyframes):
+    # Each worker process builds its own Pose and RepetitionCounter inside score_video.
+    try:
+        return score_video(video_path, reference_data, output_dir, gender, model_complexity, render, cache_dir, keyframes)
+    except Exception as e:
+        return {"video": video_path, "error": str(e)}
+
+def score_videos(video_paths, reference_data, output_dir, gender="male", model_complexity=1, render=False, workers=None, threads=1, cache_dir="cache//landmarks", keyframes=None):
+    """Scores each video in its own worker process and yields summaries as files finish."""
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    # Thread pools read these when the worker imports numpy/mediapipe, so they must be in the
+    # environment the spawned children inherit, not set afterwards.
+    saved_env = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    os.environ.update({name: str(threads) for name in THREAD_ENV_VARS})
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = [pool.submit(_score_video_job, path, reference_data, output_dir, gender, model_complexity, render, cache_dir, keyframes) for path in video_paths]
+            for future in as_completed(futures):
+                yield future.result()
+    finally:
+        for name, value in saved_env.items():
+            if value is None: os.environ.pop(name, None)
+            else: os.environ[name] = value
+
+def write_batch_report(summaries, output_dir):
+    """Merges per-video results into `batch_reps.csv` and `batch_report.json`."""
+    summaries = sorted(summaries, key=lambda s: s["video"])
+    scored = [s for s in summaries if "error" not in s]
+
+    with open(os.path.join(output_dir, "batch_reps.csv"), "w", newline='') as out:
+        writer = None
+        for summary in scored:
+            with open(summary["reps_csv"], newline='') as f:
+                rows = csv.reader(f)
+                header = next(rows, None)
+                if header is None: continue
+                if writer is None:
+                    writer = csv.writer(out)
+                    writer.writerow(["video"] + header)
+                for row in rows:
+                    writer.writerow([summary["video"]] + row)
+
+    totals = {"correct_reps": {}, "raw_reps": {}}
+    for summary in scored:
+        for key in totals:
+            for exercise, count in summary[key].items():
+                totals[key][exercise] = totals[key].get(exercise, 0) + count
+    report = {
+        "videos": len(summaries),
+        "failed": [s for s in summaries if "error" in s],
+        "frames": sum(s["frames"] for s in scored),
+        "processing_seconds": round(sum(s["processing_seconds"] for s in scored), 3),
+        **totals,
+        "results": [{k: v for k, v in s.items() if k != "reps"} for s in scored],
+    }
+    with open(os.path.join(output_dir, "batch_report.json"), "w") as f:
+        json.dump(report, f, indent=2, default=float)
+    return report
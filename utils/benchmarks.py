@@ -0,0 +1,217 @@
+import json
+import os
+import platform
+import time
+import cv2
+import numpy as np
+from utils.analysis import analyze_frame, analyze_landmarks
+from utils.feedback import generate_feedback
+from utils.features import extract_features, frame_features
+from utils.functions import calculate_repetition_score, feedback_text_items, score_text_items
+from utils.panel import FeedbackPanel, FONT
+from utils.repetition import RepetitionCounter
+from utils.synthetic import synthetic_session
+from utils.smoothing import LandmarkFilter
+from utils.tuner import precompute_clip, load_labels, load_clip_landmarks
+
+# Camera-free benchmarks of the scoring core on synthetic sessions with known rep counts, plus
+# an optional end-to-end pass over real clips. Every run also records the rep counts and scores
+# each scenario produces, so a speed-up can be checked to leave the output bit-for-bit identical.
+
+FRAME_TIME = 1 / 30  # fixed so rep summaries (which include fps) are reproducible
+
+# name: (segments, noise, dropout, glitch, seed); segments as in synthetic_session
+SCENARIOS = {
+    "clean_hammer_curl": ([("hammer_curl", 10, ())], 0.0, 0.0, 0.0, 0),
+    "noisy_overhead_press": ([("overhead_press", 10, (3, 7))], 0.003, 0.02, 0.0, 1),
+    "mixed_session": ([("hammer_curl", 8, (2,)), ("overhead_press", 8, (5,)), ("hammer_curl", 6, ())], 0.003, 0.03, 0.02, 2),
+}
+GENDERS = ("male", "female")
+
+def build_scenarios():
+    return {name: synthetic_session(segments, noise, dropout, glitch, seed)
+            for name, (segments, noise, dropout, glitch, seed) in SCENARIOS.items()}
+
+def _best_rate(fn, items, repeat):
+    """Items per second of the fastest of `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return items / best if best > 0 else float("inf")
+
+def replay(landmarks, thresholds, gender, on_rep=None, landmark_filter=None):
+    """analyze_landmarks over a whole sequence. Returns (counter, correct reps per exercise)."""
+    counter = RepetitionCounter(recent_scores=None)
+    correct = {}
+    for frame in landmarks:
+        rep_data = counter.rep_data
+        analysis = analyze_landmarks(frame, counter, thresholds, gender, FRAME_TIME, landmark_filter=landmark_filter)
+        if analysis.completed:
+            correct[analysis.current_exercise] = correct.get(analysis.current_exercise, 0) + 1
+        if analysis.rep_summary and on_rep:
+            on_rep(rep_data, analysis.current_exercise)
+    return counter, correct
+
+def scenario_outputs(scenarios, thresholds):
+    """Rep counts and per-rep scores for every scenario and gender, JSON-normalised."""
+    outputs = {}
+    for name, (landmarks, expected) in scenarios.items():
+        for gender in GENDERS:
+            counter, correct = replay(landmarks, thresholds, gender)
+            outputs[f"{name}/{gender}"] = {"raw": {ex: n for ex, n in counter.raw_reps.items() if n}, "correct": correct, "scores": list(counter.all_scores)}
+    return json.loads(json.dumps(outputs))
+
+def check_expected(scenarios, outputs):
+    """Synthetic sessions are calibrated for the male thresholds; returns mismatch messages."""
+    problems = []
+    for name, (_, expected) in scenarios.items():
+        got = outputs[f"{name}/male"]
+        if got["raw"] != expected["raw"] or got["correct"] != {ex: n for ex, n in expected["correct"].items() if n}:
+            problems.append(f"{name}: expected raw {expected['raw']} correct {expected['correct']}, got raw {got['raw']} correct {got['correct']}")
+    return problems
+
+def run_micro(scenarios, thresholds, repeat=5):
+    """frames/s (reps/s for scoring) of each stage of the per-frame chain, over all scenarios."""
+    landmarks = np.concatenate([lm for lm, _ in scenarios.values()])
+    valid = landmarks[~np.isnan(landmarks[:, 0, 0])]
+    frames = [f for f in precompute_clip(landmarks) if f is not None]
+
+    # Exercise and gender thresholds per frame, as the counter would have seen them
+    counter = RepetitionCounter()
+    contexts = []
+    for dynamic_angles, _, _, _ in frames:
+        counter.update_angles(*dynamic_angles)
+        exercise = counter.detect_exercise(thresholds)
+        contexts.append((exercise, thresholds.gender(exercise, "male")))
+    static_tolerance = thresholds.global_config.static_angle_tolerance
+
+    def feedback():
+        for (dynamic_angles, joint_angles, wrist_dist, hull_area), (exercise, gender_thresholds) in zip(frames, contexts):
+            generate_feedback(exercise, dynamic_angles, gender_thresholds, joint_angles, wrist_dist, hull_area, static_tolerance)
+
+    def counting():
+        counter = RepetitionCounter()
+        for dynamic_angles, joint_angles, wrist_dist, hull_area in frames:
+            counter.update_angles(*dynamic_angles)
+            exercise = counter.detect_exercise(thresholds)
+            counter.count_repetitions(dynamic_angles, wrist_dist, hull_area, thresholds, thresholds.gender(exercise, "male"), joint_angles, [], FRAME_TIME)
+
+    scored = []
+    for lm, _ in scenarios.values():
+        replay(lm, thresholds, "male", lambda rep_data, exercise: scored.append((rep_data, exercise)))
+
+    # A session only holds a few dozen reps; score them repeatedly for a stable timing.
+    scored *= 50
+
+    def scoring():
+        for rep_data, exercise in scored:
+            calculate_repetition_score(rep_data, thresholds.gender(exercise, "male"), thresholds.exercises[exercise], thresholds.global_config)
+
+    def full_chain():
+        for lm, _ in scenarios.values():
+            replay(lm, thresholds, "male")
+
+    # The panel text of every frame, live numbers included, as render_frame builds it.
+    panels = []
+    for lm, _ in scenarios.values():
+        counter, last_scores = RepetitionCounter(), {}
+        for frame in lm:
+            analysis = analyze_landmarks(frame, counter, thresholds, "male", FRAME_TIME)
+            if analysis.rep_summary: last_scores = analysis.rep_summary.get("scores", {})
+            panels.append(feedback_text_items(analysis.feedback_lines) + score_text_items(last_scores) if analysis.landmarks is not None else [])
+
+    def panel_incremental():
+        panel = FeedbackPanel()
+        for items in panels: panel.render(items)
+
+    def panel_redrawn():
+        for items in panels:
+            image = np.zeros((480, 640, 3), np.uint8)
+            for text, origin, scale, color in items: cv2.putText(image, text, origin, FONT, scale, color, 1)
+
+    return {
+        "features_per_frame": _best_rate(lambda: [frame_features(f) for f in valid], len(valid), repeat),
+        "features_batched": _best_rate(lambda: extract_features(valid), len(valid), repeat),
+        "generate_feedback": _best_rate(feedback, len(frames), repeat),
+        "count_repetitions": _best_rate(counting, len(frames), repeat),
+        "calculate_repetition_score": _best_rate(scoring, len(scored), repeat),
+        "analyze_landmarks": _best_rate(full_chain, len(landmarks), repeat),
+        "feedback_panel": _best_rate(panel_incremental, len(panels), repeat),
+        "feedback_panel_putText": _best_rate(panel_redrawn, len(panels), repeat),
+    }
+
+# Landmark jitter levels (normalised units) standing in for lighter pose models.
+FILTER_NOISE = (0.0, 0.01, 0.02, 0.03)
+FILTER_SEEDS = 3
+
+def count_error(expected, raw, correct):
+    return sum(abs(raw.get(ex, 0) - n) for ex, n in expected["raw"].items()) + sum(abs(correct.get(ex, 0) - n) for ex, n in expected["correct"].items())
+
+def run_filter_accuracy(thresholds):
+    """Summed rep-count error on jittery synthetic sessions, unfiltered vs LandmarkFilter, per noise level."""
+    results = {}
+    for noise in FILTER_NOISE:
+        errors = {"unfiltered": 0, "filtered": 0}
+        for seed in range(FILTER_SEEDS):
+            landmarks, expected = synthetic_session([("hammer_curl", 8, (2,)), ("overhead_press", 8, (5,))], noise, 0.03, 0.02, seed)
+            for name, landmark_filter in (("unfiltered", None), ("filtered", LandmarkFilter())):
+                counter, correct = replay(landmarks, thresholds, "male", landmark_filter=landmark_filter)
+                errors[name] += count_error(expected, counter.raw_reps, correct)
+        results[f"noise_{noise:g}"] = errors
+    return results
+
+def compare_models_on_clips(labels_path, thresholds, cache_dir="cache//landmarks", light=0, reference=1):
+    """Rep-count error against labelled clips: `light` model complexity with the LandmarkFilter
+    against `reference` unfiltered. Landmarks come from (and fill) the LandmarkCache."""
+    results = {}
+    for video, info in load_labels(labels_path).items():
+        row = {}
+        for name, complexity, landmark_filter in ((f"complexity_{reference}", reference, None), (f"complexity_{light}+filter", light, LandmarkFilter())):
+            landmarks = load_clip_landmarks(video, cache_dir, complexity)
+            counter, correct = replay(landmarks, thresholds, info["gender"], landmark_filter=landmark_filter)
+            row[name] = sum(abs(correct.get(ex, 0) - n) for ex, n in info["reps"].items())
+        results[os.path.basename(video)] = row
+    return results
+
+def run_end_to_end(video_path, thresholds, model_complexity=1, size=(640, 480)):
+    """Decode + pose + analysis over a real clip. Returns (frames/s, outputs)."""
+    import mediapipe as mp
+    pose = mp.solutions.pose.Pose(static_image_mode=False, model_complexity=model_complexity, enable_segmentation=False, min_detection_confidence=0.5)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Error opening video: {video_path}")
+    counter = RepetitionCounter(recent_scores=None)
+    correct = {}
+    frames = 0
+    started = time.perf_counter()
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret: break
+            analysis = analyze_frame(cv2.resize(frame, size), pose, counter, thresholds, "male", FRAME_TIME)
+            frames += 1
+            if analysis.completed:
+                correct[analysis.current_exercise] = correct.get(analysis.current_exercise, 0) + 1
+    finally:
+        cap.release()
+        pose.close()
+    elapsed = time.perf_counter() - started
+    outputs = {"raw": {ex: n for ex, n in counter.raw_reps.items() if n}, "correct": correct, "scores": list(counter.all_scores)}
+    return frames / elapsed if elapsed > 0 else 0.0, json.loads(json.dumps(outputs))
+
+def machine_info():
+    return {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(), "numpy": np.__version__, "opencv": cv2.__version__}
+
+def compare(results, baseline, threshold):
+    """Returns (regressions, output mismatches) against a stored baseline."""
+    regressions = []
+    for name, rate in results["rates"].items():
+        reference = baseline.get("rates", {}).get(name)
+        if reference and rate < reference * (1 - threshold):
+            regressions.append(f"{name}: {rate:,.0f}/s vs baseline {reference:,.0f}/s ({rate / reference - 1:+.0%})")
+    mismatches = [name for name, output in results["outputs"].items()
+                  if name in baseline.get("outputs", {}) and baseline["outputs"][name] != output]
+    return regressions, mismatches
@@ -0,0 +1,112 @@
+import datetime
+import json
+import os
+import time
+import cv2
+import numpy as np
+
+# Pose model selection against a per-frame latency budget (milliseconds of pose.process).
+# At startup every model_complexity is timed on a few frames with a person in them, and the
+# heaviest one whose p90 fits the budget is kept. AdaptivePose then watches the live latency and
+# drops to the next lighter model when the median of consecutive windows stays over budget.
+# Every decision is printed and appended to logs/model_selection.jsonl with its timings.
+
+CALIBRATION_IMAGES = ("img//hammer.png", "img//overhead.png")  # side-by-side 640x480 person shots
+SELECTION_LOG = "logs//model_selection.jsonl"
+
+def calibration_frames(paths=CALIBRATION_IMAGES, size=(640, 480)):
+    """RGB frames for timing: each half of the exercise illustrations, plus a dark frame if none load."""
+    frames = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None: continue
+        half = image.shape[1] // 2
+        for crop in (image[:, :half], image[:, half:]):
+            frames.append(cv2.cvtColor(cv2.resize(crop, size), cv2.COLOR_BGR2RGB))
+    return frames or [np.zeros((size[1], size[0], 3), np.uint8)]
+
+def log_decision(event, path=SELECTION_LOG, **details):
+    record = {"time": datetime.datetime.now().isoformat(timespec="seconds"), "event": event, **details}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+def time_pose(pose, frames, warmup=3, repeats=12):
+    for i in range(warmup):
+        pose.process(frames[i % len(frames)])
+    times = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        pose.process(frames[i % len(frames)])
+        times.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(float(np.median(times)), 2), "p90_ms": round(float(np.percentile(times, 90)), 2)}
+
+def calibrate_complexity(mp_pose, budget_ms, complexities=(0, 1, 2), frames=None, warmup=3, repeats=12, **pose_kwargs):
+    """Returns (complexity, timings). Complexities whose model cannot be loaded (the lite and heavy
+    models are downloaded on first use) are skipped; if none fits, the lightest available is used."""
+    frames = frames or calibration_frames()
+    timings = {}
+    for complexity in complexities:
+        try:
+            pose = mp_pose.Pose(model_complexity=complexity, **pose_kwargs)
+        except Exception as e:
+            print(f"❌ model_complexity={complexity} unavailable: {e}")
+            timings[complexity] = None
+            continue
+        try:
+            timings[complexity] = time_pose(pose, frames, warmup, repeats)
+        finally:
+            pose.close()
+    available = [c for c in complexities if timings[c]]
+    if not available: raise RuntimeError("No pose model could be loaded.")
+    fitting = [c for c in available if timings[c]["p90_ms"] <= budget_ms]
+    chosen = max(fitting) if fitting else min(available)
+    log_decision("calibration", budget_ms=budget_ms, chosen=chosen, timings={str(c): t for c, t in timings.items()})
+    summary = ", ".join(f"{c}: {t['median_ms']:.1f}/{t['p90_ms']:.1f} ms" if t else f"{c}: unavailable" for c, t in timings.items())
+    print(f"✅ Pose model_complexity={chosen} for a {budget_ms:g} ms budget (median/p90 {summary})")
+    return chosen, timings
+
+class AdaptivePose:
+    """Drop-in for mp_pose.Pose that downgrades model_complexity under sustained overload."""
+    def __init__(self, mp_pose, complexity, budget_ms, window=30, patience=3, **pose_kwargs):
+        self.mp_pose = mp_pose
+        self.pose_kwargs = pose_kwargs
+        self.budget_ms = budget_ms
+        self.window = window
+        self.patience = patience         # consecutive over-budget windows before downgrading
+        self.complexity = complexity
+        self.pose = mp_pose.Pose(model_complexity=complexity, **pose_kwargs)
+        self._floor = 0                  # lightest complexity that can still be loaded
+        self._times = []
+        self._strikes = 0
+
+    def process(self, image):
+        started = time.perf_counter()
+        results = self.pose.process(image)
+        self._times.append((time.perf_counter() - started) * 1000)
+        if len(self._times) >= self.window:
+            self._check()
+        return results
+
+    def _check(self):
+        median = float(np.median(self._times))
+        self._times = []
+        self._strikes = self._strikes + 1 if median > self.budget_ms else 0
+        if self._strikes < self.patience or self.complexity <= self._floor: return
+        previous = self.complexity
+        try:
+            pose = self.mp_pose.Pose(model_complexity=previous - 1, **self.pose_kwargs)
+        except Exception as e:
+            print(f"❌ Cannot downgrade to model_complexity={previous - 1}: {e}")
+            log_decision("downgrade_failed", budget_ms=self.budget_ms, previous=previous, median_ms=round(median, 2), error=str(e))
+            self._floor = previous
+            return
+        self.pose.close()
+        self.pose, self.complexity, self._strikes = pose, previous - 1, 0
+        log_decision("downgrade", budget_ms=self.budget_ms, previous=previous, chosen=self.complexity,
+                     median_ms=round(median, 2), windows=self.patience, window_frames=self.window)
+        print(f"Pose latency {median:.1f} ms over the {self.budget_ms:g} ms budget; model_complexity {previous} -> {self.complexity}")
+
+    def close(self):
+        self.pose.close()
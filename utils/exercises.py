@@ -0,0 +1,116 @@
+from bisect import bisect_left
+from collections import namedtuple
+
+# Exercise structure that is not tunable and therefore not part of thresholds.json. Adding a
+# movement is one entry here plus its ranges in thresholds.json; the per-frame code does not
+# branch on exercise names. Declaration order is detection priority when ranges overlap.
+#
+# Dynamic angles: name -> landmark ids (a, b, c) of the angle at b. The order here is the order of
+# the `angles` tuple (ANGLE_INDEX), and everything per angle (features, detection averages, rep
+# data, keyframe checks) is built from this table; `<joint>_up` / `<joint>_down` in thresholds.json
+# hold the stage ranges of the angles named `<joint>_r` / `<joint>_l`. A movement that is staged on
+# another joint (knees for squats) adds its two angles here.
+DYNAMIC_ANGLES = {
+    "elbow_r": (12, 14, 16), "elbow_l": (11, 13, 15),
+    "shoulder_r": (14, 12, 24), "shoulder_l": (13, 11, 23),
+}
+ANGLE_INDEX = {name: i for i, name in enumerate(DYNAMIC_ANGLES)}
+
+# detection:       (thresholds.json detection key, angles whose recent average must lie in it)
+# stage_joints:    joints ("elbow" -> elbow_r / elbow_l) whose up/down stages make a side's stage
+# stage_rule:      how those stages combine, see STAGE_RULES
+# scored_joints:   dynamic angles scored per rep
+# feedback_joints: (label, angle index, joint) lines on the feedback panel
+# violation_joints:(angle index, landmark id, joint) marked red outside both up and down ranges
+# keypoints:       static joint -> landmark ids highlighted when it is out of tolerance
+# static_joints:   static angles that are recorded for the rep score
+Exercise = namedtuple("Exercise", "name label image detection stage_joints stage_rule scored_joints feedback_joints violation_joints keypoints static_joints")
+
+def _violations(*names):
+    """violation_joints marking the vertex landmark of each named angle."""
+    return tuple((ANGLE_INDEX[name], DYNAMIC_ANGLES[name][1], name.split("_")[0]) for name in names)
+
+_ARMS = _violations("elbow_r", "elbow_l", "shoulder_r", "shoulder_l")
+_LEGS = {"knee_r": (26,), "knee_l": (25,), "hip_r": (24,), "hip_l": (23,)}
+
+EXERCISE_REGISTRY = {exercise.name: exercise for exercise in (
+    Exercise(
+        "hammer_curl", "Hammer Curl", "img//hammer.png",
+        detection=(("shoulder_static", ("shoulder_r", "shoulder_l")),),
+        stage_joints=("elbow", "shoulder"), stage_rule="any_up",
+        scored_joints=("elbow_r", "elbow_l"),
+        feedback_joints=(("Right Elbow", ANGLE_INDEX["elbow_r"], "elbow"), ("Left Elbow", ANGLE_INDEX["elbow_l"], "elbow")),
+        violation_joints=_ARMS,
+        keypoints={"shoulder_r": (12,), "shoulder_l": (11,), **_LEGS},
+        static_joints=("knee_r", "knee_l", "hip_r", "hip_l", "shoulder_r", "shoulder_l"),
+    ),
+    Exercise(
+        "overhead_press", "Overhead Press", "img//overhead.png",
+        detection=(("shoulder_down", ("shoulder_r", "shoulder_l")),),
+        stage_joints=("shoulder", "elbow"), stage_rule="agree",
+        scored_joints=("elbow_r", "elbow_l", "shoulder_r", "shoulder_l"),
+        feedback_joints=(("Right Elbow", ANGLE_INDEX["elbow_r"], "elbow"), ("Left Elbow", ANGLE_INDEX["elbow_l"], "elbow"),
+                         ("Right Shoulder", ANGLE_INDEX["shoulder_r"], "shoulder"), ("Left Shoulder", ANGLE_INDEX["shoulder_l"], "shoulder")),
+        violation_joints=_ARMS,
+        keypoints=dict(_LEGS),
+        static_joints=("knee_r", "knee_l", "hip_r", "hip_l"),
+    ),
+)}
+
+def _any_up(stages):
+    """Up as soon as one joint is up, down only when all are."""
+    if "up" in stages: return "up"
+    return "down" if all(stage == "down" for stage in stages) else None
+
+def _agree(stages):
+    """A stage only when every joint reports the same one."""
+    first = stages[0]
+    return first if first is not None and all(stage == first for stage in stages) else None
+
+STAGE_RULES = {"any_up": _any_up, "agree": _agree}
+
+def new_counters():
+    """Per-exercise rep counts, all zero."""
+    return dict.fromkeys(EXERCISE_REGISTRY, 0)
+
+def short_name(name):
+    exercise = EXERCISE_REGISTRY.get(name)
+    return "".join(word[0] for word in exercise.label.split()) if exercise else name
+
+class DetectionIndex:
+    """Finds the first registered exercise whose detection ranges hold every averaged angle.
+
+    The ranges are sorted into one interval index per angle when thresholds are compiled: each
+    distinct endpoint and each gap between endpoints carries a bitmask of the exercises covering
+    it. A lookup is one bisect per angle and an AND, however many exercises are registered, and
+    the lowest set bit (declaration order) wins, as in the if/elif chain this replaces.
+    """
+    def __init__(self, names, conditions):
+        # conditions[i]: ((angle index, (low, high)), ...) that must all hold for names[i]
+        self.names = tuple(names)
+        self.all_mask = (1 << len(self.names)) - 1
+        angles = sorted({index for condition in conditions for index, _ in condition})
+        self.axes = []
+        for angle in angles:
+            ranges = [(bit, value_range) for bit, condition in enumerate(conditions) for index, value_range in condition if index == angle]
+            points = sorted({value for _, value_range in ranges for value in value_range})
+            # Slot 2i+1 is points[i] itself, slot 2i the open gap below it; exercises that do not
+            # look at this angle are in every slot.
+            unconstrained = self.all_mask & ~sum(1 << bit for bit in {bit for bit, _ in ranges})
+            masks = [unconstrained] * (2 * len(points) + 1)
+            for bit, (low, high) in ranges:
+                for i, point in enumerate(points):
+                    if low <= point <= high: masks[2 * i + 1] |= 1 << bit
+                    if i and low <= points[i - 1] and point <= high: masks[2 * i] |= 1 << bit
+            self.axes.append((angle, points, masks))
+        self.angles = tuple(angles)
+
+    def lookup(self, averages):
+        """`averages` maps angle index -> value. Returns an exercise name or "unknown"."""
+        mask = self.all_mask if self.axes else 0
+        for angle, points, masks in self.axes:
+            value = averages[angle]
+            i = bisect_left(points, value)
+            mask &= masks[2 * i + 1] if i < len(points) and points[i] == value else masks[2 * i]
+            if not mask: return "unknown"
+        return self.names[(mask & -mask).bit_length() - 1] if mask else "unknown"
@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+from utils.exercises import DYNAMIC_ANGLES
+
+# Vectorized landmark features. A frame is a (33, 4) float32 array of x, y, z, visibility;
+# a whole video is (T, 33, 4). Every function below accepts either shape.
+
+LANDMARK_COUNT = 33
+TORSO_IDS = [11, 12, 23, 24]
+HIP_IDS = [23, 24]
+
+STATIC_JOINTS = ("knee_r", "knee_l", "hip_r", "hip_l", "shoulder_r", "shoulder_l")
+STATIC_TRIPLETS = np.array([(24, 26, 28), (23, 25, 27), (12, 24, 26), (11, 23, 25), (14, 12, 24), (13, 11, 23)])
+
+# Same order as the `angles` tuple used throughout (utils/exercises.py DYNAMIC_ANGLES).
+DYNAMIC_JOINTS = tuple(DYNAMIC_ANGLES)
+DYNAMIC_TRIPLETS = np.array(list(DYNAMIC_ANGLES.values()))
+
+def landmarks_to_array(pose_landmarks):
+    """Copies a MediaPipe NormalizedLandmarkList into a (33, 4) float32 array."""
+    return np.array([(p.x, p.y, p.z, p.visibility) for p in pose_landmarks.landmark], dtype=np.float32)
+
+def normalize_landmarks(landmarks):
+    """Centres on the mid-hip and rotates the torso line
+    (least-squares fit through shoulders and hips) to horizontal. Returns (..., 33, 2)."""
+    xy = landmarks[..., :2].astype(np.float64)
+    torso = xy[..., TORSO_IDS, :]
+    x, y = torso[..., 0], torso[..., 1]
+    dx = x - x.mean(axis=-1, keepdims=True)
+    dy = y - y.mean(axis=-1, keepdims=True)
+    sxx = (dx * dx).sum(axis=-1)
+    sxy = (dx * dy).sum(axis=-1)
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0)
+    theta = -np.arctan(slope)
+    cos_t, sin_t = np.cos(theta)[..., None], np.sin(theta)[..., None]
+
+    centred = xy - xy[..., HIP_IDS, :].mean(axis=-2, keepdims=True)
+    cx, cy = centred[..., 0], centred[..., 1]
+    return np.stack([cx * cos_t - cy * sin_t, cx * sin_t + cy * cos_t], axis=-1)
+
+def joint_angles(points, triplets):
+    """Angles in degrees (0-180) at the middle point of each (a, b, c) triplet. (..., N, 2) -> (..., len(triplets))."""
+    a, b, c = points[..., triplets[:, 0], :], points[..., triplets[:, 1], :], points[..., triplets[:, 2], :]
+    radians = np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0]) - np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0])
+    angle = np.abs(np.degrees(radians))
+    return np.where(angle > 180, 360 - angle, angle)
+
+def hull_areas(normalized):
+    """Convex hull area of the normalized landmarks; scalar for one frame, (T,) for a sequence."""
+    points = np.ascontiguousarray(normalized, dtype=np.float32)
+    if points.ndim == 2:
+        return cv2.contourArea(cv2.convexHull(points))
+    flat = points.reshape(-1, points.shape[-2], 2)
+    areas = np.array([cv2.contourArea(cv2.convexHull(frame)) for frame in flat])
+    return areas.reshape(points.shape[:-2])
+
+def extract_features(landmarks):
+    """Computes every per-frame feature the counter and feedback need in a few batched ops.
+
+    Returns a dict of arrays: `joint_angles` (..., 6) in STATIC_JOINTS order, `dynamic_angles`
+    (..., len(DYNAMIC_JOINTS)) in DYNAMIC_JOINTS order, `wrist_dist` (...) and `hull_area` (...).
+    """
+    raw = landmarks[..., :2].astype(np.float64)
+    normalized = normalize_landmarks(landmarks)
+    return {
+        "joint_angles": joint_angles(raw, STATIC_TRIPLETS),
+        "dynamic_angles": joint_angles(normalized, DYNAMIC_TRIPLETS),
+        "wrist_dist": np.linalg.norm(normalized[..., 15, :] - normalized[..., 16, :], axis=-1),
+        "hull_area": hull_areas(normalized),
+    }
+
+def frame_features(landmarks):
+    """Single-frame convenience wrapper returning the shapes analyze_frame works with:
+    (joint_angles dict, dynamic_angles tuple, wrist_dist, hull_area)."""
+    features = extract_features(landmarks)
+    joint_angles_dict = dict(zip(STATIC_JOINTS, features["joint_angles"].tolist()))
+    return joint_angles_dict, tuple(features["dynamic_angles"].tolist()), float(features["wrist_dist"]), float(features["hull_area"])
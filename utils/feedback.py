@@ -1,53 +1,35 @@
 from utils.functions import *
+from utils.exercises import EXERCISE_REGISTRY
 
-def check_dynamic_angle_violations(current_exercise, angles, dynamic_thresholds):
-    elbow_r, elbow_l, shoulder_r, shoulder_l = angles
+def check_dynamic_angle_violations(exercise_thresholds, angles):
     violations = []
-
-    def outside_all(val, ranges):
-        return not any(low <= val <= high for (low, high) in ranges)
-
-    if not dynamic_thresholds:
-        return violations
-
-    if current_exercise == "hammer_curl":
-        elbow_ranges = [dynamic_thresholds.get("elbow_up", (0,0)), dynamic_thresholds.get("elbow_down", (0,0))]
-        shoulder_ranges = [dynamic_thresholds.get("shoulder_up", (0,0)), dynamic_thresholds.get("shoulder_down", (0,0))]
-
-    elif current_exercise == "overhead_press":
-        elbow_ranges = [dynamic_thresholds.get("elbow_up", (0,0)), dynamic_thresholds.get("elbow_down", (0,0))]
-        shoulder_ranges = [dynamic_thresholds.get("shoulder_up", (0,0)), dynamic_thresholds.get("shoulder_down", (0,0))]
-    else:
+    if not exercise_thresholds:
         return violations
 
-    if outside_all(elbow_r, elbow_ranges): violations.append(14)  # Right elbow
-    if outside_all(elbow_l, elbow_ranges): violations.append(13)  # Left elbow
-    if outside_all(shoulder_r, shoulder_ranges): violations.append(12)  # Right shoulder
-    if outside_all(shoulder_l, shoulder_ranges): violations.append(11)  # Left shoulder
+    for angle_index, landmark_id, ranges in exercise_thresholds.violation_joints:
+        if not in_any_range(angles[angle_index], ranges): violations.append(landmark_id)
         
     return violations
 
 def generate_feedback(current_exercise, angles, gender_thresholds, joint_angles, wrist_dist, hull_area, static_tolerance):
-    elbow_r, elbow_l, shoulder_r, shoulder_l = angles
     feedback_lines = []
     
     # Static angle feedback
     if gender_thresholds:
-        ref_angles = gender_thresholds.get("static_angles", {})
-        feedback = check_static_angles(joint_angles, ref_angles, static_tolerance)
+        feedback = check_static_angles(joint_angles, gender_thresholds.static_angles, static_tolerance)
         
         for joint, (ok, cur_val, ref_val) in feedback.items():
             text = f"{joint}: {cur_val:.1f}deg (ref: {ref_val:.1f}) {'OK' if ok else 'REMAIN STATIONARY'}"
             feedback_lines.append(text)
     
-    if current_exercise in ["hammer_curl", "overhead_press"]:
+    if current_exercise in EXERCISE_REGISTRY:
         if gender_thresholds:
-            wrist_ok = in_range(wrist_dist, *gender_thresholds.get("wrist_distance", (0.0, 1.0)))
+            wrist_ok = in_range(wrist_dist, *(gender_thresholds.wrist_distance or (0.0, 1.0)))
             feedback_lines.append(f"Wrist Distance: {wrist_dist:.3f} in range {'OK' if wrist_ok else 'ADJUST WRIST'}")
             
     # Convex hull feedback
-    if gender_thresholds and 'convex_hull' in gender_thresholds:
-        convex_hull_thresholds = gender_thresholds['convex_hull']
+    if gender_thresholds and gender_thresholds.convex_hull is not None:
+        convex_hull_thresholds = gender_thresholds.convex_hull
         if 'up' in convex_hull_thresholds and 'down' in convex_hull_thresholds:
             up_low, up_high = convex_hull_thresholds["up"]
             down_low, down_high = convex_hull_thresholds["down"]
@@ -68,34 +50,18 @@ def generate_feedback(current_exercise, angles, gender_thresholds, joint_angles,
     feedback_lines.append((msg, color))
     return feedback_lines
 
-def get_dynamic_feedback_lines(current_exercise, angles, dynamic_thresholds):
-    elbow_r, elbow_l, shoulder_r, shoulder_l = angles
+def get_dynamic_feedback_lines(exercise_thresholds, angles):
     visual_lines, log_lines = [], []
     
-    if not dynamic_thresholds:
+    if not exercise_thresholds:
         return visual_lines, log_lines
 
-    joint_data_map = {
-        "hammer_curl": [
-            ("Right Elbow", elbow_r, [dynamic_thresholds.get("elbow_up"), dynamic_thresholds.get("elbow_down")]),
-            ("Left Elbow", elbow_l, [dynamic_thresholds.get("elbow_up"), dynamic_thresholds.get("elbow_down")]),
-        ],
-        "overhead_press": [
-            ("Right Elbow", elbow_r, [dynamic_thresholds.get("elbow_up"), dynamic_thresholds.get("elbow_down")]),
-            ("Left Elbow", elbow_l, [dynamic_thresholds.get("elbow_up"), dynamic_thresholds.get("elbow_down")]),
-            ("Right Shoulder", shoulder_r, [dynamic_thresholds.get("shoulder_up"), dynamic_thresholds.get("shoulder_down")]),
-            ("Left Shoulder", shoulder_l, [dynamic_thresholds.get("shoulder_up"), dynamic_thresholds.get("shoulder_down")]),
-        ]
-    }
-
-    joint_data = joint_data_map.get(current_exercise, [])
-    
-    for label, angle, ranges in joint_data:
-        if not all(ranges): continue
+    for label, angle_index, ranges in exercise_thresholds.feedback_joints:
+        angle = angles[angle_index]
         color = (0, 255, 0) if in_any_range(angle, ranges) else (0, 0, 255)
         approx = classify_stage_by_proximity(angle, *ranges)
         line = f"{label}: {angle:.1f}deg ~ {approx.upper()}"
         visual_lines.append((line, color))
         log_lines.append(line)
 
-    return visual_lines, log_lines
\ No newline at end of file
+    return visual_lines, log_lines
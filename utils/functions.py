@@ -1,6 +1,5 @@
 import cv2
 import numpy as np
-import math
 from collections import deque
 import copy
 
@@ -15,37 +14,31 @@ def classify_stage_by_proximity(val, up_range, down_range):
     down_center = sum(down_range) / 2
     return "up" if abs(val - up_center) < abs(val - down_center) else "down"
 
-def calculate_angle(a, b, c):
-    a, b, c = np.array(a), np.array(b), np.array(c)
-    radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
-    angle = np.abs(radians * 180.0 / np.pi)
-    return 360 - angle if angle > 180 else angle
-
-def normalize_by_least_squares(landmarks):
-    indices = [11, 12, 23, 24]
-    pts = np.array([[landmarks[i].x, landmarks[i].y] for i in indices])
-    X = pts[:, 0].reshape(-1, 1)
-    Y = pts[:, 1]
-    X_aug = np.hstack([X, np.ones_like(X)])
-    m, c = np.linalg.lstsq(X_aug, Y, rcond=None)[0]
-    theta = math.atan(m)
-    cos_t, sin_t = math.cos(-theta), math.sin(-theta)
-    mid_hip = np.mean([[landmarks[23].x, landmarks[23].y], [landmarks[24].x, landmarks[24].y]], axis=0)
-    normalized = []
-    for lm in landmarks:
-        x, y = lm.x - mid_hip[0], lm.y - mid_hip[1]
-        x_rot = x * cos_t - y * sin_t
-        y_rot = x * sin_t + y * cos_t
-        normalized.append((x_rot, y_rot))
-    return normalized
-
-def compute_distance(p1, p2):
-    return np.linalg.norm(np.array(p1) - np.array(p2))
-
-def compute_convex_hull_area(normalized_landmarks):
-    points = np.array(normalized_landmarks, dtype=np.float32)
-    hull = cv2.convexHull(points)
-    return cv2.contourArea(hull)
+class RunningStats:
+    """Constant-memory min/max/count/sum of a stream of values; falsy until the first add().
+    min and max follow the builtins' comparison order, so they match min(list)/max(list)."""
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if self.count:
+            if value < self.min: self.min = value
+            if value > self.max: self.max = value
+        else:
+            self.min = self.max = value
+        self.count += 1
+        self.total += value
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def __bool__(self):
+        return self.count > 0
 
 def detect_stage(angle, up_range, down_range):
     if in_range(angle, *down_range): return "down"
@@ -72,7 +65,7 @@ def _calculate_dynamic_angle_score(rep_data, ref_dynamic_thresholds, relevant_jo
             user_angles = rep_data.get(joint, {}).get(stage)
             score_key = f"{joint}_{stage}"
             if user_angles:
-                user_min, user_max = (min(user_angles), max(user_angles))
+                user_min, user_max = (user_angles.min, user_angles.max)
                 ref_key = f"{joint_base_name}_{stage}"
                 ref_min, ref_max = ref_dynamic_thresholds.get(ref_key, (0,0))
                 
@@ -89,7 +82,7 @@ def _calculate_dynamic_angle_score(rep_data, ref_dynamic_thresholds, relevant_jo
 
 def _calculate_wrist_distance_score(user_wrist_dist_values, ref_wrist_dist_range):
     if not user_wrist_dist_values or not ref_wrist_dist_range: return 0.0
-    user_range = (min(user_wrist_dist_values), max(user_wrist_dist_values))
+    user_range = (user_wrist_dist_values.min, user_wrist_dist_values.max)
     return _calculate_containment_score(user_range, ref_wrist_dist_range)
 
 def _calculate_static_angle_score(user_static_angles, ref_static_angles, tolerance):
@@ -97,41 +90,37 @@ def _calculate_static_angle_score(user_static_angles, ref_static_angles, toleran
     for joint, ref_angle in ref_static_angles.items():
         user_angles = user_static_angles.get(joint)
         if user_angles:
-            user_range = (min(user_angles), max(user_angles))
+            user_range = (user_angles.min, user_angles.max)
             score = _calculate_containment_score(user_range, (ref_angle, ref_angle + tolerance))
             joint_scores[joint] = score * 100
     return joint_scores
 
-def calculate_repetition_score(rep_data, ref_static_thresholds, ref_dynamic_thresholds, current_exercise, global_config):
-    # Get config values with defaults
-    static_tolerance = global_config.get("static_angle_tolerance", 12)
-    dynamic_buffer = global_config.get("dynamic_angle_buffer", 10)
+def calculate_repetition_score(rep_data, ref_static_thresholds, exercise_thresholds, global_config):
+    static_tolerance = global_config.static_angle_tolerance
+    dynamic_buffer = global_config.dynamic_angle_buffer
+    ref_dynamic_thresholds = exercise_thresholds.dynamic
 
     # 1. Convex Hull Score
     hull_scores = []
     for stage in ['up', 'down']:
         user_hull_values = rep_data['hull_area'][stage]
         if user_hull_values:
-            user_range = (min(user_hull_values), max(user_hull_values))
-            ref_range = ref_static_thresholds.get('convex_hull', {}).get(stage)
+            user_range = (user_hull_values.min, user_hull_values.max)
+            ref_range = ref_static_thresholds.convex_hull.get(stage) if ref_static_thresholds.convex_hull else None
             if ref_range: hull_scores.append(_calculate_containment_score(user_range, ref_range))
     avg_hull_score = np.mean(hull_scores) if hull_scores else 0.0
 
     # 2. Dynamic Angle Score
-    exercise_joints_map = {
-        "hammer_curl": ["elbow_r", "elbow_l"],
-        "overhead_press": ["elbow_r", "elbow_l", "shoulder_r", "shoulder_l"]
-    }
-    relevant_joints = exercise_joints_map.get(current_exercise, [])
+    relevant_joints = exercise_thresholds.scored_joints
     dynamic_angle_scores = _calculate_dynamic_angle_score(rep_data, ref_dynamic_thresholds, relevant_joints, dynamic_buffer)
     
     # 3. Static Angle Score
-    ref_static_angles = ref_static_thresholds.get("static_angles", {})
+    ref_static_angles = ref_static_thresholds.static_angles
     static_angle_scores = _calculate_static_angle_score(rep_data.get('static_angles', {}), ref_static_angles, static_tolerance)
 
     # 4. Wrist Distance Score
-    ref_wrist_range = ref_static_thresholds.get('wrist_distance')
-    wrist_score = _calculate_wrist_distance_score(rep_data.get('wrist_dist', []), ref_wrist_range)
+    ref_wrist_range = ref_static_thresholds.wrist_distance
+    wrist_score = _calculate_wrist_distance_score(rep_data.get('wrist_dist'), ref_wrist_range)
     
     return {
         "Hull Score": avg_hull_score * 100,
@@ -149,37 +138,32 @@ def check_static_angles(current_angles, reference_angles, tolerance):
             feedback[joint] = (ok, cur_val, ref_val)
     return feedback
 
-def display_feedback_with_colors(feedback_frame, feedback_lines):
+def feedback_text_items(feedback_lines):
+    """(text, origin, font scale, colour) for each feedback line, in drawing order."""
+    items = []
     for i, item in enumerate(feedback_lines):
         line, color = item if isinstance(item, tuple) else (item, (0, 255, 0))
         if "ADJUST" in line or "REMAIN" in line or "outside" in line.lower():
             color = (0, 0, 255)
-        cv2.putText(feedback_frame, line, (10, 30 + i * 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        items.append((line, (10, 30 + i * 20), 0.5, color))
+    return items
 
-def highlight_problematic_keypoints(image, landmarks, feedback, current_exercise):
-    joint_map = {
-        "hammer_curl": {"shoulder_r": [12], "shoulder_l": [11], "knee_r": [26], "knee_l": [25], "hip_r": [24], "hip_l": [23]},
-        "overhead_press": {"knee_r": [26], "knee_l": [25], "hip_r": [24], "hip_l": [23]}
-    }
-    landmarks_to_highlight = {idx for joint, (ok, _, _) in feedback.items() if not ok for idx in joint_map.get(current_exercise, {}).get(joint, [])}
+def highlight_problematic_keypoints(image, landmarks, feedback, keypoint_map):
+    landmarks_to_highlight = {idx for joint, (ok, _, _) in feedback.items() if not ok for idx in keypoint_map.get(joint, ())}
     
     for idx in landmarks_to_highlight:
-        lm = landmarks.landmark[idx]
         h, w, _ = image.shape
-        cx, cy = int(lm.x * w), int(lm.y * h)
+        cx, cy = int(landmarks[idx, 0] * w), int(landmarks[idx, 1] * h)
         cv2.circle(image, (cx, cy), 10, (0, 0, 255), -1)
             
-def angle_from_ids(a, b, c, landmarks):
-    return calculate_angle((landmarks[a].x, landmarks[a].y), (landmarks[b].x, landmarks[b].y), (landmarks[c].x, landmarks[c].y))
-
-def display_scores_on_frame(frame, scores):
-    if not scores or not isinstance(scores, dict): return
+def score_text_items(scores):
+    """(text, origin, font scale, colour) for the "Last Rep Scores" block, in drawing order."""
+    if not scores or not isinstance(scores, dict): return []
     y_pos = 360
-    cv2.putText(frame, "Last Rep Scores:", (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 1)
-    
+    items = [("Last Rep Scores:", (10, y_pos), 0.6, (255, 255, 0))]
     for key, value in scores.items():
         if value is None: continue
         y_pos += 25
         display_value = np.mean(list(value.values())) if isinstance(value, dict) and value else value if not isinstance(value, dict) else 0
-        line = f"  {key}: {display_value:.1f}"
-        cv2.putText(frame, line, (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 1)
\ No newline at end of file
+        items.append((f"  {key}: {display_value:.1f}", (10, y_pos), 0.6, (255, 255, 0)))
+    return items
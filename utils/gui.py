@@ -1,8 +1,29 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
 from PIL import Image, ImageTk
+import os
 import cv2
 import numpy as np
+from utils.exercises import EXERCISE_REGISTRY
+from utils.summary import IMPROVEMENT_THRESHOLD
+from utils.replay import ReplayControl, speed_label
+
+ASSET_CACHE = "cache//gui"
+
+def load_asset(path, size, cache_dir=ASSET_CACHE):
+    """`path` LANCZOS-resized to `size`. The pixels are kept as raw .npy in `cache_dir`, which loads
+    in milliseconds, and reused until the source file changes."""
+    stat = os.stat(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    cached = os.path.join(cache_dir, f"{name}_{size[0]}x{size[1]}_{stat.st_size}_{int(stat.st_mtime)}.npy")
+    if os.path.exists(cached):
+        return Image.fromarray(np.load(cached))
+    image = Image.open(path).resize(size, Image.Resampling.LANCZOS)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cached + ".tmp", "wb") as f:
+        np.save(f, np.asarray(image))
+    os.replace(cached + ".tmp", cached)
+    return image
 
 class GUI:
     def __init__(self, root, exercise_counters, rep_counter):
@@ -14,26 +35,26 @@ class GUI:
 
         self.is_running = False
         self.is_logging = False
+        self.reset_requested = False  # Clear Reps, applied by the inference thread before its next frame
         self.gender = "male"
         self.source_type = 'webcam'
         self.video_path = None
+        self.replay = ReplayControl()
+        self._display_images = {}
+        self._label_texts = {}
 
         style = ttk.Style()
         style.configure("Custom.TButton", font=("Arial", 17))
 
-        bg_image = Image.open("img//background.jpg")
-        bg_image = bg_image.resize((1280, 760), Image.Resampling.LANCZOS)
+        bg_image = load_asset("img//background.jpg", (1280, 760))
         self.bg_photo = ImageTk.PhotoImage(bg_image)
 
         self.canvas_bg = tk.Canvas(self.root, width=1280, height=760, highlightthickness=0, bg="black")
         self.canvas_bg.pack(fill="both", expand=True)
         self.canvas_bg.create_image(0, 0, anchor="nw", image=self.bg_photo)
 
-        self.hammer_img = Image.open("img//hammer.png").resize((260, 160), Image.Resampling.LANCZOS)
-        self.press_img = Image.open("img//overhead.png").resize((260, 160), Image.Resampling.LANCZOS)
-
-        self.hammer_photo = ImageTk.PhotoImage(self.hammer_img)
-        self.press_photo = ImageTk.PhotoImage(self.press_img)
+        self.exercise_photos = {name: ImageTk.PhotoImage(load_asset(exercise.image, (260, 160)))
+                                for name, exercise in EXERCISE_REGISTRY.items() if os.path.exists(exercise.image)}
 
         self.frame_display_group = tk.Frame(self.canvas_bg, bg="black", highlightthickness=0)
         self.canvas_bg.create_window(640, 40, anchor="n", window=self.frame_display_group)
@@ -56,17 +77,16 @@ class GUI:
         self.exercise_label = tk.Label(self.info_frame, text="Exercise: -", font=("Arial", 14), bg="black", fg="white")
         self.exercise_label.grid(row=0, column=0, padx=20)
 
-        self.raw_label = tk.Label(self.info_frame, text="Raw Reps: 0", font=("Arial", 14), bg="black", fg="white")
-        self.raw_label.grid(row=3, column=0, padx=20)
-
-        self.hammer_label = tk.Label(self.info_frame, text="Hammer Curl Reps: 0", font=("Arial", 14), bg="black", fg="white")
-        self.hammer_label.grid(row=1, column=0, padx=20)
+        self.count_labels = {}
+        for row, (name, exercise) in enumerate(EXERCISE_REGISTRY.items(), start=1):
+            self.count_labels[name] = tk.Label(self.info_frame, text=f"{exercise.label} Reps: 0", font=("Arial", 14), bg="black", fg="white")
+            self.count_labels[name].grid(row=row, column=0, padx=20)
 
-        self.press_label = tk.Label(self.info_frame, text="Overhead Press Reps: 0", font=("Arial", 14), bg="black", fg="white")
-        self.press_label.grid(row=2, column=0, padx=20)
+        self.raw_label = tk.Label(self.info_frame, text="Raw Reps: 0", font=("Arial", 14), bg="black", fg="white")
+        self.raw_label.grid(row=len(EXERCISE_REGISTRY) + 1, column=0, padx=20)
 
         self.stage_label = tk.Label(self.info_frame, text="Stage R: - | Stage L: -", font=("Arial", 14), bg="black", fg="white")
-        self.stage_label.grid(row=4, column=0, padx=20)
+        self.stage_label.grid(row=len(EXERCISE_REGISTRY) + 2, column=0, padx=20)
 
         self.frame_bottom = tk.Frame(self.frame_bottom_group, bg="black")
         self.frame_bottom.pack(side=tk.RIGHT, padx=20)
@@ -89,17 +109,27 @@ class GUI:
         self.instruction_btn = ttk.Button(self.frame_bottom, style="Custom.TButton", text="Instructions", width=20, command=self.show_welcome_popup)
         self.instruction_btn.grid(row=2, column=1, padx=10, pady=5)
 
+        # Only shown while a session file is selected.
+        self.replay_bar = tk.Frame(self.frame_bottom, bg="black")
+        self.speed_btn = ttk.Button(self.replay_bar, style="Custom.TButton", text=speed_label(self.replay.speed), width=6, command=self.cycle_speed)
+        self.speed_btn.pack(side=tk.LEFT, padx=10)
+        self.pause_btn = ttk.Button(self.replay_bar, style="Custom.TButton", text="Pause", width=8, command=self.toggle_pause)
+        self.pause_btn.pack(side=tk.LEFT, padx=10)
+        self.step_btn = ttk.Button(self.replay_bar, style="Custom.TButton", text="Step", width=8, command=self.replay.step)
+        self.step_btn.pack(side=tk.LEFT, padx=10)
+
         self.show_welcome_popup()
 
     def choose_video(self):
         """Opens a file dialog to select a video and switches the source type."""
         path = filedialog.askopenfilename(
-            title="Select a video file",
-            filetypes=(("Video files", "*.avi *.mp4 *.mov"), ("All files", "*.*"))
+            title="Select a video or session file",
+            filetypes=(("Video files", "*.avi *.mp4 *.mov"), ("Session files", "*.straps"), ("All files", "*.*"))
         )
         if path:
             self.video_path = path
-            self.source_type = 'video'
+            self.source_type = 'replay' if path.endswith(".straps") else 'video'
+            if self.source_type == 'replay': self.replay_bar.grid(row=3, column=0, columnspan=2, pady=5)
             if self.is_running:
                 self.toggle()
             print(f"Video source selected: {self.video_path}")
@@ -109,6 +139,7 @@ class GUI:
         """Switches the source back to the webcam."""
         self.source_type = 'webcam'
         self.video_path = None
+        self.replay_bar.grid_remove()
         if self.is_running:
             self.toggle()
         print("Switched to webcam source.")
@@ -117,9 +148,16 @@ class GUI:
     def toggle(self):
         self.is_running = not self.is_running
         self.toggle_btn.config(text="Stop" if self.is_running else "Start")
-        if not self.is_running and self.rep_counter.all_scores:
+        if not self.is_running and self.rep_counter.session.reps:
             self.show_summary_popup()
 
+    def cycle_speed(self):
+        self.speed_btn.config(text=speed_label(self.replay.next_speed()))
+
+    def toggle_pause(self):
+        self.replay.paused = not self.replay.paused
+        self.pause_btn.config(text="Resume" if self.replay.paused else "Pause")
+
     def toggle_logging(self):
         self.is_logging = not self.is_logging
         self.log_btn.config(text="Stop Record" if self.is_logging else "Start Record")
@@ -129,109 +167,65 @@ class GUI:
         self.gender_btn.config(text=f"Switch to {'Male' if self.gender == 'female' else 'Female'}")
 
     def clear_reps(self):
-        self.hammer_count = 0
-        self.press_count = 0
-        self.raw_reps = 0
-
-        self.exercise_counters["hammer_curl"] = 0
-        self.exercise_counters["overhead_press"] = 0
-        
-        self.rep_counter.raw_reps["hammer_curl"] = 0
-        self.rep_counter.raw_reps["overhead_press"] = 0
-        self.rep_counter.right_phase = "idle"
-        self.rep_counter.left_phase = "idle"
-        self.rep_counter.stage_right = None
-        self.rep_counter.stage_left = None
-        self.rep_counter.raw_right_phase = "idle"
-        self.rep_counter.raw_left_phase = "idle"
-        self.rep_counter.reset_summary()
-        
-        self.update_info("-", 0, 0, "-", "-", 0)
+        # The counter belongs to the inference thread, which may be counting right now.
+        self.reset_requested = True
+        self.update_info("-", dict.fromkeys(self.exercise_counters, 0), "-", "-", 0)
+
+    def _show(self, label, frame, slot):
+        """Converts into a reused RGB buffer and pastes into the label's existing PhotoImage;
+        a new PhotoImage is only made when the frame size changes."""
+        buffer, photo = self._display_images.get(slot, (None, None))
+        if buffer is None or buffer.shape != frame.shape:
+            buffer = np.empty_like(frame)
+            photo = None
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buffer)
+        image = Image.frombuffer("RGB", (buffer.shape[1], buffer.shape[0]), buffer, "raw", "RGB", 0, 1)
+        if photo is None:
+            photo = ImageTk.PhotoImage(image)
+            label.configure(image=photo)
+            label.image = photo
+        else:
+            photo.paste(image)
+        self._display_images[slot] = (buffer, photo)
 
     def update_frames(self, main_frame, feedback_frame):
-        img1 = cv2.cvtColor(main_frame, cv2.COLOR_BGR2RGB)
-        img1 = ImageTk.PhotoImage(Image.fromarray(img1))
-        self.canvas_main.configure(image=img1)
-        self.canvas_main.image = img1
-
-        img2 = cv2.cvtColor(feedback_frame, cv2.COLOR_BGR2RGB)
-        img2 = ImageTk.PhotoImage(Image.fromarray(img2))
-        self.canvas_feedback.configure(image=img2)
-        self.canvas_feedback.image = img2
-
-    def update_info(self, exercise, hammer_count, press_count, stage_r, stage_l, raw_reps=0):
-        self.hammer_count = hammer_count
-        self.press_count = press_count
-        self.exercise_label.config(text=f"Exercise: {exercise.upper()}")
-        self.hammer_label.config(text=f"Hammer Curl Reps: {hammer_count}")
-        self.press_label.config(text=f"Overhead Press Reps: {press_count}")
-        self.stage_label.config(text=f"Stage R: {stage_r or '-'} | Stage L: {stage_l or '-'}")
-        self.raw_label.config(text=f"Raw Reps: {raw_reps}")
+        """`feedback_frame` may be None when the panel on screen is still current."""
+        self._show(self.canvas_main, main_frame, "main")
+        if feedback_frame is not None:
+            self._show(self.canvas_feedback, feedback_frame, "feedback")
+
+    def _set_label(self, label, text):
+        if self._label_texts.get(label) != text:
+            self._label_texts[label] = text
+            label.config(text=text)
+
+    def update_info(self, exercise, counts, stage_r, stage_l, raw_reps=0):
+        self._set_label(self.exercise_label, f"Exercise: {exercise.upper()}")
+        for name, label in self.count_labels.items():
+            self._set_label(label, f"{EXERCISE_REGISTRY[name].label} Reps: {counts.get(name, 0)}")
+        self._set_label(self.stage_label, f"Stage R: {stage_r or '-'} | Stage L: {stage_l or '-'}")
+        self._set_label(self.raw_label, f"Raw Reps: {raw_reps}")
 
     def show_summary_popup(self):
-        scores_data = self.rep_counter.all_scores
-        if not scores_data:
+        report = self.rep_counter.session.report()
+        if not report:
             return
 
-        summary = {}
-        for item in scores_data:
-            exercise = item['exercise']
-            scores = item['scores']
-
-            if exercise not in summary:
-                summary[exercise] = {'reps': 0}
-            
-            summary[exercise]['reps'] += 1
-            for key, value in scores.items():
-                if key not in summary[exercise]:
-                    summary[exercise][key] = []
-                summary[exercise][key].append(value)
-        
         summary_text = "Session Summary\n"
         summary_text += "---------------------------------\n"
 
-        for exercise, data in summary.items():
-            if data['reps'] == 0: continue
-            
+        for exercise, data in report.items():
             summary_text += f"\nExercise: {exercise.replace('_', ' ').title()}\n"
             summary_text += f"  Total Reps: {data['reps']}\n\n  Average Scores:\n"
-            
-            areas_for_improvement = []
-            improvement_threshold = 95
-
-            for key, value_list in data.items():
-                if key == 'reps': continue
-
-                if isinstance(value_list[0], dict):
-                    all_sub_scores = {}
-                    for rep_scores in value_list:
-                        for sub_key, sub_value in rep_scores.items():
-                            if sub_key not in all_sub_scores:
-                                all_sub_scores[sub_key] = []
-                            all_sub_scores[sub_key].append(sub_value)
-                    
-                    if not all_sub_scores: continue
-
-                    avg_sub_scores = {k: np.mean(v) for k, v in all_sub_scores.items()}
-                    overall_avg = np.mean(list(avg_sub_scores.values()))
-                    summary_text += f"    - {key}: {overall_avg:.1f}%\n"
-
-                    for sub_key, sub_avg in avg_sub_scores.items():
-                        if sub_avg < improvement_threshold:
-                            formatted_name = sub_key.replace('_', ' ').title()
-                            areas_for_improvement.append(formatted_name)
-                else:
-                    avg = np.mean(value_list)
-                    summary_text += f"    - {key}: {avg:.1f}%\n"
-                    if avg < improvement_threshold:
-                        areas_for_improvement.append(key)
-
-            if areas_for_improvement:
+            for key, avg in data['scores'].items():
+                summary_text += f"    - {key}: {avg:.1f}%\n"
+
+            if data['needs_work']:
                 summary_text += f"\n  >> Areas for Improvement:\n"
-                for area in sorted(list(set(areas_for_improvement))):
+                for area in data['needs_work']:
                     summary_text += f"     - {area}\n"
             else:
-                summary_text += f"\n  >> Great job! All scores are above {improvement_threshold}%!\n"
+                summary_text += f"\n  >> Great job! All scores are above {IMPROVEMENT_THRESHOLD}%!\n"
 
             summary_text += "---------------------------------\n"
         
@@ -267,9 +261,8 @@ class GUI:
             "• Press 'Clear Reps' to reset counters\n"
             "• Use 'Switch Gender' for gender-specific evaluation\n"
             "• Press 'Instructions' to show user guide\n\n"
-            "Supported Exercises:\n"
-            "1. Hammer Curl\n"
-            "2. Overhead Press"
+            "Supported Exercises:\n" +
+            "\n".join(f"{i}. {exercise.label}" for i, exercise in enumerate(EXERCISE_REGISTRY.values(), start=1))
         )
 
         message = tk.Label(popup, text=instructions, font=("Arial", 12), bg="black", fg="white", justify="left")
@@ -278,15 +271,11 @@ class GUI:
         image_container = tk.Frame(popup, bg="black")
         image_container.pack(pady=(10, 5))
 
-        hammer_frame = tk.Frame(image_container, bg="black")
-        tk.Label(hammer_frame, image=self.hammer_photo, bg="black").pack()
-        tk.Label(hammer_frame, text="Hammer Curl", font=("Arial", 12), bg="black", fg="white").pack()
-        hammer_frame.pack(side=tk.LEFT, padx=20)
-
-        press_frame = tk.Frame(image_container, bg="black")
-        tk.Label(press_frame, image=self.press_photo, bg="black").pack()
-        tk.Label(press_frame, text="Overhead Press", font=("Arial", 12), bg="black", fg="white").pack()
-        press_frame.pack(side=tk.LEFT, padx=20)
+        for name, photo in self.exercise_photos.items():
+            exercise_frame = tk.Frame(image_container, bg="black")
+            tk.Label(exercise_frame, image=photo, bg="black").pack()
+            tk.Label(exercise_frame, text=EXERCISE_REGISTRY[name].label, font=("Arial", 12), bg="black", fg="white").pack()
+            exercise_frame.pack(side=tk.LEFT, padx=20)
 
         close_btn = ttk.Button(popup, text="Let's Go", command=popup.destroy)
         close_btn.pack(pady=20)
@@ -0,0 +1,126 @@
+import math
+import time
+import cv2
+import numpy as np
+from utils.features import landmarks_to_array, normalize_landmarks, joint_angles, DYNAMIC_TRIPLETS
+from utils.functions import detect_stage
+from utils.profiler import NULL_PROFILER
+
+# Keyframe inference: pose.process runs on every Nth frame only, and landmarks in between are
+# carried forward with pyramidal Lucas-Kanade flow on the landmark points (constant velocity
+# where flow loses a point). N follows the measured pose latency against the per-frame budget
+# and shrinks when the body moves fast. A propagated frame whose dynamic angles have crossed an
+# up/down stage boundary since the last keyframe, or are about to at their current angular speed,
+# is re-inferred instead, so the rep counter's transitions are decided on real pose output.
+
+_LK_PARAMS = dict(winSize=(21, 21), maxLevel=3, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+def dynamic_angles(landmarks):
+    return joint_angles(normalize_landmarks(landmarks), DYNAMIC_TRIPLETS)
+
+def near_transition(angles, previous_angles, reference_angles, exercise_thresholds, lookahead):
+    """True when any angle the exercise is staged on falls in a different stage than at the last
+    keyframe, or will within `lookahead` frames at its current angular speed."""
+    if not exercise_thresholds: return False
+    for side in exercise_thresholds.stage_joints:
+        for index, up, down in side:
+            angle = angles[index]
+            stage = detect_stage(angle, up, down)
+            if stage != detect_stage(reference_angles[index], up, down): return True
+            if stage != detect_stage(angle + (angle - previous_angles[index]) * lookahead, up, down): return True
+    return False
+
+class KeyframeEstimator:
+    """Drop-in for `pose.process` + landmarks_to_array that returns a (33, 4) array or None."""
+    def __init__(self, pose, max_stride=4, target_fps=30.0, budget_ms=None, motion_scale=0.02, transition_lookahead=2.0, profiler=NULL_PROFILER):
+        self.pose = pose
+        self.max_stride = max_stride
+        self.budget = (budget_ms / 1000) if budget_ms else 1.0 / target_fps
+        self.motion_scale = motion_scale    # drift (image fraction) tolerated between keyframes
+        self.transition_lookahead = transition_lookahead
+        self.profiler = profiler
+        self.reset()
+
+    def reset(self):
+        """Forget tracking state and statistics, e.g. when the source changes."""
+        self.stride = 1
+        self.latency = None                 # EMA of pose.process seconds
+        self.motion = 0.0                   # EMA of median landmark speed, image fraction per frame
+        self.frames = self.keyframes = self.forced = 0
+        self._landmarks = None              # current estimate; None while nobody is in view
+        self._key_landmarks = None
+        self._velocity = None
+        self._gray = None
+        self._key_angles = None
+        self._angles = None
+        self._since_key = 0
+
+    def estimate(self, image, counter, thresholds):
+        self.frames += 1
+        with self.profiler.stage("gray"):
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self._since_key + 1 >= self.stride or self.keyframes == 0:
+            return self._keyframe(image, gray)
+        if self._landmarks is None:
+            # Nobody in view: nothing to propagate, look again at the next keyframe.
+            self._since_key += 1
+            return None
+        with self.profiler.stage("propagate"):
+            landmarks = self._propagate(gray)
+            angles = dynamic_angles(landmarks)
+        if near_transition(angles, self._angles, self._key_angles, thresholds.exercises.get(counter.current_exercise), self.transition_lookahead):
+            self.forced += 1
+            return self._keyframe(image, gray)
+        self._since_key += 1
+        self._gray = gray
+        self._landmarks = landmarks
+        self._angles = angles
+        return landmarks
+
+    def _keyframe(self, image, gray):
+        self.keyframes += 1
+        with self.profiler.stage("color"):
+            rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        started = time.perf_counter()
+        with self.profiler.stage("pose"):
+            results = self.pose.process(rgb)
+        elapsed = time.perf_counter() - started
+        self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+
+        landmarks = landmarks_to_array(results.pose_landmarks) if results.pose_landmarks else None
+        if landmarks is not None and self._key_landmarks is not None:
+            steps = self._since_key + 1
+            self._velocity = (landmarks[:, :2] - self._key_landmarks[:, :2]) / steps
+            speed = float(np.median(np.linalg.norm(self._velocity, axis=1)))
+            self.motion = 0.7 * self.motion + 0.3 * speed
+        else:
+            self._velocity = np.zeros((33, 2), np.float32)
+        self._landmarks = self._key_landmarks = landmarks
+        self._key_angles = self._angles = dynamic_angles(landmarks) if landmarks is not None else None
+        self._gray = gray
+        self._since_key = 0
+        self._update_stride()
+        return landmarks
+
+    def _propagate(self, gray):
+        h, w = gray.shape
+        scale = np.array([w, h], np.float32)
+        points = (self._landmarks[:, :2] * scale).astype(np.float32).reshape(-1, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, points, None, **_LK_PARAMS)
+        predicted = self._landmarks[:, :2] + self._velocity
+        tracked = status.reshape(-1).astype(bool)
+        xy = np.where(tracked[:, None], moved.reshape(-1, 2) / scale, predicted)
+        landmarks = self._landmarks.copy()
+        landmarks[:, :2] = xy
+        return landmarks
+
+    def _update_stride(self):
+        # Skip only as many frames as needed to fit pose into the budget, and fewer when moving fast.
+        latency_stride = math.ceil(self.latency / self.budget) if self.latency else 1
+        motion_stride = int(self.motion_scale / self.motion) if self.motion > 0 else self.max_stride
+        self.stride = max(1, min(self.max_stride, latency_stride, motion_stride))
+
+    def stats(self):
+        return {"frames": self.frames, "keyframes": self.keyframes, "forced_keyframes": self.forced,
+                "keyframe_ratio": round(self.keyframes / self.frames, 3) if self.frames else 0.0, "stride": self.stride,
+                "pose_ms": round(self.latency * 1000, 2) if self.latency else None}
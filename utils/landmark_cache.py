@@ -0,0 +1,108 @@
+import os
+import hashlib
+import json
+import numpy as np
+
+# On-disk cache of per-frame pose landmarks so re-scoring a video skips pose.process.
+# An entry is two .npy files that are memory-mapped on load:
+#   <key>_landmarks.npy   (T, 33, 4) float32 x, y, z, visibility; NaN rows where no pose was found
+#   <key>_timestamps.npy  (T,) float64 seconds from the start of the video
+# Hashing a video reads all of it, so the key found for a path is remembered in paths/ together with
+# the file's size and mtime; an unchanged file is not read again.
+
+class LandmarkCache:
+    def __init__(self, root="cache//landmarks", model_complexity=1, size=(640, 480)):
+        self.root = root
+        self.model_complexity = model_complexity
+        self.size = size
+
+    def key(self, video_path):
+        """Content hash of the video plus everything that changes the landmarks it produces."""
+        key = self.known_key(video_path)
+        if key: return key
+        stat = os.stat(video_path)
+        digest = hashlib.sha1()
+        with open(video_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        key = f"{digest.hexdigest()}_m{self.model_complexity}_{self.size[0]}x{self.size[1]}"
+        self._remember(video_path, stat, key)
+        return key
+
+    def known_key(self, video_path):
+        """The key of a file hashed before and unchanged since (same size and mtime), or None.
+        Never reads the video."""
+        try:
+            stat = os.stat(video_path)
+            with open(self._path_record(video_path), "r") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("size") != stat.st_size or record.get("mtime_ns") != stat.st_mtime_ns: return None
+        return record.get("keys", {}).get(f"m{self.model_complexity}_{self.size[0]}x{self.size[1]}")
+
+    def _path_record(self, video_path):
+        return os.path.join(self.root, "paths", hashlib.sha1(os.path.abspath(video_path).encode()).hexdigest() + ".json")
+
+    def _remember(self, video_path, stat, key):
+        path = self._path_record(video_path)
+        try:
+            with open(path, "r") as f:
+                record = json.load(f)
+            if record.get("size") != stat.st_size or record.get("mtime_ns") != stat.st_mtime_ns: record = {}
+        except (OSError, ValueError):
+            record = {}
+        record.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        record.setdefault("keys", {})[f"m{self.model_complexity}_{self.size[0]}x{self.size[1]}"] = key
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not remember landmark cache key for {video_path}: {e}")
+
+    def _paths(self, key):
+        base = os.path.join(self.root, key)
+        return f"{base}_landmarks.npy", f"{base}_timestamps.npy"
+
+    def load(self, key):
+        """Returns memory-mapped (landmarks, timestamps) or None on a miss."""
+        landmarks_path, timestamps_path = self._paths(key)
+        if not (os.path.exists(landmarks_path) and os.path.exists(timestamps_path)):
+            return None
+        try:
+            return np.load(landmarks_path, mmap_mode="r"), np.load(timestamps_path, mmap_mode="r")
+        except (ValueError, OSError) as e:
+            print(f"Ignoring unreadable landmark cache {key}: {e}")
+            return None
+
+    def writer(self, key):
+        return LandmarkCacheWriter(self, key)
+
+class LandmarkCacheWriter:
+    """Collects a video's landmarks frame by frame and publishes the entry atomically on close()."""
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.landmarks = []
+        self.timestamps = []
+
+    def append(self, landmarks, timestamp):
+        self.landmarks.append(landmarks if landmarks is not None else np.full((33, 4), np.nan, dtype=np.float32))
+        self.timestamps.append(timestamp)
+
+    def close(self):
+        if not self.landmarks: return
+        os.makedirs(self.cache.root, exist_ok=True)
+        landmarks_path, timestamps_path = self.cache._paths(self.key)
+        suffix = f".{os.getpid()}.tmp"
+        # np.save appends .npy to names without it, so keep the extension last on the temp files.
+        for path, data in ((timestamps_path, np.asarray(self.timestamps, dtype=np.float64)),
+                           (landmarks_path, np.stack(self.landmarks).astype(np.float32))):
+            tmp_path = path[:-4] + suffix + ".npy"
+            np.save(tmp_path, data)
+            os.replace(tmp_path, path)
+        # load() only trusts an entry once the landmarks file exists, and it is written last.
+        self.landmarks, self.timestamps = [], []
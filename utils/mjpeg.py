@@ -0,0 +1,281 @@
+import http.client
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+import cv2
+import numpy as np
+
+# MJPEG over HTTP (multipart/x-mixed-replace), as sent by DroidCam and similar phone cameras.
+#
+# MJPEGReader reads such a stream natively instead of through FFmpeg. grab() only splits the next
+# JPEG out of the multipart body; decode() runs later, and only for the frame that is actually used,
+# so frames replaced by a newer one are never decoded. A stream larger than the processing size is
+# decoded at 1/2, 1/4 or 1/8 scale (IMREAD_REDUCED_COLOR_*), which does the downscale inside the
+# JPEG decoder and skips most of its work.
+#
+# MJPEGServer is a local stand-in for the phone: JPEG frames on any path, from a looped video file,
+# a recorded stream (e.g. `curl URL > phone.mjpeg`) replayed byte for byte, or a generated test
+# pattern that shows its frame number. Each frame is encoded once however many clients watch.
+# stop() drops every client like a phone going away and start() brings the camera back on the same
+# port; `paused` keeps clients connected but sends nothing, like a stalled stream.
+
+BOUNDARY = b"frame"
+REDUCED = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+def jpeg_size(data):
+    """(width, height) from a JPEG's frame header, or None."""
+    i, n = 2, len(data)
+    while i + 9 <= n:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if 0xD0 <= marker <= 0xD8 or marker == 0x01:
+            i += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack_from(">HH", data, i + 5)
+            return width, height
+        i += 2 + struct.unpack_from(">H", data, i + 2)[0]
+    return None
+
+def decode_flag(width, height, size):
+    """(scale, imdecode flag) for the strongest reduction that still covers `size`."""
+    for scale, flag in REDUCED:
+        if width // scale >= size[0] and height // scale >= size[1]: return scale, flag
+    return 1, cv2.IMREAD_COLOR
+
+class MultipartParser:
+    """Splits a multipart/x-mixed-replace body into its parts. `stream` needs read1()."""
+    def __init__(self, stream, boundary):
+        self.stream = stream
+        self.delimiter = b"--" + boundary
+        self._buffer = bytearray()
+
+    def _fill(self):
+        chunk = self.stream.read1(65536)
+        if not chunk: raise EOFError("end of stream")
+        self._buffer += chunk
+
+    def _until(self, marker):
+        start = 0
+        while True:
+            i = self._buffer.find(marker, start)
+            if i >= 0:
+                data = bytes(self._buffer[:i])
+                del self._buffer[:i + len(marker)]
+                return data
+            start = max(0, len(self._buffer) - len(marker) + 1)
+            self._fill()
+
+    def next_part(self):
+        """The next part's body. Raises EOFError at the end of the stream."""
+        self._until(self.delimiter)
+        headers = self._until(b"\r\n\r\n")
+        if headers.startswith(b"--"): raise EOFError("closing boundary")
+        length = None
+        for line in headers.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length": length = int(value)
+        if length is None:
+            body = self._until(b"\r\n" + self.delimiter)
+            self._buffer[:0] = self.delimiter
+            return body
+        while len(self._buffer) < length: self._fill()
+        body = bytes(self._buffer[:length])
+        del self._buffer[:length]
+        return body
+
+def read_recorded_stream(path):
+    """All JPEGs of a recorded multipart stream (the body only, as saved by curl)."""
+    with open(path, "rb") as f:
+        first = f.readline().strip()
+        if not first.startswith(b"--"): raise ValueError(f"{path} is not a recorded MJPEG stream")
+        f.seek(0)
+        parser = MultipartParser(f, first[2:])
+        jpegs = []
+        try:
+            while True: jpegs.append(parser.next_part())
+        except EOFError:
+            pass
+    return jpegs
+
+class MJPEGReader:
+    """cv2.VideoCapture-like reader for an HTTP MJPEG stream; `size` is the processing resolution.
+    `reachable` tells a refused connection (isOpened() False) from a server that answered with
+    something other than a multipart stream."""
+    def __init__(self, url, size=(640, 480), open_timeout=5.0, read_timeout=2.0):
+        self.url = url
+        self.size = size
+        self.reachable = False
+        self.jpeg = None       # last grabbed, still encoded
+        self.resolution = None # full stream resolution, from the first frame
+        self.scale = 1
+        self._flag = cv2.IMREAD_COLOR
+        self._connection = None
+        self._parser = None
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        try:
+            connection = connection_class(parts.hostname, parts.port, timeout=open_timeout)
+            connection.request("GET", (parts.path or "/") + (f"?{parts.query}" if parts.query else ""))
+            sock = connection.sock  # the connection lets go of it once a closing response is read
+            response = connection.getresponse()
+        except (OSError, http.client.HTTPException):
+            return
+        self.reachable = True
+        content_type = response.getheader("Content-Type", "")
+        boundary = content_type.partition("boundary=")[2].split(";")[0].strip().strip('"')
+        if response.status != 200 or not content_type.startswith("multipart/") or not boundary:
+            connection.close()
+            return
+        sock.settimeout(read_timeout)
+        self._connection = response
+        # Some servers write the boundary parameter with its leading dashes.
+        self._parser = MultipartParser(response, boundary[2:].encode() if boundary.startswith("--") else boundary.encode())
+
+    def isOpened(self):
+        return self._parser is not None
+
+    def get(self, prop):
+        return 0.0
+
+    def grab(self):
+        if self._parser is None: return False
+        try:
+            self.jpeg = self._parser.next_part()
+        except (EOFError, OSError, ValueError, http.client.HTTPException):
+            self.release()
+            return False
+        return True
+
+    def decode(self, jpeg):
+        """BGR frame reduced towards the processing size, or None for a corrupt JPEG."""
+        if self.resolution is None:
+            self.resolution = jpeg_size(jpeg)
+            if self.resolution: self.scale, self._flag = decode_flag(*self.resolution, self.size)
+        return cv2.imdecode(np.frombuffer(jpeg, np.uint8), self._flag)
+
+    def retrieve(self):
+        frame = self.decode(self.jpeg) if self.jpeg is not None else None
+        return frame is not None, frame
+
+    def read(self):
+        return self.retrieve() if self.grab() else (False, None)
+
+    def release(self):
+        if self._connection: self._connection.close()
+        self._connection = self._parser = None
+
+class MJPEGServer:
+    def __init__(self, video=None, host="127.0.0.1", port=0, fps=30.0, size=(640, 480), quality=80):
+        self.video = video
+        self.host = host
+        self.port = port
+        self.fps = fps
+        self.size = size
+        self.quality = quality
+        self.paused = False
+        self.frames_sent = 0
+        self.jpeg = None
+        self.frame_number = -1
+        self._cond = threading.Condition()
+        self._server = None
+        self._running = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/mjpegfeed"
+
+    def start(self):
+        server = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=" + BOUNDARY.decode())
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                server._stream(self.wfile)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self.jpeg, self.frame_number = None, -1
+        self._running.set()
+        threading.Thread(target=self._server.serve_forever, name="mjpeg-server", daemon=True).start()
+        self._producer = threading.Thread(target=self._produce, name="mjpeg-frames", daemon=True)
+        self._producer.start()
+        return self
+
+    def stop(self):
+        if not self._server: return
+        self._running.clear()
+        with self._cond: self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._producer.join()
+
+    def _pattern(self, number):
+        width, height = self.size
+        frame = np.zeros((height, width, 3), np.uint8)
+        x = number * 8 % width
+        frame[:, x:x + 40] = (0, 160, 255)
+        cv2.putText(frame, str(number), (20, height // 2), cv2.FONT_HERSHEY_SIMPLEX, 3, (255, 255, 255), 6)
+        return frame
+
+    def _produce(self):
+        recorded = read_recorded_stream(self.video) if self.video and self.video.endswith((".mjpeg", ".mjpg")) else None
+        cap = cv2.VideoCapture(self.video) if self.video and recorded is None else None
+        next_due = time.perf_counter()
+        number = 0
+        try:
+            while self._running.is_set():
+                if not self.paused and recorded:
+                    with self._cond:
+                        self.jpeg, self.frame_number = recorded[number % len(recorded)], number
+                        self._cond.notify_all()
+                    number += 1
+                elif not self.paused:
+                    if cap is not None:
+                        ret, frame = cap.read()
+                        if not ret:
+                            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                            ret, frame = cap.read()
+                            if not ret: break
+                        frame = cv2.resize(frame, self.size)
+                    else:
+                        frame = self._pattern(number)
+                    ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                    with self._cond:
+                        self.jpeg, self.frame_number = jpeg.tobytes(), number
+                        self._cond.notify_all()
+                    number += 1
+                next_due += 1.0 / self.fps
+                delay = next_due - time.perf_counter()
+                if delay > 0: time.sleep(delay)
+                else: next_due = time.perf_counter()
+        finally:
+            if cap is not None: cap.release()
+
+    def _stream(self, out):
+        last = -1
+        try:
+            while self._running.is_set():
+                with self._cond:
+                    self._cond.wait_for(lambda: self.frame_number != last or not self._running.is_set(), timeout=0.5)
+                    if self.frame_number == last: continue
+                    last, jpeg = self.frame_number, self.jpeg
+                out.write(b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(jpeg) + jpeg + b"\r\n")
+                out.flush()
+                self.frames_sent += 1
+        except (ConnectionError, OSError):
+            pass
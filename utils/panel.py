@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+
+# The feedback panel changes a few lines between frames, so it is kept as one persistent image and
+# only lines whose text or colour changed are redrawn: their rows are cleared and the line is drawn
+# again with cv2.putText. A line's rows are the ink extent of the font at its scale, measured once
+# over every printable character. Rows and overlaps depend only on the layout (line positions and
+# scales), which stays the same from frame to frame, so they are worked out once per layout. Lines
+# sharing rows with a redrawn one are redrawn with it, in drawing order, and a new layout redraws
+# everything, so the result is pixel-identical to drawing every line onto a black frame.
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+_EXTENTS = {}
+_LAYOUT_LIMIT = 64
+
+def _extent(scale):
+    """(rows above, rows below) the baseline that any printable character inks at `scale`."""
+    extent = _EXTENTS.get(scale)
+    if extent is None:
+        text = "".join(map(chr, range(32, 127)))
+        (width, height), baseline = cv2.getTextSize(text, FONT, scale, 1)
+        pad = height
+        canvas = np.zeros((height + baseline + 2 * pad, width + 2 * pad), np.uint8)
+        cv2.putText(canvas, text, (pad, pad + height), FONT, scale, 255, 1)
+        inked = np.flatnonzero(canvas.any(axis=1))
+        extent = _EXTENTS[scale] = (int(pad + height - inked[0]), int(inked[-1] + 1 - pad - height))
+    return extent
+
+class FeedbackPanel:
+    def __init__(self, size=(640, 480)):
+        self.width, self.height = size
+        self.image = np.zeros((self.height, self.width, 3), np.uint8)
+        self._items = []
+        self._layout = None
+        self._layouts = {}
+        self.changed = True  # whether the last render() altered the image
+
+    def invalidate(self):
+        """Forget what is on the panel, e.g. after the display was blanked."""
+        self.image[:] = 0
+        self._items = []
+        self._layout = None
+        self.changed = True
+
+    def _bands(self, layout):
+        """(rows, overlaps) for a layout: each line's (top, bottom) rows on the panel, and the other
+        lines whose rows it shares."""
+        cached = self._layouts.get(layout)
+        if cached is None:
+            rows = []
+            for (x, y), scale in layout:
+                above, below = _extent(scale)
+                rows.append((max(y - above, 0), min(max(y + below, 0), self.height)))
+            overlaps = [tuple(j for j, (other_top, other_bottom) in enumerate(rows) if j != i and top < other_bottom and other_top < bottom and top < bottom)
+                        for i, (top, bottom) in enumerate(rows)]
+            if len(self._layouts) >= _LAYOUT_LIMIT: self._layouts.clear()
+            cached = self._layouts[layout] = (rows, overlaps)
+        return cached
+
+    def render(self, items):
+        """`items` are (text, origin, font scale, colour) tuples in drawing order. Returns the
+        panel image, which is the same array every call; `changed` tells whether it was touched."""
+        old = self._items
+        if items == old:
+            self.changed = False
+            return self.image
+        self.changed = True
+        image = self.image
+        layout = tuple((item[1], item[2]) for item in items)
+        self._items = list(items)
+        if layout != self._layout:
+            self._layout = layout
+            image[:] = 0
+            for text, origin, scale, color in items:
+                cv2.putText(image, text, origin, FONT, scale, color, 1)
+            return image
+
+        rows, overlaps = self._bands(layout)
+        redraw = [old_item != item for old_item, item in zip(old, items)]
+        pending = [i for i, new in enumerate(redraw) if new]
+        while pending:
+            for j in overlaps[pending.pop()]:
+                if not redraw[j]:
+                    redraw[j] = True
+                    pending.append(j)
+        for (top, bottom), new in zip(rows, redraw):
+            if new: image[top:bottom] = 0
+        for item, new in zip(items, redraw):
+            if new: cv2.putText(image, item[0], item[1], FONT, item[2], item[3], 1)
+        return image
@@ -0,0 +1,156 @@
+import threading
+import time
+import cv2
+from utils.profiler import NULL_PROFILER
+
+END_OF_STREAM = "end_of_stream"
+SOURCE_ERROR = "source_error"
+
+class LatestQueue:
+    """Single-slot hand-off between pipeline stages. A new item replaces any unread one."""
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._full = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._full: self.dropped += 1
+            self._item, self._full = item, True
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._full: self._cond.wait(timeout)
+            return self._take()
+
+    def get_nowait(self):
+        with self._cond:
+            return self._take()
+
+    def wait_empty(self, timeout=None):
+        """True once the last item has been taken (or was never there)."""
+        with self._cond:
+            if self._full: self._cond.wait(timeout)
+            return not self._full
+
+    def _take(self):
+        if not self._full: return None
+        item, self._item, self._full = self._item, None, False
+        self._cond.notify_all()
+        return item
+
+class FramePipeline:
+    """Capture thread -> inference thread -> consumer, each stage keeping only the newest item.
+
+    `open_source` is called on the capture thread and returns a cv2.VideoCapture-like object.
+    `process(image, frame_time, frame_index, captured_at)` runs on the inference thread; its return value is
+    published together with the capture timestamp and the frame on `results`.
+    A source may also define `finished` (False while a file source has no frame yet, e.g. a paused
+    replay), `paced` (True if read() already keeps time) and `lossless` (True if no frame may be
+    dropped before inference: capture then waits for the inference stage instead). A source with a
+    `captured_at` attribute (VideoSource) supplies the capture time of the frame it just returned.
+    A source with `read_encoded()` may return frames still encoded; those are decoded on the inference
+    thread, so a frame replaced in the queue is never decoded at all.
+    """
+    def __init__(self, open_source, process, is_file=False, size=(640, 480), profiler=NULL_PROFILER):
+        self.open_source = open_source
+        self.profiler = profiler
+        self.process = process
+        self.is_file = is_file
+        self.size = size
+        self.fps = 30.0
+        self.source = None
+        self.frames = LatestQueue()
+        self.results = LatestQueue()
+        self._stop = threading.Event()
+        self._capture_thread = threading.Thread(target=self._capture, name="capture", daemon=True)
+        self._inference_thread = threading.Thread(target=self._infer, name="inference", daemon=True)
+
+    @property
+    def frame_period(self):
+        return 1.0 / self.fps
+
+    def start(self):
+        self._capture_thread.start()
+        self._inference_thread.start()
+        return self
+
+    def stop(self):
+        """Signals both stages without waiting for them; `stopped` tells when they have exited."""
+        self._stop.set()
+
+    @property
+    def stopped(self):
+        """True once no frame is mid-flight: the inference stage has exited (or never started)."""
+        return not self._inference_thread.is_alive()
+
+    def _capture(self):
+        cap = self.source = self.open_source()
+        if cap is None or not cap.isOpened():
+            self.frames.put(SOURCE_ERROR)
+            return
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if 1.0 <= fps <= 240.0: self.fps = fps
+        paced = self.is_file and not getattr(cap, "paced", False)
+        lossless = getattr(cap, "lossless", False)
+        read_encoded = getattr(cap, "read_encoded", None)
+
+        next_due = time.perf_counter()
+        frame_index = -1
+        try:
+            while not self._stop.is_set():
+                decode = None
+                with self.profiler.stage("capture"):
+                    if read_encoded: ret, frame, decode = read_encoded()
+                    else: ret, frame = cap.read()
+                if not ret:
+                    if self.is_file and getattr(cap, "finished", True):
+                        if lossless and not self._wait_for_inference(): return
+                        self.frames.put(END_OF_STREAM)
+                        return
+                    time.sleep(0.005)
+                    continue
+                frame_index += 1
+                captured_at = getattr(cap, "captured_at", None) or time.perf_counter()
+                if decode is not None:
+                    image = (frame, decode)
+                else:
+                    with self.profiler.stage("resize"):
+                        image = cv2.resize(frame, self.size)
+                if lossless and not self._wait_for_inference(): return
+                self.frames.put((captured_at, frame_index, image))
+
+                # Files decode faster than real time, so pace them at their native rate.
+                if paced:
+                    next_due += self.frame_period
+                    if next_due < captured_at - self.frame_period: next_due = captured_at
+                    delay = next_due - time.perf_counter()
+                    if delay > 0: time.sleep(delay)
+        finally:
+            cap.release()
+
+    def _wait_for_inference(self):
+        while not self.frames.wait_empty(0.1):
+            if self._stop.is_set(): return False
+        return True
+
+    def _infer(self):
+        last_started = None
+        while not self._stop.is_set():
+            item = self.frames.get(timeout=0.1)
+            if item is None: continue
+            if item is END_OF_STREAM or item is SOURCE_ERROR:
+                self.results.put(item)
+                return
+            captured_at, frame_index, image = item
+            if isinstance(image, tuple):
+                with self.profiler.stage("resize"):
+                    frame = image[1](image[0])
+                    if frame is None: continue
+                    image = cv2.resize(frame, self.size)
+            started = time.perf_counter()
+            frame_time = started - last_started if last_started is not None else self.frame_period
+            last_started = started
+            self.results.put((captured_at, image, self.process(image, frame_time, frame_index, captured_at)))
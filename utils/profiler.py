@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+
+# Per-stage timing for the frame pipeline. When disabled, stage() hands back one shared no-op
+# context manager, so instrumented code pays a method call and nothing else.
+
+class _NullStage:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+class StageProfiler:
+    """Rolling p50/p95/p99 per stage plus a bounded buffer of Chrome trace events."""
+    def __init__(self, enabled=False, window=600, trace_capacity=200000, overlay=True):
+        self.enabled = enabled
+        self.overlay = overlay
+        self.window = window
+        self._samples = {}
+        self._events = deque(maxlen=trace_capacity)
+        self._thread_names = {}
+        self._last = {}
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+
+    def stage(self, name):
+        return _Stage(self, name) if self.enabled else _NULL_STAGE
+
+    def record(self, name, start_ns, end_ns):
+        """Adds one timed span; also usable for spans that cross threads (e.g. capture-to-display)."""
+        if not self.enabled: return
+        thread = threading.current_thread()
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(end_ns - start_ns)
+            self._last[name] = end_ns - start_ns
+            self._events.append((name, thread.ident, start_ns, end_ns - start_ns))
+            self._thread_names.setdefault(thread.ident, thread.name)
+
+    def last_ms(self, names):
+        """Most recent duration of each named stage in milliseconds (NaN if never recorded)."""
+        last = self._last
+        return [last[name] / 1e6 if name in last else float("nan") for name in names]
+
+    def percentiles(self):
+        """{stage: (p50, p95, p99, count)} in milliseconds over the rolling window."""
+        with self._lock:
+            snapshot = {name: np.fromiter(samples, dtype=np.int64) for name, samples in self._samples.items() if samples}
+        return {name: tuple(np.percentile(values, (50, 95, 99)) / 1e6) + (len(values),) for name, values in snapshot.items()}
+
+    def summary_lines(self):
+        return [f"{name:<14} p50 {p50:6.2f}  p95 {p95:6.2f}  p99 {p99:6.2f} ms"
+                for name, (p50, p95, p99, _) in sorted(self.percentiles().items())]
+
+    def draw_overlay(self, frame):
+        """Returns `frame` untouched when the overlay is off, else a copy with the stage table."""
+        if not (self.enabled and self.overlay): return frame
+        frame = frame.copy()
+        lines = self.summary_lines()
+        y = frame.shape[0] - 10 - 16 * len(lines)
+        for line in lines:
+            cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_PLAIN, 0.9, (0, 255, 255), 1)
+            y += 16
+        return frame
+
+    def dump_chrome_trace(self, path):
+        """Writes the buffered spans as Chrome trace-event JSON (chrome://tracing, Perfetto)."""
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        pid = os.getpid()
+        trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}} for tid, name in thread_names.items()]
+        trace += [{"name": name, "ph": "X", "pid": pid, "tid": tid, "ts": (start - self._origin_ns) / 1000, "dur": duration / 1000}
+                  for name, tid, start, duration in events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+        print(f"✅ Profiler trace saved: {path}")
+
+NULL_PROFILER = StageProfiler(enabled=False)
@@ -0,0 +1,181 @@
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+import cv2
+
+# Session recording off the frame path. record_frame() only enqueues; a writer thread encodes,
+# places each frame by its capture timestamp on a constant-rate timeline (repeating or skipping
+# frames as needed, so playback speed matches real time) and rotates into fixed-length segments.
+# index.json lists every closed segment and is rewritten atomically after each one, so a crash
+# loses at most the segment being written. stop() does not wait for the writer either: it drains
+# the queue and closes the recording in the background, and join() waits for that at exit.
+
+class _Recording:
+    """One recording's queue, writer thread and counters, so a recording that is still being
+    finished does not share them with the next one."""
+    def __init__(self, session_dir, queue_size):
+        self.session_dir = session_dir
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stopping = threading.Event()
+        self.thread = None
+        self.frames_queued = 0
+        self.frames_dropped = 0     # never reached the encoder (queue full)
+        self.frames_written = 0     # frames in the output, including repeats
+        self.frames_repeated = 0    # written more than once to fill a timing gap
+        self.frames_skipped = 0     # arrived before their slot on the timeline was due
+
+class Recorder:
+    def __init__(self, root="recordings", fps=20.0, segment_seconds=60, queue_size=32, drop_policy="oldest", fourcc="MJPG"):
+        if drop_policy not in ("oldest", "newest"):
+            raise ValueError(f"drop_policy must be 'oldest' or 'newest', got {drop_policy!r}")
+        self.root = root
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.fourcc = fourcc
+        self.session_dir = None
+        self._recording = None
+        self._finishing = []        # writer threads of stopped recordings
+        self._lock = threading.Lock()
+
+    @property
+    def is_recording(self):
+        return self._recording is not None
+
+    def start(self, frame, fps=None):
+        """`fps` is the output timeline rate; pass the measured source rate when it is known."""
+        if frame is None or frame.shape[0] == 0 or frame.shape[1] == 0:
+            print("❌ Cannot start recording: invalid frame.")
+            return
+        with self._lock:
+            if self._recording: return
+            timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            self.session_dir = os.path.join(self.root, f"recording_{timestamp}")
+            suffix = 1
+            while os.path.exists(self.session_dir):
+                suffix += 1
+                self.session_dir = os.path.join(self.root, f"recording_{timestamp}_{suffix}")
+            os.makedirs(self.session_dir)
+            recording = _Recording(self.session_dir, self.queue_size)
+            height, width = frame.shape[:2]
+            recording.thread = threading.Thread(target=self._write_loop, args=(recording, (width, height), fps or self.fps),
+                                                name="recorder", daemon=True)
+            recording.thread.start()
+            self._recording = recording
+        print(f"✅ Recording started: {self.session_dir}")
+
+    def record_frame(self, frame, timestamp=None):
+        """Never blocks. `timestamp` is a time.perf_counter() value, ideally the capture time."""
+        recording = self._recording
+        if recording is None or frame is None: return
+        q = recording.queue
+        item = (time.perf_counter() if timestamp is None else timestamp, frame)
+        try:
+            q.put_nowait(item)
+        except queue.Full:
+            if self.drop_policy == "newest":
+                recording.frames_dropped += 1
+                return
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+            recording.frames_dropped += 1
+            try:
+                q.put_nowait(item)
+            except queue.Full:
+                recording.frames_dropped += 1
+                return
+        recording.frames_queued += 1
+
+    def stop(self):
+        """Ends the recording without waiting: the writer encodes what is queued, closes the last
+        segment and reports on its own thread."""
+        with self._lock:
+            recording, self._recording = self._recording, None
+            if not recording: return
+            recording.stopping.set()
+            self._finishing = [thread for thread in self._finishing if thread.is_alive()] + [recording.thread]
+
+    def join(self):
+        """Waits until every stopped recording is on disk; call before the process exits."""
+        with self._lock:
+            finishing, self._finishing = self._finishing, []
+        for thread in finishing: thread.join()
+
+    def _write_loop(self, recording, size, fps):
+        q, session_dir = recording.queue, recording.session_dir
+        segment_frames = max(1, int(round(self.segment_seconds * fps)))
+        index = {"fps": fps, "size": list(size), "started": datetime.datetime.now().isoformat(timespec="seconds"), "segments": []}
+        writer = None
+        segment_start = 0  # timeline slot of the open segment's first frame
+        first_timestamp = None
+        slot = 0           # next slot on the output timeline
+        last_frame = None
+
+        def open_segment():
+            path = os.path.join(session_dir, f"segment_{len(index['segments']):04d}.avi")
+            w = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), fps, size)
+            if not w.isOpened():
+                print(f"❌ VideoWriter failed to open {path}.")
+                return None, path
+            return w, path
+
+        def close_segment(w, path):
+            w.release()
+            index["segments"].append({"file": os.path.basename(path), "start": segment_start / fps,
+                                      "duration": (slot - segment_start) / fps, "frames": slot - segment_start})
+            tmp_path = os.path.join(session_dir, "index.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(index, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(session_dir, "index.json"))
+
+        def write(frame):
+            nonlocal writer, path, segment_start, slot
+            if writer is None:
+                segment_start = slot
+                writer, path = open_segment()
+                if writer is None: return False
+            writer.write(frame)
+            slot += 1
+            recording.frames_written += 1
+            if slot - segment_start >= segment_frames:
+                close_segment(writer, path)
+                writer = None
+            return True
+
+        path = None
+        failed = False
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                if recording.stopping.is_set(): break
+                continue
+            if failed:
+                # Keep draining so record_frame() never waits on a dead writer.
+                recording.frames_dropped += 1
+                continue
+            timestamp, frame = item
+            if frame.shape[1::-1] != size: frame = cv2.resize(frame, size)
+            if first_timestamp is None: first_timestamp = timestamp
+            due = int(round((timestamp - first_timestamp) * fps))
+            if due < slot and last_frame is not None:
+                recording.frames_skipped += 1
+                continue
+            # Fill any gap with the previous frame so the video keeps real-time pacing.
+            while last_frame is not None and slot < due and not failed:
+                failed = not write(last_frame)
+                recording.frames_repeated += not failed
+            failed = failed or not write(frame)
+            last_frame = frame
+        if writer is not None and slot > segment_start:
+            close_segment(writer, path)
+        print(f"✅ Recording saved: {session_dir} ({recording.frames_written} frames written, "
+              f"{recording.frames_dropped} dropped, {recording.frames_repeated} repeated, {recording.frames_skipped} skipped)")
@@ -1,14 +1,14 @@
 from utils.functions import *
-from collections import deque
+from utils.exercises import EXERCISE_REGISTRY, DYNAMIC_ANGLES
+from utils.features import STATIC_JOINTS
+from utils.summary import SessionSummary
+from collections import Counter, deque
 import numpy as np
 
 class RepetitionCounter:
-    def __init__(self):
-        from collections import deque
-        self.elbow_hist_r = deque(maxlen=15)
-        self.elbow_hist_l = deque(maxlen=15)
-        self.shoulder_hist_r = deque(maxlen=15)
-        self.shoulder_hist_l = deque(maxlen=15)
+    def __init__(self, recent_scores=100, spill_path=None):
+        # Recent values of each dynamic angle, in the order of the `angles` tuple.
+        self.angle_hists = tuple(deque(maxlen=15) for _ in DYNAMIC_ANGLES)
 
         self.stage_right = None
         self.stage_left = None
@@ -18,10 +18,7 @@ class RepetitionCounter:
         self.left_phase = "idle"
         self.hull_phase = "idle"  # can be 'down', 'up', or 'idle'
 
-        self.raw_reps = {
-            "hammer_curl": 0,
-            "overhead_press": 0
-        }
+        self.raw_reps = dict.fromkeys(EXERCISE_REGISTRY, 0)
         self.raw_right_phase = "idle"
         self.raw_left_phase = "idle"
 
@@ -31,135 +28,108 @@ class RepetitionCounter:
         # New attributes for scoring
         self.last_score = {}
         self.rep_data = self._reset_rep_data()
-        self.all_scores = []
+        # Scores of the most recent reps (all of them with recent_scores=None); the session-wide
+        # view is the running aggregates in self.session.
+        self.all_scores = deque(maxlen=recent_scores)
+        self.session = SessionSummary(spill_path)
 
     def _reset_rep_data(self):
-        """Resets the data collector for a new repetition."""
+        """Resets the data collector for a new repetition. Only running min/max/count/sum and the
+        set of flagged keypoints are kept, so a stalled rep costs no more memory than a short one."""
         return {
-            'elbow_r': {'up': [], 'down': []}, 'elbow_l': {'up': [], 'down': []},
-            'shoulder_r': {'up': [], 'down': []}, 'shoulder_l': {'up': [], 'down': []},
-            'hull_area': {'up': [], 'down': []},
-            'wrist_dist': [],
-            'static_angles': {
-                'knee_r': [], 'knee_l': [],
-                'hip_r': [], 'hip_l': [],
-                'shoulder_r': [], 'shoulder_l': []
-            },
-            'feedback': [],
-            'frame_times': []
+            **{name: {'up': RunningStats(), 'down': RunningStats()} for name in DYNAMIC_ANGLES},
+            'hull_area': {'up': RunningStats(), 'down': RunningStats()},
+            'wrist_dist': RunningStats(),
+            'static_angles': {joint: RunningStats() for joint in STATIC_JOINTS},
+            'problem_keypoints': Counter(),
+            'frame_times': RunningStats()
         }
 
     def reset_summary(self):
         """Clears the summary data."""
-        self.all_scores = []
-
-    def detect_exercise(self, shoulder_r, shoulder_l, all_thresholds):
-        avg_sr = sum(self.shoulder_hist_r) / len(self.shoulder_hist_r) if self.shoulder_hist_r else 0
-        avg_sl = sum(self.shoulder_hist_l) / len(self.shoulder_hist_l) if self.shoulder_hist_l else 0
-
-        hc_detect = all_thresholds.get("hammer_curl", {}).get("detection", {})
-        op_detect = all_thresholds.get("overhead_press", {}).get("detection", {})
+        self.all_scores.clear()
+        self.session.reset()
 
-        if hc_detect and in_range(avg_sr, *hc_detect["shoulder_static"]) and \
-           in_range(avg_sl, *hc_detect["shoulder_static"]):
-            self.current_exercise = "hammer_curl"
-        elif op_detect and in_range(avg_sr, *op_detect["shoulder_down"]) and \
-             in_range(avg_sl, *op_detect["shoulder_down"]):
-            self.current_exercise = "overhead_press"
-        else:
-            self.current_exercise = "unknown"
+    def reset_reps(self):
+        """Clears the rep counts, the phases and the summary."""
+        for name in self.raw_reps: self.raw_reps[name] = 0
+        self.right_phase = "idle"
+        self.left_phase = "idle"
+        self.stage_right = None
+        self.stage_left = None
+        self.raw_right_phase = "idle"
+        self.raw_left_phase = "idle"
+        self.reset_summary()
+
+    def detect_exercise(self, all_thresholds):
+        # Averages of the recent angles the detection ranges look at.
+        hists = self.angle_hists
+        index = all_thresholds.detection_index
+        averages = {angle: sum(hists[angle]) / len(hists[angle]) if hists[angle] else 0 for angle in index.angles}
+        self.current_exercise = index.lookup(averages)
         return self.current_exercise
 
-    def update_angles(self, elbow_r, elbow_l, shoulder_r, shoulder_l):
-        self.elbow_hist_r.append(elbow_r)
-        self.shoulder_hist_r.append(shoulder_r)
-        self.elbow_hist_l.append(elbow_l)
-        self.shoulder_hist_l.append(shoulder_l)
+    def update_angles(self, *angles):
+        for hist, angle in zip(self.angle_hists, angles): hist.append(angle)
     
     def get_raw_reps(self, exercise_name):
         return self.raw_reps.get(exercise_name, 0)
 
     def count_repetitions(self, angles, wrist_dist, hull_area, all_thresholds, gender_thresholds, joint_angles, feedback_list, frame_time):
-        
-        elbow_r, elbow_l, shoulder_r, shoulder_l = angles
         stage_r, stage_l = None, None
         completed = False
         rep_summary = {}
 
         # Load dynamic thresholds for the current exercise
-        exercise_thresholds = all_thresholds.get(self.current_exercise, {})
-        dynamic_thresholds = exercise_thresholds.get("dynamic_angles", {})
+        exercise_thresholds = all_thresholds.exercises.get(self.current_exercise)
+        dynamic_thresholds = exercise_thresholds.dynamic if exercise_thresholds else None
         if not dynamic_thresholds:
              return self.stage_right, self.stage_left, completed, rep_summary
         
-        static_tolerance = all_thresholds.get("global_config", {}).get("static_angle_tolerance", 12)
+        global_config = all_thresholds.global_config
+        static_tolerance = global_config.static_angle_tolerance
 
         # --- NEW: Strict validation for all parameters ---
         wrist_ok = False
         static_ok = False
         if gender_thresholds:
             # Check wrist distance
-            wrist_range = gender_thresholds.get("wrist_distance")
+            wrist_range = gender_thresholds.wrist_distance
             if wrist_range:
                 wrist_ok = in_range(wrist_dist, *wrist_range)
             
             # Check static angles
-            ref_static_angles = gender_thresholds.get("static_angles", {})
-            static_feedback = check_static_angles(joint_angles, ref_static_angles, static_tolerance)
+            static_feedback = check_static_angles(joint_angles, gender_thresholds.static_angles, static_tolerance)
             static_ok = all(item[0] for item in static_feedback.values()) if static_feedback else True
 
         frame_is_valid = wrist_ok and static_ok
 
-        if self.current_exercise == "hammer_curl":
-            elbow_stage_r_hc = detect_stage(elbow_r, dynamic_thresholds["elbow_up"], dynamic_thresholds["elbow_down"])
-            elbow_stage_l_hc = detect_stage(elbow_l, dynamic_thresholds["elbow_up"], dynamic_thresholds["elbow_down"])
-            shoulder_stage_r_hc = detect_stage(shoulder_r, dynamic_thresholds["shoulder_up"], dynamic_thresholds["shoulder_down"])
-            shoulder_stage_l_hc = detect_stage(shoulder_l, dynamic_thresholds["shoulder_up"], dynamic_thresholds["shoulder_down"])
-            
-            ch_thresholds = gender_thresholds.get("convex_hull", {})
-            if not hasattr(self, 'hull_phase'): self.hull_phase = "idle"
-            if ch_thresholds and in_range(hull_area, *ch_thresholds.get("down", (0, 0))): self.hull_phase = "down"
-            elif self.hull_phase == "down" and ch_thresholds and in_range(hull_area, *ch_thresholds.get("up", (0, float("inf")))): self.hull_phase = "up"
-            
-            stage_r = "up" if elbow_stage_r_hc == "up" or shoulder_stage_r_hc == "up" else "down" if elbow_stage_r_hc == "down" and shoulder_stage_r_hc == "down" else None
-            stage_l = "up" if elbow_stage_l_hc == "up" or shoulder_stage_l_hc == "up" else "down" if elbow_stage_l_hc == "down" and shoulder_stage_l_hc == "down" else None
-
-        elif self.current_exercise == "overhead_press":
-            shoulder_stage_r_ov = detect_stage(shoulder_r, dynamic_thresholds["shoulder_up"], dynamic_thresholds["shoulder_down"])
-            shoulder_stage_l_ov = detect_stage(shoulder_l, dynamic_thresholds["shoulder_up"], dynamic_thresholds["shoulder_down"])
-            elbow_stage_r_ov = detect_stage(elbow_r, dynamic_thresholds["elbow_up"], dynamic_thresholds["elbow_down"])
-            elbow_stage_l_ov = detect_stage(elbow_l, dynamic_thresholds["elbow_up"], dynamic_thresholds["elbow_down"])
+        if exercise_thresholds.stage_joints:
+            right_joints, left_joints = exercise_thresholds.stage_joints
+            stage_rule = exercise_thresholds.stage_rule
+            stage_r = stage_rule([detect_stage(angles[index], up, down) for index, up, down in right_joints])
+            stage_l = stage_rule([detect_stage(angles[index], up, down) for index, up, down in left_joints])
 
-            ch_thresholds = gender_thresholds.get("convex_hull", {})
-            if not hasattr(self, 'hull_phase'): self.hull_phase = "idle"
+            ch_thresholds = gender_thresholds.convex_hull if gender_thresholds else None
             if ch_thresholds and in_range(hull_area, *ch_thresholds.get("down", (0, 0))): self.hull_phase = "down"
             elif self.hull_phase == "down" and ch_thresholds and in_range(hull_area, *ch_thresholds.get("up", (0, float("inf")))): self.hull_phase = "up"
-            
-            stage_r = shoulder_stage_r_ov if shoulder_stage_r_ov == elbow_stage_r_ov and shoulder_stage_r_ov is not None else None
-            stage_l = shoulder_stage_l_ov if shoulder_stage_l_ov == elbow_stage_l_ov and shoulder_stage_l_ov is not None else None
         else:
             stage_r = stage_l = None
 
         current_stage = self.stage_right
         if current_stage in ['up', 'down']:
-            self.rep_data['elbow_r'][current_stage].append(elbow_r)
-            self.rep_data['elbow_l'][current_stage].append(elbow_l)
-            self.rep_data['shoulder_r'][current_stage].append(shoulder_r)
-            self.rep_data['shoulder_l'][current_stage].append(shoulder_l)
-            self.rep_data['hull_area'][current_stage].append(hull_area)
-            self.rep_data['wrist_dist'].append(wrist_dist)
-            self.rep_data['feedback'].extend(feedback_list)
-            self.rep_data['frame_times'].append(frame_time)
+            for name, angle in zip(DYNAMIC_ANGLES, angles): self.rep_data[name][current_stage].add(angle)
+            self.rep_data['hull_area'][current_stage].add(hull_area)
+            self.rep_data['wrist_dist'].add(wrist_dist)
+            self.rep_data['problem_keypoints'].update(msg.split(':')[0].strip() for msg in feedback_list if "ADJUST" in msg or "REMAIN" in msg)
+            self.rep_data['frame_times'].add(frame_time)
             
+            static_joints = exercise_thresholds.static_joints
             for joint, angle in joint_angles.items():
-                if joint in self.rep_data['static_angles']:
-                    if 'shoulder' in joint:
-                        if self.current_exercise == 'hammer_curl':
-                            self.rep_data['static_angles'][joint].append(angle)
-                    else:
-                        self.rep_data['static_angles'][joint].append(angle)
+                if joint in self.rep_data['static_angles'] and joint in static_joints:
+                    self.rep_data['static_angles'][joint].add(angle)
         
-        bad_frame_max = all_thresholds.get("global_config", {}).get("bad_frame_tolerance", 5)
+        bad_frame_max = global_config.bad_frame_tolerance
 
         if stage_r:
             self.stage_right = stage_r
@@ -178,19 +148,18 @@ class RepetitionCounter:
             else: self.stage_left = None
 
         # --- MODIFIED STATE MACHINE (Strict) ---
-        if frame_is_valid:
-            if self.current_exercise in ["overhead_press", "hammer_curl"]:
-                if self.right_phase == "idle" and self.stage_right == "down" and self.hull_phase == "down": self.right_phase = "down_prep"
-                elif self.right_phase == "down_prep" and self.stage_right == "up" and self.hull_phase == "up": self.right_phase = "up"
-                elif self.right_phase == "up" and self.stage_right == "down" and self.hull_phase == "down": self.right_phase = "done"
-
-                if self.left_phase == "idle" and self.stage_left == "down" and self.hull_phase == "down": self.left_phase = "down_prep"
-                elif self.left_phase == "down_prep" and self.stage_left == "up" and self.hull_phase == "up": self.left_phase = "up"
-                elif self.left_phase == "up" and self.stage_left == "down" and self.hull_phase == "down": self.left_phase = "done"
-
-                if self.right_phase == "done" and self.left_phase == "done":
-                    completed = True
-                    self.right_phase, self.left_phase = "idle", "idle"
+        if frame_is_valid and self.current_exercise in self.raw_reps:
+            if self.right_phase == "idle" and self.stage_right == "down" and self.hull_phase == "down": self.right_phase = "down_prep"
+            elif self.right_phase == "down_prep" and self.stage_right == "up" and self.hull_phase == "up": self.right_phase = "up"
+            elif self.right_phase == "up" and self.stage_right == "down" and self.hull_phase == "down": self.right_phase = "done"
+
+            if self.left_phase == "idle" and self.stage_left == "down" and self.hull_phase == "down": self.left_phase = "down_prep"
+            elif self.left_phase == "down_prep" and self.stage_left == "up" and self.hull_phase == "up": self.left_phase = "up"
+            elif self.left_phase == "up" and self.stage_left == "down" and self.hull_phase == "down": self.left_phase = "done"
+
+            if self.right_phase == "done" and self.left_phase == "done":
+                completed = True
+                self.right_phase, self.left_phase = "idle", "idle"
         
         if self.current_exercise in self.raw_reps:
             if self.raw_right_phase == "idle" and self.stage_right == "down": self.raw_right_phase = "down_prep"
@@ -206,15 +175,15 @@ class RepetitionCounter:
                 
                 if gender_thresholds:
                     self.last_score = calculate_repetition_score(
-                        self.rep_data, gender_thresholds, dynamic_thresholds, self.current_exercise, all_thresholds.get("global_config", {})
+                        self.rep_data, gender_thresholds, exercise_thresholds, global_config
                     )
                     self.all_scores.append({'exercise': self.current_exercise, 'scores': self.last_score})
+                    self.session.add(self.current_exercise, self.last_score)
 
-                    problem_keypoints = {msg.split(':')[0].strip() for msg in self.rep_data.get('feedback', []) if "ADJUST" in msg or "REMAIN" in msg}
-                    feedback_str = "; ".join(sorted(list(problem_keypoints)))
+                    feedback_str = "; ".join(sorted(self.rep_data['problem_keypoints']))
                     
-                    frame_times = self.rep_data.get('frame_times', [])
-                    avg_fps = (1 / np.mean(frame_times)) if frame_times and np.mean(frame_times) > 0 else 0
+                    frame_times = self.rep_data['frame_times']
+                    avg_fps = (1 / frame_times.mean()) if frame_times and frame_times.mean() > 0 else 0
                     
                     rep_summary = {'scores': self.last_score, 'feedback': feedback_str, 'fps': avg_fps}
                     self.rep_data = self._reset_rep_data()
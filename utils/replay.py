@@ -0,0 +1,134 @@
+import threading
+import time
+import cv2
+import numpy as np
+from utils.analysis import analyze_landmarks
+from utils.repetition import RepetitionCounter
+from utils.exercises import new_counters
+from utils.session_file import SessionReader
+
+# Replay of a .straps session file (utils/session_file.py) through the normal feature, feedback and
+# counting path, without pose estimation. ReplayCapture stands in for cv2.VideoCapture in the frame
+# pipeline and hands over every frame (nothing is dropped, so fast-forward counts the same as real
+# time) together with its stored landmarks and frame time, which makes a recorded counting problem
+# reproducible frame by frame.
+
+SPEEDS = (1.0, 2.0, 4.0, 8.0, 0.0)  # 0: as fast as the analysis runs
+BACKLOG = 64                         # frames handed to the pipeline but not yet analysed
+
+class ReplayControl:
+    """Playback state shared by the GUI (or service) and the capture thread."""
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.paused = False
+        self._steps = 0
+        self._lock = threading.Lock()
+
+    def next_speed(self):
+        self.speed = SPEEDS[(SPEEDS.index(self.speed) + 1) % len(SPEEDS)] if self.speed in SPEEDS else SPEEDS[0]
+        return self.speed
+
+    def step(self, frames=1):
+        """Advances a paused replay by `frames` frames."""
+        with self._lock:
+            self._steps += frames
+
+    def take_step(self):
+        with self._lock:
+            if not self._steps: return False
+            self._steps -= 1
+            return True
+
+def speed_label(speed):
+    return f"{speed:g}x" if speed else "Max"
+
+class ReplayCapture:
+    """cv2.VideoCapture-like source playing a session file on its recorded timeline. Frames are the
+    session's thumbnails (the latest one at or before each row) or a black canvas."""
+    paced = True
+    lossless = True
+
+    def __init__(self, path, control=None, size=(640, 480)):
+        self.reader = SessionReader(path)
+        self.control = control or ReplayControl()
+        self.size = size
+        self.gender = self.reader.metadata.get("gender")
+        # Landmarks recorded with the filter on are already smoothed.
+        self.filtered = bool(self.reader.metadata.get("landmark_filter"))
+        self.finished = False
+        self._row = 0
+        self._columns = None
+        self._chunk = (0, 0)
+        self._thumbnails = {}
+        self._background = np.zeros((size[1], size[0], 3), np.uint8)
+        self._clock = None  # (wall time, session time, speed) the current pacing is measured from
+        self._pending = {}  # pipeline frame index -> (landmarks, frame_time)
+        self._reads = 0
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS and self.reader.duration > 0:
+            return (len(self.reader) - 1) / self.reader.duration
+        return 0.0
+
+    def release(self):
+        self.reader.close()
+
+    def _load(self, row):
+        for offset, first_row, rows, _, _ in self.reader.chunks:
+            if first_row <= row < first_row + rows: break
+        self._columns = self.reader.read(first_row, first_row + rows)
+        self._chunk = (first_row, first_row + rows)
+        self._thumbnails = {thumb_row: cv2.resize(image, self.size) for thumb_row, _, image in self.reader.thumbnails(first_row, first_row + rows)}
+
+    def read(self):
+        if self._row >= len(self.reader):
+            self.finished = True
+            return False, None
+        if not self._chunk[0] <= self._row < self._chunk[1]: self._load(self._row)
+        i = self._row - self._chunk[0]
+        t = float(self._columns["t"][i])
+
+        control = self.control
+        if control.paused:
+            self._clock = None
+            if not control.take_step():
+                time.sleep(0.01)
+                return False, None
+        elif control.speed:
+            now = time.perf_counter()
+            if self._clock is None or self._clock[2] != control.speed: self._clock = (now, t, control.speed)
+            wait = self._clock[0] + (t - self._clock[1]) / control.speed - now
+            # Short sleeps keep pause and speed changes responsive.
+            if wait > 0:
+                time.sleep(min(wait, 0.02))
+                return False, None
+        else:
+            self._clock = None
+
+        self._background = self._thumbnails.get(self._row, self._background)
+        self._pending[self._reads] = (self._columns["landmarks"][i], float(self._columns["frame_time"][i]))
+        self._pending.pop(self._reads - BACKLOG, None)
+        self._reads += 1
+        self._row += 1
+        return True, self._background
+
+    def frame(self, frame_index):
+        """(landmarks, frame_time) recorded for the pipeline's `frame_index`-th frame."""
+        return self._pending.pop(frame_index, (None, None))
+
+def replay_session(path, thresholds, gender=None, counter=None, landmark_filter=None):
+    """Runs a session file through analyze_landmarks as fast as possible with the recorded frame
+    times. Returns the RepetitionCounter and the correct reps per exercise."""
+    counter = counter or RepetitionCounter()
+    counts = new_counters()
+    with SessionReader(path) as reader:
+        gender = gender or reader.metadata.get("gender", "male")
+        if reader.metadata.get("landmark_filter"): landmark_filter = None
+        columns = reader.read()
+        for landmarks, frame_time in zip(columns.get("landmarks", ()), columns.get("frame_time", ())):
+            analysis = analyze_landmarks(landmarks, counter, thresholds, gender, float(frame_time), landmark_filter=landmark_filter)
+            if analysis.completed and analysis.current_exercise in counts: counts[analysis.current_exercise] += 1
+    return counter, counts
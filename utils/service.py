@@ -0,0 +1,294 @@
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+from urllib.parse import urlsplit, parse_qs
+import cv2
+import numpy as np
+from utils.replay import ReplayControl, SPEEDS
+
+# Service mode: run_main_loop driven by asyncio instead of Tk, for headless boxes and tablets.
+# ServiceFrontEnd stands in for the GUI object (state flags, update_frames/update_info and a
+# `root.after` backed by the event loop), so inference, counting, logging and recording run
+# through exactly the same path as the desktop app. Annotated frames are JPEG-encoded only while
+# a stream client is connected, once per frame however many are watching; rep, stage and counter
+# events go to every WebSocket subscriber. Only stdlib asyncio is used, bound to localhost.
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B85"
+CLIENT_QUEUE = 64
+JPEG_QUALITY = 80
+INDEX_HTML = b"""<!doctype html><html><head><meta name="viewport" content="width=device-width">
+<title>STRAPS</title></head><body style="background:#000;color:#eee;font-family:sans-serif">
+<img src="/stream.mjpg" style="max-width:100%"><pre id="log"></pre>
+<script>
+const log = document.getElementById("log");
+const ws = new WebSocket(`ws://${location.host}/events`);
+ws.onmessage = e => { log.textContent = e.data + "\\n" + log.textContent.slice(0, 4000); };
+</script></body></html>"""
+
+class _AfterRoot:
+    """The slice of tk.Tk that run_main_loop uses."""
+    def __init__(self, loop):
+        self.loop = loop
+
+    def after(self, ms, callback):
+        return self.loop.call_later(ms / 1000, callback)
+
+class ServiceFrontEnd:
+    def __init__(self, loop, exercise_counters, rep_counter, gender="male", jpeg_quality=JPEG_QUALITY):
+        self.root = _AfterRoot(loop)
+        self.loop = loop
+        self.exercise_counters = exercise_counters
+        self.rep_counter = rep_counter
+        self.jpeg_quality = jpeg_quality
+        self.is_running = False
+        self.is_logging = False
+        self.reset_requested = False
+        self.gender = gender
+        self.source_type = 'webcam'
+        self.video_path = None
+        self.replay = ReplayControl()
+        self.subscribers = set()
+        self.viewers = 0
+        self.jpeg = None                  # latest encoded frame
+        self.jpeg_id = 0
+        self.frames_encoded = 0
+        self._frame_ready = asyncio.Condition()
+        self._feedback = None
+        self._encoding = False
+        self._pending = None
+        self._last_state = None
+        self._last_counters = dict(exercise_counters)
+
+    # --- the GUI interface used by run_main_loop ---
+    def toggle(self):
+        self.is_running = not self.is_running
+        self.publish({"type": "status", **self.status()})
+
+    def use_webcam(self):
+        self.source_type = 'webcam'
+        self.video_path = None
+        if self.is_running: self.toggle()
+
+    def update_frames(self, main_frame, feedback_frame):
+        if feedback_frame is not None: self._feedback = feedback_frame
+        if not self.viewers or self._feedback is None: return
+        # hstack copies, so the persistent panel can change while the encoder works.
+        composite = np.hstack([main_frame, self._feedback])
+        if self._encoding:
+            self._pending = composite     # newest frame wins while the encoder is busy
+            return
+        self._encode(composite)
+
+    def update_info(self, exercise, counts, stage_r, stage_l, raw_reps=0):
+        state = (exercise, stage_r, stage_l)
+        if state != self._last_state:
+            self._last_state = state
+            self.publish({"type": "stage", "exercise": exercise, "stage_r": stage_r, "stage_l": stage_l, "raw_reps": raw_reps})
+
+    # --- called by run_main_loop once per displayed analysis ---
+    def on_analysis(self, analysis):
+        if analysis.rep_summary:
+            self.publish({"type": "rep", "exercise": analysis.current_exercise, "raw_reps": analysis.raw_reps,
+                          "completed": analysis.completed, "summary": analysis.rep_summary})
+        if self.exercise_counters != self._last_counters:
+            self._last_counters = dict(self.exercise_counters)
+            self.publish({"type": "counters", "exercise_counters": self._last_counters})
+
+    def status(self):
+        return {"running": self.is_running, "gender": self.gender, "source": self.source_type, "video": self.video_path,
+                "replay": {"speed": self.replay.speed, "paused": self.replay.paused} if self.source_type == 'replay' else None,
+                "exercise_counters": dict(self.exercise_counters), "viewers": self.viewers, "subscribers": len(self.subscribers)}
+
+    def publish(self, event):
+        if not self.subscribers: return
+        message = json.dumps(event, default=float)
+        for q in self.subscribers:
+            if q.full():
+                q.get_nowait()  # a slow tablet loses its oldest events, never stalls the loop
+            q.put_nowait(message)
+
+    def _encode(self, composite):
+        self._encoding = True
+        future = self.loop.run_in_executor(None, cv2.imencode, ".jpg", composite, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        future.add_done_callback(lambda f: self.loop.create_task(self._encoded(f)))
+
+    async def _encoded(self, future):
+        ok, buffer = future.result()
+        if ok:
+            async with self._frame_ready:
+                self.jpeg = buffer.tobytes()
+                self.jpeg_id += 1
+                self.frames_encoded += 1
+                self._frame_ready.notify_all()
+        self._encoding = False
+        if self._pending is not None and self.viewers:
+            composite, self._pending = self._pending, None
+            self._encode(composite)
+
+    async def next_jpeg(self, last_id):
+        async with self._frame_ready:
+            await self._frame_ready.wait_for(lambda: self.jpeg_id != last_id)
+            return self.jpeg_id, self.jpeg
+
+class ServiceServer:
+    """HTTP routes:
+        GET  /               viewer page
+        GET  /stream.mjpg    annotated frames (multipart/x-mixed-replace)
+        GET  /events         WebSocket: rep, stage, counters and status events as JSON
+        GET  /status         current state as JSON
+        POST /start          optional ?video=path to play a file (or replay a .straps session) instead of the webcam
+        POST /replay         ?speed=1|2|4|8|0 (0: as fast as possible), ?paused=0|1, ?step=n frames
+        POST /stop
+        POST /gender         ?value=male|female
+    """
+    def __init__(self, front_end, host="127.0.0.1", port=8765):
+        self.front = front_end
+        self.host = host
+        self.port = port
+        self.server = None
+        self._connections = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"✅ Service listening on http://{self.host}:{self.port}/")
+        return self
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            # Streams and WebSockets never end on their own; close them before the loop does.
+            for task in self._connections: task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            request_line = await reader.readline()
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2: return
+            method, target = parts[0], parts[1]
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""): break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path == "/events" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers)
+            elif url.path == "/stream.mjpg" and method == "GET":
+                await self._stream(writer)
+            else:
+                status, body, content_type = self._route(method, url.path, query)
+                self._respond(writer, status, body, content_type)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    def _route(self, method, path, query):
+        front = self.front
+        if method == "GET" and path == "/":
+            return "200 OK", INDEX_HTML, "text/html"
+        if method == "GET" and path == "/status":
+            return "200 OK", json.dumps(front.status()).encode(), "application/json"
+        if method == "GET" and path == "/summary":
+            return "200 OK", json.dumps(front.rep_counter.session.export(), default=float).encode(), "application/json"
+        if method != "POST":
+            return "404 Not Found", b"not found", "text/plain"
+        if path == "/start":
+            video = query.get("video")
+            if video:
+                front.video_path, front.source_type = video, 'replay' if video.endswith(".straps") else 'video'
+            if not front.is_running: front.toggle()
+        elif path == "/stop":
+            if front.is_running: front.toggle()
+        elif path == "/gender":
+            if query.get("value") not in ("male", "female"):
+                return "400 Bad Request", b"value must be male or female", "text/plain"
+            front.gender = query["value"]
+            front.publish({"type": "status", **front.status()})
+        elif path == "/replay":
+            try:
+                speed = float(query.get("speed", front.replay.speed))
+                steps = int(query.get("step", 0))
+            except ValueError:
+                return "400 Bad Request", b"speed and step must be numbers", "text/plain"
+            if speed not in SPEEDS:
+                return "400 Bad Request", b"speed must be 1, 2, 4, 8 or 0", "text/plain"
+            front.replay.speed = speed
+            if "paused" in query: front.replay.paused = query["paused"] == "1"
+            if steps > 0: front.replay.step(steps)
+            front.publish({"type": "status", **front.status()})
+        else:
+            return "404 Not Found", b"not found", "text/plain"
+        return "200 OK", json.dumps(front.status()).encode(), "application/json"
+
+    def _respond(self, writer, status, body, content_type):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                     f"Cache-Control: no-store\r\nConnection: close\r\n\r\n".encode() + body)
+
+    async def _stream(self, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: multipart/x-mixed-replace; boundary=frame\r\n"
+                     b"Cache-Control: no-store\r\nConnection: close\r\n\r\n")
+        self.front.viewers += 1
+        try:
+            last_id = self.front.jpeg_id
+            while True:
+                last_id, jpeg = await self.front.next_jpeg(last_id)
+                writer.write(b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(jpeg) + jpeg + b"\r\n")
+                # A viewer that cannot keep up skips frames instead of buffering them.
+                await writer.drain()
+        finally:
+            self.front.viewers -= 1
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode())
+        q = asyncio.Queue(CLIENT_QUEUE)
+        q.put_nowait(json.dumps({"type": "status", **self.front.status()}))
+        self.front.subscribers.add(q)
+        receiving = asyncio.ensure_future(self._ws_receive(reader, writer))
+        try:
+            while not receiving.done():
+                getting = asyncio.ensure_future(q.get())
+                done, _ = await asyncio.wait({getting, receiving}, return_when=asyncio.FIRST_COMPLETED)
+                if getting not in done:
+                    getting.cancel()
+                    break
+                writer.write(_ws_frame(0x1, getting.result().encode()))
+                await writer.drain()
+        finally:
+            self.front.subscribers.discard(q)
+            receiving.cancel()
+
+    async def _ws_receive(self, reader, writer):
+        """Answers pings and returns on close; client messages carry no commands."""
+        while True:
+            head = await reader.readexactly(2)
+            opcode, length = head[0] & 0x0F, head[1] & 0x7F
+            if length == 126: length = struct.unpack(">H", await reader.readexactly(2))[0]
+            elif length == 127: length = struct.unpack(">Q", await reader.readexactly(8))[0]
+            mask = await reader.readexactly(4) if head[1] & 0x80 else b"\0\0\0\0"
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+            if opcode == 0x8:
+                writer.write(_ws_frame(0x8, payload[:2]))
+                return
+            if opcode == 0x9:
+                writer.write(_ws_frame(0xA, payload))
+
+def _ws_frame(opcode, payload):
+    length = len(payload)
+    if length < 126: header = struct.pack(">BB", 0x80 | opcode, length)
+    elif length < 1 << 16: header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+    else: header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+    return header + payload
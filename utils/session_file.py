@@ -0,0 +1,327 @@
+import datetime
+import json
+import os
+import queue
+import struct
+import threading
+import zlib
+from bisect import bisect_right
+import cv2
+import numpy as np
+from utils.telemetry import EXERCISES, STAGES
+
+# Compact landmark session files (.straps): per-frame pose landmarks, timestamps, detected
+# exercise, arm stages and rep events, plus optional low-rate JPEG thumbnails.
+#
+#   header   MAGIC, version, JSON metadata (code tables, precision, caller's metadata)
+#   chunk    CHUNK_HEADER + zlib(JSON layout + arrays) + thumbnail JPEGs, `chunk_frames` rows each
+#   ...
+#   index    JSON list of chunks (offset, first row, rows, first/last time) and all rep events
+#   trailer  TRAILER with the index offset
+#
+# Landmark x, y, z are quantised to int16 steps of `precision`, visibility to uint8. Within a chunk
+# every integer column is delta-coded against the previous row (wrapping, so it is exact) and
+# multi-byte columns are split into byte planes before compression, so a chunk decodes on its own.
+# A file whose index was never written (crash) is still readable: the chunks are scanned instead.
+# stop() returns at once; the writer thread writes the last chunk and the index and closes the file,
+# and join() waits for that at exit.
+
+MAGIC = b"STRAPSSF"
+VERSION = 1
+HEADER = struct.Struct("<8sHI")         # magic, version, metadata length
+CHUNK_HEADER = struct.Struct("<4sIIII")  # b"CHNK", first row, rows, data length, thumbnail bytes
+TRAILER = struct.Struct("<Q8s")          # index offset, b"STRAPIDX"
+
+_EXERCISE_CODES = {name: i for i, name in enumerate(EXERCISES)}
+_STAGE_CODES = {name: i for i, name in enumerate(STAGES)}
+# Per-row rep bits: a rep was counted and scored on this frame / the strict counter completed one.
+REP_RAW, REP_CORRECT = 1, 2
+
+def _delta(column):
+    return np.diff(column, axis=0, prepend=np.zeros_like(column[:1]))
+
+def _undelta(column):
+    return np.cumsum(column, axis=0, dtype=column.dtype)
+
+def _planes(column):
+    return np.ascontiguousarray(column).view(np.uint8).reshape(-1, column.itemsize).T.tobytes()
+
+def _unplanes(data, dtype, shape):
+    dtype = np.dtype(dtype)
+    return np.frombuffer(data, np.uint8).reshape(dtype.itemsize, -1).T.copy().view(dtype).reshape(shape)
+
+class _Session:
+    """One file's writer thread and the state it writes, kept apart from the next session."""
+    def __init__(self, path, queue_size):
+        self.path = path
+        self.file = open(path, "wb")
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stopping = threading.Event()
+        self.thread = None
+        self.rows_written = self.rows_dropped = self.thumbnails_written = 0
+        self.index = []
+        self.events = []
+        self.origin = None
+        self.last_thumbnail = None
+
+class SessionWriter:
+    def __init__(self, root="recordings", chunk_frames=256, precision=1 / 4096, thumbnail_interval=0.0, thumbnail_size=(160, 120), queue_size=4096):
+        self.root = root
+        self.chunk_frames = chunk_frames
+        self.precision = precision
+        self.thumbnail_interval = thumbnail_interval  # seconds between thumbnails, 0 for none
+        self.thumbnail_size = thumbnail_size
+        self.queue_size = queue_size
+        self.path = None
+        self._session = None
+        self._finishing = []  # writer threads of stopped sessions
+
+    @property
+    def is_recording(self):
+        return self._session is not None
+
+    def start(self, metadata=None):
+        if self._session: return self
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        os.makedirs(self.root, exist_ok=True)
+        self.path = os.path.join(self.root, f"session_{timestamp}.straps")
+        suffix = 1
+        while os.path.exists(self.path):
+            suffix += 1
+            self.path = os.path.join(self.root, f"session_{timestamp}_{suffix}.straps")
+        header = {"created": timestamp, "precision": self.precision, "chunk_frames": self.chunk_frames,
+                  "exercise_names": EXERCISES, "stage_names": STAGES, **(metadata or {})}
+        session = _Session(self.path, self.queue_size)
+        data = json.dumps(header).encode()
+        session.file.write(HEADER.pack(MAGIC, VERSION, len(data)) + data)
+        session.thread = threading.Thread(target=self._write_loop, args=(session,), name="session-file", daemon=True)
+        session.thread.start()
+        self._session = session
+        print(f"✅ Session file started: {self.path}")
+        return self
+
+    def record(self, frame_index, captured_at, frame_time, analysis, image=None):
+        """Called once per processed frame; never blocks. `image` is only used for thumbnails."""
+        session = self._session
+        if not session: return
+        if session.origin is None: session.origin = captured_at
+        t = captured_at - session.origin
+        thumbnail = None
+        if image is not None and self.thumbnail_interval and (session.last_thumbnail is None or t - session.last_thumbnail >= self.thumbnail_interval):
+            thumbnail = cv2.resize(image, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+            session.last_thumbnail = t
+        rep = (REP_RAW if analysis.rep_summary else 0) | (REP_CORRECT if analysis.completed else 0)
+        event = None
+        if analysis.rep_summary:
+            event = {"frame_index": frame_index, "t": round(t, 3), "exercise": analysis.current_exercise, "completed": analysis.completed,
+                     "raw_reps": analysis.raw_reps, "scores": analysis.rep_summary.get("scores", {}), "feedback": analysis.rep_summary.get("feedback", "")}
+        row = (frame_index, t, frame_time, analysis.landmarks, _EXERCISE_CODES.get(analysis.current_exercise, 0),
+               _STAGE_CODES.get(analysis.stage_r, 0), _STAGE_CODES.get(analysis.stage_l, 0), rep, event, thumbnail)
+        try:
+            session.queue.put_nowait(row)
+        except queue.Full:
+            session.rows_dropped += 1
+
+    def stop(self):
+        """Ends the session without waiting for the writer to finish the file."""
+        session, self._session = self._session, None
+        if not session: return
+        session.stopping.set()
+        self._finishing = [thread for thread in self._finishing if thread.is_alive()] + [session.thread]
+
+    def join(self):
+        """Waits until every stopped session file is complete; call before the process exits."""
+        finishing, self._finishing = self._finishing, []
+        for thread in finishing: thread.join()
+
+    def _write_loop(self, session):
+        rows = []
+        while True:
+            try:
+                row = session.queue.get(timeout=0.1)
+            except queue.Empty:
+                if session.stopping.is_set(): break
+                continue
+            rows.append(row)
+            if len(rows) >= self.chunk_frames:
+                self._write_chunk(session, rows)
+                rows = []
+        if rows:
+            self._write_chunk(session, rows)
+        f = session.file
+        index_offset = f.tell()
+        f.write(json.dumps({"chunks": session.index, "events": session.events}, default=float).encode())
+        f.write(TRAILER.pack(index_offset, b"STRAPIDX"))
+        f.close()
+        size = os.path.getsize(session.path)
+        print(f"✅ Session file saved: {session.path} ({session.rows_written} frames, {size / 1e6:.2f} MB, {session.rows_dropped} dropped)")
+
+    def _write_chunk(self, session, rows):
+        frame_index, t, frame_time, landmarks, exercise, stage_r, stage_l, rep, events, thumbnails = zip(*rows)
+        has_pose = np.array([lm is not None for lm in landmarks], np.bool_)
+        poses = np.array([lm for lm in landmarks if lm is not None], np.float32).reshape(-1, 33, 4)
+        xyz = np.clip(np.round(poses[:, :, :3] / self.precision), -32767, 32767).astype(np.int16)
+        visibility = np.round(np.clip(poses[:, :, 3], 0, 1) * 255).astype(np.uint8)
+        columns = {
+            "frame_index": _delta(np.array(frame_index, np.int64)),
+            "t_us": _delta(np.round(np.array(t) * 1e6).astype(np.int64)),
+            "frame_time_us": _delta(np.round(np.array(frame_time) * 1e6).astype(np.int32)),
+            "has_pose": has_pose,
+            "exercise": np.array(exercise, np.int8),
+            "stage_r": np.array(stage_r, np.int8),
+            "stage_l": np.array(stage_l, np.int8),
+            "rep": np.array(rep, np.int8),
+            "xyz": _delta(xyz),
+            "visibility": _delta(visibility),
+        }
+        first_row = session.rows_written
+        chunk_events = [dict(event, row=first_row + i) for i, event in enumerate(events) if event]
+        jpegs = [(first_row + i, frame_index[i], cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, 70])[1].tobytes())
+                 for i, thumb in enumerate(thumbnails) if thumb is not None]
+        layout = {"arrays": [[name, column.dtype.str, column.shape] for name, column in columns.items()],
+                  "events": chunk_events, "thumbnails": [[row, index, len(jpeg)] for row, index, jpeg in jpegs]}
+        layout = json.dumps(layout, default=float).encode()
+        data = zlib.compress(struct.pack("<I", len(layout)) + layout + b"".join(_planes(column) for column in columns.values()), 6)
+        thumbnail_bytes = b"".join(jpeg for _, _, jpeg in jpegs)
+
+        f = session.file
+        offset = f.tell()
+        f.write(CHUNK_HEADER.pack(b"CHNK", first_row, len(rows), len(data), len(thumbnail_bytes)) + data + thumbnail_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+        session.index.append([offset, first_row, len(rows), round(t[0], 6), round(t[-1], 6)])
+        session.events.extend(chunk_events)
+        session.rows_written += len(rows)
+        session.thumbnails_written += len(jpegs)
+
+class SessionReader:
+    """Random access to a .straps file; only the chunks covering a requested range are decoded."""
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        magic, version, length = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC: raise ValueError(f"{path} is not a session file")
+        if version > VERSION: raise ValueError(f"{path}: unsupported session file version {version}")
+        self.metadata = json.loads(self._file.read(length))
+        self.precision = self.metadata["precision"]
+        self.exercise_names = tuple(self.metadata["exercise_names"])
+        self.stage_names = tuple(self.metadata["stage_names"])
+        self._data_start = self._file.tell()
+        self.chunks, self.events = self._read_index() or self._scan()
+        self._starts = [chunk[1] for chunk in self.chunks]
+        self.frames = self.chunks[-1][1] + self.chunks[-1][2] if self.chunks else 0
+        self.duration = self.chunks[-1][4] if self.chunks else 0.0
+
+    def __len__(self):
+        return self.frames
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def _read_index(self):
+        size = os.fstat(self._file.fileno()).st_size
+        if size < self._data_start + TRAILER.size: return None
+        self._file.seek(size - TRAILER.size)
+        index_offset, tag = TRAILER.unpack(self._file.read(TRAILER.size))
+        if tag != b"STRAPIDX": return None
+        self._file.seek(index_offset)
+        index = json.loads(self._file.read(size - TRAILER.size - index_offset))
+        return index["chunks"], index["events"]
+
+    def _scan(self):
+        """Rebuilds the index of a file that was not closed, up to its last complete chunk."""
+        chunks, events = [], []
+        offset = self._data_start
+        while True:
+            self._file.seek(offset)
+            head = self._file.read(CHUNK_HEADER.size)
+            if len(head) < CHUNK_HEADER.size: break
+            tag, first_row, rows, data_length, thumbnail_length = CHUNK_HEADER.unpack(head)
+            if tag != b"CHNK": break
+            try:
+                columns, layout, _ = self._decode(offset)
+            except (zlib.error, ValueError, struct.error):
+                break
+            chunks.append([offset, first_row, rows, float(columns["t"][0]), float(columns["t"][-1])])
+            events.extend(layout["events"])
+            offset += CHUNK_HEADER.size + data_length + thumbnail_length
+        return chunks, events
+
+    def _decode(self, offset):
+        self._file.seek(offset)
+        tag, first_row, rows, data_length, thumbnail_length = CHUNK_HEADER.unpack(self._file.read(CHUNK_HEADER.size))
+        data = zlib.decompress(self._file.read(data_length))
+        if len(data) < 4: raise ValueError("truncated chunk")
+        layout_length = struct.unpack_from("<I", data)[0]
+        layout = json.loads(data[4:4 + layout_length])
+        position = 4 + layout_length
+        raw = {}
+        for name, dtype, shape in layout["arrays"]:
+            length = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            raw[name] = _unplanes(data[position:position + length], dtype, shape)
+            position += length
+
+        has_pose = raw["has_pose"]
+        landmarks = np.full((rows, 33, 4), np.nan, np.float32)
+        landmarks[has_pose, :, :3] = _undelta(raw["xyz"]).astype(np.float32) * np.float32(self.precision)
+        landmarks[has_pose, :, 3] = _undelta(raw["visibility"]).astype(np.float32) / 255
+        columns = {
+            "frame_index": _undelta(raw["frame_index"]),
+            "t": _undelta(raw["t_us"]) / 1e6,
+            "frame_time": _undelta(raw["frame_time_us"]) / 1e6,
+            "has_pose": has_pose,
+            "landmarks": landmarks,
+            "exercise": raw["exercise"],
+            "stage_r": raw["stage_r"],
+            "stage_l": raw["stage_l"],
+            "rep": raw["rep"],
+        }
+        return columns, layout, offset + CHUNK_HEADER.size + data_length
+
+    def read(self, start=0, stop=None):
+        """Column arrays for rows [start, stop): frame_index, t and frame_time (seconds), has_pose,
+        landmarks (N, 33, 4) with NaN rows where no pose was found, and exercise/stage/rep codes."""
+        stop = self.frames if stop is None else min(stop, self.frames)
+        start = max(0, start)
+        parts = []
+        if start < stop:
+            for offset, first_row, rows, _, _ in self.chunks[max(0, bisect_right(self._starts, start) - 1):]:
+                if first_row >= stop: break
+                columns = self._decode(offset)[0]
+                low, high = max(start - first_row, 0), min(stop - first_row, rows)
+                parts.append({name: column[low:high] for name, column in columns.items()})
+        if not parts:
+            return {}
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+    def row_at(self, seconds):
+        """The last row captured at or before `seconds` from the start of the session."""
+        if not self.chunks: return 0
+        i = max(0, bisect_right([chunk[3] for chunk in self.chunks], seconds) - 1)
+        offset, first_row = self.chunks[i][:2]
+        t = self._decode(offset)[0]["t"]
+        return first_row + max(0, int(np.searchsorted(t, seconds, side="right")) - 1)
+
+    def thumbnails(self, start=0, stop=None):
+        """(row, frame_index, BGR image) for each thumbnail in rows [start, stop)."""
+        stop = self.frames if stop is None else stop
+        found = []
+        for offset, first_row, rows, _, _ in self.chunks:
+            if first_row + rows <= start or first_row >= stop: continue
+            _, layout, position = self._decode(offset)
+            self._file.seek(position)
+            for row, frame_index, length in layout["thumbnails"]:
+                jpeg = self._file.read(length)
+                if start <= row < stop:
+                    found.append((row, frame_index, cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)))
+        return found
+
+def read_session(path, start=0, stop=None):
+    with SessionReader(path) as reader:
+        return reader.read(start, stop)
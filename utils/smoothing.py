@@ -0,0 +1,45 @@
+import math
+import numpy as np
+
+# One-Euro filter over all 33 landmarks at once: each coordinate is low-pass filtered with a
+# cutoff that rises with its own speed, so holds are steady and fast movements lag little.
+# The step towards each new measurement is scaled by the landmark's visibility, so occluded or
+# guessed landmarks mostly keep their previous estimate instead of jumping.
+
+class LandmarkFilter:
+    def __init__(self, max_gap=0.5):
+        self.max_gap = max_gap  # seconds without a pose after which tracking starts over
+        self.reset()
+
+    def reset(self):
+        self._xyz = None
+        self._speed = None
+        self._gap = 0.0
+
+    def __call__(self, landmarks, dt, params):
+        """Filters a (33, 4) array (x, y, z, visibility); `params` is a compiled FilterParams.
+        Returns a new array, or None for None (no pose this frame)."""
+        if landmarks is None:
+            self._gap += dt
+            return None
+        dt += self._gap
+        self._gap = 0.0
+        if self._xyz is None or dt > self.max_gap or dt <= 0:
+            self._xyz = landmarks[:, :3].astype(np.float32)
+            self._speed = np.zeros_like(self._xyz)
+            return landmarks.copy()
+
+        xyz = landmarks[:, :3]
+        weight = np.clip(landmarks[:, 3:4], params.min_weight, 1.0)
+        alpha_d = _alpha(dt, params.d_cutoff)
+        self._speed += alpha_d * ((xyz - self._xyz) / dt - self._speed)
+        cutoff = params.min_cutoff + params.beta * np.abs(self._speed)
+        alpha = _alpha(dt, cutoff)
+        self._xyz += alpha * weight * (xyz - self._xyz)
+
+        filtered = landmarks.copy()
+        filtered[:, :3] = self._xyz
+        return filtered
+
+def _alpha(dt, cutoff):
+    return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * dt))
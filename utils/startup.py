@@ -0,0 +1,59 @@
+import datetime
+import json
+import os
+import threading
+import time
+
+# Startup helpers. Deferred runs a slow constructor (mediapipe import, Pose graph, warm-up
+# inference) on a background thread and stands in for its result, blocking only when the result
+# is first used. StartupTimer collects milestones from process start to the first counted rep.
+
+STARTUP_LOG = "logs//startup.jsonl"
+
+class Deferred:
+    """Proxy for `factory()`, computed on a daemon thread. Attribute access waits for it."""
+    def __init__(self, factory, name="deferred"):
+        self._value = None
+        self._error = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(factory,), name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self, factory):
+        try:
+            self._value = factory()
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._ready.set()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def get(self):
+        self._ready.wait()
+        if self._error is not None: raise self._error
+        return self._value
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+class StartupTimer:
+    def __init__(self, started=None):
+        self.started = started or time.perf_counter()
+        self.marks = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        """Records the first time `name` is reached; later calls are ignored."""
+        with self._lock:
+            if name not in self.marks: self.marks[name] = time.perf_counter() - self.started
+
+    def report(self, path=STARTUP_LOG):
+        marks = dict(sorted(self.marks.items(), key=lambda item: item[1]))
+        print("Startup: " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in marks.items()))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps({"time": datetime.datetime.now().isoformat(timespec="seconds"),
+                                "marks": {name: round(seconds, 3) for name, seconds in marks.items()}}) + "\n")
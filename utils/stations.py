@@ -0,0 +1,304 @@
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+import mediapipe as mp
+from utils.analysis import analyze_frame
+from utils.batch import THREAD_ENV_VARS
+from utils.repetition import RepetitionCounter
+from utils.exercises import new_counters, short_name
+from utils.thresholds import ThresholdStore
+from utils.utils import Logger, draw_landmarks_array
+from utils.video_source import VideoSource
+
+# Several stations (camera + athlete) on one host. Capture threads in the main process write
+# resized frames into a per-station ring of shared-memory slots; worker processes read them in
+# place, so only a few small tuples are pickled per frame. A station is pinned to one worker,
+# which owns its Pose, RepetitionCounter, counters and Logger, so rep state never needs sharing.
+# Each station has at most one frame in flight and one pending; newer frames replace the pending
+# one, so a slow station drops frames instead of building up latency.
+
+SLOTS = 3  # in flight, pending, being written
+THRESHOLD_POLL_SECONDS = 1.0
+
+def load_station_config(items, default_gender="male"):
+    """Each item is a JSON file listing {"name", "source", "gender"} objects, or a bare source
+    (camera index, file or URL)."""
+    stations = []
+    for item in items:
+        if item.lower().endswith(".json"):
+            with open(item, "r") as f:
+                stations.extend(json.load(f))
+        else:
+            stations.append({"source": item})
+    for i, station in enumerate(stations):
+        station.setdefault("name", f"station{i + 1}")
+        station.setdefault("gender", default_gender)
+        station["source"] = str(station["source"])
+    return stations
+
+def _limit_resources(cores, threads):
+    cv2.setNumThreads(threads)
+    if cores and hasattr(os, "sched_setaffinity"):
+        # Threads started later (MediaPipe, TFLite) inherit this mask.
+        os.sched_setaffinity(0, cores)
+
+def _worker_main(stations, size, task_queue, result_queue, ready, cores, threads, thresholds_path, model_complexity, log_dir):
+    _limit_resources(cores, threads)
+    thresholds = ThresholdStore(thresholds_path)
+    next_reload = time.monotonic() + THRESHOLD_POLL_SECONDS
+    width, height = size
+    state = {}
+    for sid, station, shm_name in stations:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        logger = None
+        if log_dir:
+            logger = Logger()
+            logger.start(os.path.join(log_dir, f"{station['name']}_reps.csv"))
+        state[sid] = {
+            "shm": shm,
+            "frames": np.ndarray((SLOTS, height, width, 3), np.uint8, buffer=shm.buf),
+            "pose": mp.solutions.pose.Pose(static_image_mode=False, model_complexity=model_complexity, enable_segmentation=False, min_detection_confidence=0.5),
+            "counter": RepetitionCounter(),
+            "exercise_counters": new_counters(),
+            "gender": station["gender"],
+            "logger": logger,
+            "last_started": None,
+        }
+    ready.set()
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None: break
+            sid, slot, frame_index, captured_at, video_time = task
+            s = state[sid]
+            started = time.perf_counter()
+            frame_time = started - s["last_started"] if s["last_started"] else 1 / 30
+            s["last_started"] = started
+            if started > next_reload:
+                thresholds.reload_if_changed()
+                next_reload = started + THRESHOLD_POLL_SECONDS
+            analysis = analyze_frame(s["frames"][slot], s["pose"], s["counter"], thresholds.model, s["gender"], frame_time)
+            exercise_counters = s["exercise_counters"]
+            if analysis.landmarks is not None:
+                if analysis.rep_summary and s["logger"]:
+                    correct_reps = exercise_counters.get(analysis.current_exercise, 0) + (1 if analysis.completed else 0)
+                    s["logger"].log(analysis.current_exercise, analysis.raw_reps, correct_reps, s["gender"], analysis.rep_summary, timestamp=video_time)
+                if analysis.completed and analysis.current_exercise in exercise_counters:
+                    exercise_counters[analysis.current_exercise] += 1
+            result_queue.put((sid, slot, frame_index, captured_at, time.perf_counter() - started, analysis, dict(exercise_counters), dict(s["counter"].raw_reps)))
+    finally:
+        for s in state.values():
+            s["pose"].close()
+            if s["logger"]: s["logger"].stop(s["counter"].session)
+            del s["frames"]
+            s["shm"].close()
+
+class Station:
+    """Main-process bookkeeping for one source."""
+    def __init__(self, sid, config, size):
+        self.sid = sid
+        self.name = config["name"]
+        self.source = config["source"]
+        self.gender = config["gender"]
+        self.shm = shared_memory.SharedMemory(create=True, size=SLOTS * size[1] * size[0] * 3)
+        self.frames = np.ndarray((SLOTS, size[1], size[0], 3), np.uint8, buffer=self.shm.buf)
+        self.lock = threading.Lock()
+        self.in_flight = None
+        self.pending = None
+        self.worker = None
+        self.process = None
+        self.finished = False
+        self.captured = self.dropped = self.processed = 0
+        self.fps = 30.0
+        self.video_source = None
+        self.inference_ms = 0.0
+        self.analysis = None
+        self.exercise_counters = new_counters()
+        self.raw_reps = new_counters()
+        self.tile = None
+
+    def free_slot(self):
+        busy = {self.in_flight, self.pending[0] if self.pending else None}
+        return next(slot for slot in range(SLOTS) if slot not in busy)
+
+    def close(self):
+        del self.frames
+        self.shm.close()
+        self.shm.unlink()
+
+class StationEngine:
+    def __init__(self, stations, workers=None, threads=1, size=(640, 480), model_complexity=1, thresholds_path="txt//thresholds.json",
+                 log_dir=None, loop_files=False, affinity=True, tile_size=None):
+        self.size = size
+        self.tile_size = tile_size
+        self.loop_files = loop_files
+        self.stations = [Station(sid, config, size) for sid, config in enumerate(stations)]
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(self.stations)))
+        self.threads = threads
+        self.model_complexity = model_complexity
+        self.thresholds_path = thresholds_path
+        self.log_dir = log_dir
+        self.affinity = affinity
+        self._stop = threading.Event()
+        self._results = None
+        self._task_queues = []
+        self._processes = []
+        self._capture_threads = []
+
+    def _core_groups(self):
+        if not (self.affinity and hasattr(os, "sched_getaffinity")): return [None] * self.workers
+        cores = sorted(os.sched_getaffinity(0))
+        if len(cores) < self.workers:
+            return [[core] for core in (cores * self.workers)[:self.workers]]
+        per_worker = len(cores) // self.workers
+        return [cores[i * per_worker:(i + 1) * per_worker] for i in range(self.workers)]
+
+    def start(self):
+        ctx = multiprocessing.get_context("spawn")
+        self._results = ctx.Queue()
+        if self.log_dir: os.makedirs(self.log_dir, exist_ok=True)
+        saved_env = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+        os.environ.update({name: str(self.threads) for name in THREAD_ENV_VARS})
+        try:
+            for worker, cores in enumerate(self._core_groups()):
+                assigned = [st for st in self.stations if st.sid % self.workers == worker]
+                tasks = ctx.Queue()
+                ready = ctx.Event()
+                process = ctx.Process(target=_worker_main, name=f"station-worker-{worker}", daemon=True,
+                                      args=([(st.sid, {"name": st.name, "gender": st.gender}, st.shm.name) for st in assigned], self.size, tasks,
+                                            self._results, ready, cores, self.threads, self.thresholds_path, self.model_complexity, self.log_dir))
+                process.start()
+                for st in assigned: st.worker, st.process = tasks, process
+                self._task_queues.append(tasks)
+                self._processes.append((process, ready))
+        finally:
+            for name, value in saved_env.items():
+                if value is None: os.environ.pop(name, None)
+                else: os.environ[name] = value
+        # Capture starts once every Pose is loaded, so files do not race ahead of a cold worker.
+        for process, ready in self._processes:
+            while not ready.wait(0.1):
+                if not process.is_alive():
+                    print(f"❌ {process.name} exited during startup (code {process.exitcode})")
+                    break
+        for st in self.stations:
+            thread = threading.Thread(target=self._capture, args=(st,), name=f"capture-{st.name}", daemon=True)
+            thread.start()
+            self._capture_threads.append(thread)
+        return self
+
+    def _capture(self, st):
+        is_file = os.path.isfile(st.source)
+        cap = st.video_source = VideoSource(st.source, is_file=is_file, loop=self.loop_files, name=st.name, size=self.size)
+        if not cap.isOpened():
+            st.finished = True
+            return
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if 1.0 <= fps <= 240.0: st.fps = fps
+        next_due = time.perf_counter()
+        frame_index = -1
+        try:
+            while not self._stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    if cap.finished: break
+                    continue
+                frame_index += 1
+                captured_at = cap.captured_at
+                with st.lock:
+                    slot = st.free_slot()
+                # Only this thread writes slots, and this one is not referenced until published below.
+                cv2.resize(frame, self.size, dst=st.frames[slot])
+                with st.lock:
+                    st.captured += 1
+                    task = (st.sid, slot, frame_index, captured_at, frame_index / st.fps)
+                    if st.in_flight is None:
+                        st.in_flight = slot
+                        st.worker.put(task)
+                    else:
+                        if st.pending: st.dropped += 1
+                        st.pending = (slot, task)
+                if is_file:
+                    next_due += 1.0 / st.fps
+                    if next_due < captured_at - 1.0 / st.fps: next_due = captured_at
+                    delay = next_due - time.perf_counter()
+                    if delay > 0: time.sleep(delay)
+        finally:
+            cap.release()
+            st.finished = True
+
+    def poll(self, timeout=0.05):
+        """Collects finished frames. Returns [(station, analysis)] in arrival order."""
+        updates = []
+        try:
+            item = self._results.get(timeout=timeout)
+        except queue.Empty:
+            return updates
+        while item is not None:
+            sid, slot, frame_index, captured_at, elapsed, analysis, exercise_counters, raw_reps = item
+            st = self.stations[sid]
+            # The slot is still reserved here, so a thumbnail can be taken before releasing it.
+            if self.tile_size: st.tile = cv2.resize(st.frames[slot], self.tile_size, interpolation=cv2.INTER_AREA)
+            with st.lock:
+                st.in_flight = None
+                if st.pending:
+                    st.in_flight, task = st.pending
+                    st.pending = None
+                    st.worker.put(task)
+            st.processed += 1
+            st.inference_ms = 0.9 * st.inference_ms + 0.1 * elapsed * 1000 if st.inference_ms else elapsed * 1000
+            st.analysis, st.exercise_counters, st.raw_reps = analysis, exercise_counters, raw_reps
+            updates.append((st, analysis))
+            try:
+                item = self._results.get_nowait()
+            except queue.Empty:
+                item = None
+        return updates
+
+    @property
+    def done(self):
+        return all(st.finished and (st.in_flight is None and st.pending is None or not st.process.is_alive()) for st in self.stations)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._capture_threads: thread.join(1.0)
+        for tasks in self._task_queues: tasks.put(None)
+        deadline = time.monotonic() + 5.0
+        while any(p.is_alive() for p, _ in self._processes) and time.monotonic() < deadline:
+            self.poll(0.05)  # keep draining so workers never block on a full result pipe
+        for process, _ in self._processes:
+            process.join(0.1)
+            if process.is_alive(): process.terminate()
+        for st in self.stations: st.close()
+
+    def summary(self):
+        return [{"name": st.name, "source": st.source, "gender": st.gender, "frames_captured": st.captured,
+                 "frames_processed": st.processed, "frames_dropped": st.dropped, "correct_reps": st.exercise_counters,
+                 "raw_reps": st.raw_reps, "video_source": st.video_source.stats() if st.video_source else None} for st in self.stations]
+
+def render_grid(stations, tile_size, columns=None):
+    """Compact mosaic of the latest thumbnails with skeleton, counts and stages."""
+    columns = columns or int(np.ceil(np.sqrt(len(stations))))
+    rows = int(np.ceil(len(stations) / columns))
+    width, height = tile_size
+    grid = np.zeros((rows * height, columns * width, 3), np.uint8)
+    for i, st in enumerate(stations):
+        if st.tile is None: continue
+        tile = st.tile.copy()
+        analysis = st.analysis
+        if analysis is not None and analysis.landmarks is not None:
+            draw_landmarks_array(tile, analysis.landmarks, mp.solutions.pose.POSE_CONNECTIONS)
+        exercise = analysis.current_exercise if analysis else "-"
+        lines = [f"{st.name} ({st.gender})", f"{exercise}  " + "  ".join(f"{short_name(name)} {count}" for name, count in st.exercise_counters.items()),
+                 f"R {analysis.stage_r or '-'} L {analysis.stage_l or '-'}  {st.inference_ms:.0f} ms  drop {st.dropped}" if analysis else ""]
+        for j, line in enumerate(lines):
+            cv2.putText(tile, line, (6, 16 + j * 16), cv2.FONT_HERSHEY_PLAIN, 1.0, (0, 255, 255), 1)
+        r, c = divmod(i, columns)
+        grid[r * height:(r + 1) * height, c * width:(c + 1) * width] = tile
+    return grid
@@ -0,0 +1,70 @@
+import json
+import os
+from utils.functions import RunningStats
+
+# Session summary kept up to date one rep at a time. Each exercise holds a rep count and a
+# RunningStats per score (per joint for the angle scores), so reading the summary costs the same
+# after two reps as after two thousand and memory does not grow with the session. The per-rep
+# detail can be appended to a JSON-lines file instead of being kept in memory.
+
+IMPROVEMENT_THRESHOLD = 95
+
+class SessionSummary:
+    def __init__(self, spill_path=None):
+        self.spill_path = spill_path
+        self._spill = None
+        self.reset()
+
+    def reset(self):
+        """Clears the aggregates; a spill file keeps everything written so far."""
+        self.exercises = {}  # exercise -> {"reps": n, "scores": {key: RunningStats or {joint: RunningStats}}}
+        self.reps = 0
+
+    def add(self, exercise, scores):
+        entry = self.exercises.setdefault(exercise, {"reps": 0, "scores": {}})
+        entry["reps"] += 1
+        self.reps += 1
+        for key, value in scores.items():
+            if isinstance(value, dict):
+                joints = entry["scores"].setdefault(key, {})
+                for joint, joint_value in value.items():
+                    joints.setdefault(joint, RunningStats()).add(joint_value)
+            else:
+                entry["scores"].setdefault(key, RunningStats()).add(value)
+        if self.spill_path:
+            if self._spill is None:
+                os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+                self._spill = open(self.spill_path, "a")
+            self._spill.write(json.dumps({"exercise": exercise, "scores": scores}, default=float) + "\n")
+            self._spill.flush()
+
+    def report(self, improvement_threshold=IMPROVEMENT_THRESHOLD):
+        """Per exercise: reps, {score: mean} (the mean of the joint means for angle scores), the
+        joints and scores below `improvement_threshold`, and every joint's mean and min, worst first."""
+        report = {}
+        for exercise, entry in self.exercises.items():
+            means, needs_work, joints = {}, set(), []
+            for key, stats in entry["scores"].items():
+                if isinstance(stats, dict):
+                    if not stats: continue
+                    joint_means = {joint: joint_stats.mean() for joint, joint_stats in stats.items()}
+                    means[key] = sum(joint_means.values()) / len(joint_means)
+                    for joint, mean in joint_means.items():
+                        joints.append((joint, mean, stats[joint].min))
+                        if mean < improvement_threshold: needs_work.add(joint.replace('_', ' ').title())
+                else:
+                    means[key] = stats.mean()
+                    if means[key] < improvement_threshold: needs_work.add(key)
+            report[exercise] = {"reps": entry["reps"], "scores": means, "needs_work": sorted(needs_work),
+                                "worst_joints": sorted(joints, key=lambda joint: joint[1])}
+        return report
+
+    def export(self):
+        """report() in JSON-friendly form, for logs and result files."""
+        return {exercise: {**entry, "worst_joints": [{"joint": joint, "mean": mean, "min": low} for joint, mean, low in entry["worst_joints"]]}
+                for exercise, entry in self.report().items()}
+
+    def close(self):
+        if self._spill:
+            self._spill.close()
+            self._spill = None
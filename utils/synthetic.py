@@ -0,0 +1,96 @@
+import math
+import numpy as np
+
+# Synthetic (T, 33, 4) landmark sequences with known rep counts, for benchmarks and for checking
+# that optimisations keep counts and scores identical. Poses are 2D stick figures calibrated
+# against the male thresholds in txt/thresholds.json; z is 0 and visibility 0.99.
+
+# Shoulder abduction / elbow angle at the bottom and top of a rep, body scale around the hip
+# centre, forearm direction (-1 curls towards the body, 1 presses outwards) and foot spread.
+EXERCISE_POSES = {
+    "hammer_curl": {"down": (8, 175), "up": (8, 10), "scale": 1.012, "forearm": -1, "foot": 0.05},
+    "overhead_press": {"down": (60, 50), "up": (175, 178), "scale": 0.74, "forearm": 1, "foot": 0.08},
+}
+_CENTRE = np.array([0.5, 0.55])
+# (dx, dy) of the face landmarks 1-10 from the nose
+_FACE = ((0.01, -0.01), (0.015, -0.012), (0.02, -0.01), (-0.01, -0.01), (-0.015, -0.012),
+         (-0.02, -0.01), (0.03, 0), (-0.03, 0), (0.01, 0.02), (-0.01, 0.02))
+
+def _rotate(v, degrees):
+    r = math.radians(degrees)
+    c, s = math.cos(r), math.sin(r)
+    return np.array([v[0] * c - v[1] * s, v[0] * s + v[1] * c])
+
+def stick_figure(shoulder_deg, elbow_deg, scale=1.0, forearm=1, foot=0.0, knee_bend=0.0):
+    """(33, 2) normalized image coordinates of a front-facing body. `knee_bend` pushes both knees
+    sideways so the knee and hip angles leave their static ranges."""
+    P = np.zeros((33, 2))
+    cx = _CENTRE[0]
+    P[23], P[24] = (cx + 0.04, 0.55), (cx - 0.04, 0.55)
+    P[25], P[26] = (cx + 0.04 + knee_bend, 0.72), (cx - 0.04 - knee_bend, 0.72)
+    P[27], P[28] = (cx + 0.04, 0.89), (cx - 0.04, 0.89)
+    P[29], P[30] = P[27] + (0.01, 0.02), P[28] + (-0.01, 0.02)
+    P[31], P[32] = P[27] + (foot, 0.03), P[28] + (-foot, 0.03)
+    P[11], P[12] = (cx + 0.06, 0.25), (cx - 0.06, 0.25)
+    P[0] = (cx, 0.15)
+    P[1:11] = P[0] + np.array(_FACE)
+    for side, (shoulder, elbow, wrist) in ((1, (11, 13, 15)), (-1, (12, 14, 16))):
+        upper_arm = _rotate((0.0, 1.0), -side * shoulder_deg) * 0.15
+        P[elbow] = P[shoulder] + upper_arm
+        P[wrist] = P[elbow] + _rotate(upper_arm / np.linalg.norm(upper_arm), side * forearm * (180 - elbow_deg)) * 0.13
+    for wrist, hand in ((15, (17, 19, 21)), (16, (18, 20, 22))):
+        for k, j in enumerate(hand):
+            P[j] = P[wrist] + (0.005 * (k - 1), 0.015)
+    return (P - _CENTRE) * scale + _CENTRE
+
+def rep_sequence(exercise, reps, hold=8, move=12, noise=0.0, bad_reps=(), rng=None):
+    """`reps` full reps framed by `hold`-frame pauses at both ends, each movement `move` frames.
+    Reps whose index is in `bad_reps` are done with bent knees: they count as raw reps but not
+    as correct ones. Returns a (T, 33, 4) float32 array."""
+    pose = EXERCISE_POSES[exercise]
+    rng = rng if rng is not None else np.random.default_rng(0)
+    (down_s, down_e), (up_s, up_e) = pose["down"], pose["up"]
+    frames = []
+
+    def add(t, knee_bend=0.0):
+        frame = np.zeros((33, 4), np.float32)
+        frame[:, :2] = stick_figure(down_s + (up_s - down_s) * t, down_e + (up_e - down_e) * t,
+                                    pose["scale"], pose["forearm"], pose["foot"], knee_bend)
+        frame[:, 3] = 0.99
+        if noise: frame[:, :2] += rng.normal(0, noise, (33, 2))
+        frames.append(frame)
+
+    for _ in range(hold): add(0)
+    for rep in range(reps):
+        bend = 0.06 if rep in bad_reps else 0.0
+        for i in range(move): add((i + 1) / move, bend)
+        for _ in range(hold): add(1, bend)
+        for i in range(move): add(1 - (i + 1) / move, bend)
+        for _ in range(hold): add(0)
+    return np.stack(frames)
+
+def corrupt(landmarks, dropout=0.0, glitch=0.0, rng=None):
+    """Copy of `landmarks` with a `dropout` fraction of frames lost (NaN rows, as stored for
+    frames without a pose) and a `glitch` fraction replaced by random landmarks. Runs of glitches
+    are kept shorter than bad_frame_tolerance by construction (isolated frames)."""
+    rng = rng if rng is not None else np.random.default_rng(0)
+    out = landmarks.copy()
+    T = len(out)
+    lost = rng.random(T) < dropout
+    out[lost] = np.nan
+    glitched = (rng.random(T) < glitch) & ~lost
+    glitched[1:] &= ~glitched[:-1]
+    out[glitched] = rng.uniform(0.2, 0.8, (int(glitched.sum()), 33, 4)).astype(np.float32)
+    return out
+
+def synthetic_session(segments, noise=0.0, dropout=0.0, glitch=0.0, seed=0):
+    """Concatenates rep sequences. `segments` is a list of (exercise, reps, bad_reps) tuples.
+    Returns (landmarks, expected) where expected = {"raw": {exercise: n}, "correct": {exercise: n}}."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    expected = {"raw": {}, "correct": {}}
+    for exercise, reps, bad_reps in segments:
+        parts.append(rep_sequence(exercise, reps, noise=noise, bad_reps=bad_reps, rng=rng))
+        expected["raw"][exercise] = expected["raw"].get(exercise, 0) + reps
+        expected["correct"][exercise] = expected["correct"].get(exercise, 0) + reps - len(set(bad_reps) & set(range(reps)))
+    return corrupt(np.concatenate(parts), dropout, glitch, rng), expected
@@ -0,0 +1,139 @@
+import datetime
+import glob
+import os
+import queue
+import threading
+import time
+import numpy as np
+from utils.features import STATIC_JOINTS, DYNAMIC_JOINTS
+from utils.exercises import EXERCISE_REGISTRY
+
+# Per-frame telemetry as chunked, columnar .npz files. record() copies a handful of scalars into
+# a queue; a writer thread packs them into column arrays and writes one chunk per `chunk_frames`
+# rows or `flush_seconds`, whichever comes first. Each chunk is fsynced and renamed into place,
+# so a crash loses at most the rows of the chunk being filled. With `max_chunks`, the oldest
+# chunks are deleted as new ones arrive.
+
+EXERCISES = ("unknown",) + tuple(EXERCISE_REGISTRY)
+STAGES = ("none", "up", "down")
+PHASES = ("idle", "down_prep", "up", "done", "down")
+TIMED_STAGES = ("capture", "resize", "color", "pose", "features", "feedback", "counting", "logger", "recorder")
+
+_EXERCISE_CODES = {name: i for i, name in enumerate(EXERCISES)}
+_STAGE_CODES = {name: i for i, name in enumerate(STAGES)}
+_PHASE_CODES = {name: i for i, name in enumerate(PHASES)}
+_PHASE_ATTRS = ("right_phase", "left_phase", "hull_phase", "raw_right_phase", "raw_left_phase")
+_NAN4 = (float("nan"),) * len(DYNAMIC_JOINTS)
+_NAN6 = (float("nan"),) * len(STATIC_JOINTS)
+
+class TelemetryWriter:
+    def __init__(self, root="logs//telemetry", chunk_frames=600, flush_seconds=5.0, max_chunks=0, queue_size=4096):
+        self.root = root
+        self.chunk_frames = chunk_frames
+        self.flush_seconds = flush_seconds
+        self.max_chunks = max_chunks
+        self.session_dir = None
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.chunks_written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+
+    def start(self):
+        if self._thread: return self
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        self.session_dir = os.path.join(self.root, f"telemetry_{timestamp}")
+        os.makedirs(self.session_dir, exist_ok=True)
+        self._origin = time.perf_counter()
+        self._thread = threading.Thread(target=self._write_loop, name="telemetry", daemon=True)
+        self._thread.start()
+        print(f"✅ Telemetry started: {self.session_dir}")
+        return self
+
+    def record(self, frame_index, captured_at, frame_time, analysis, counter, timings=None):
+        """Called once per processed frame; never blocks. `timings` follows TIMED_STAGES (ms)."""
+        if not self._thread: return
+        has_pose = analysis.landmarks is not None
+        row = (frame_index, captured_at - self._origin, frame_time,
+               _EXERCISE_CODES.get(counter.current_exercise, 0), has_pose, analysis.completed,
+               analysis.dynamic_angles if has_pose else _NAN4,
+               tuple(analysis.joint_angles[joint] for joint in STATIC_JOINTS) if has_pose else _NAN6,
+               analysis.wrist_dist if has_pose else float("nan"),
+               analysis.hull_area if has_pose else float("nan"),
+               _STAGE_CODES.get(counter.stage_right, 0), _STAGE_CODES.get(counter.stage_left, 0),
+               tuple(_PHASE_CODES.get(getattr(counter, attr), 0) for attr in _PHASE_ATTRS),
+               timings)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.rows_dropped += 1
+
+    def stop(self):
+        if not self._thread: return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        print(f"✅ Telemetry saved: {self.session_dir} ({self.rows_written} frames in {self.chunks_written} chunks, {self.rows_dropped} dropped)")
+
+    def _write_loop(self):
+        rows = []
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                row = False
+            if row is None:
+                break
+            if row is not False:
+                rows.append(row)
+            if len(rows) >= self.chunk_frames or (row is False and rows):
+                self._write_chunk(rows)
+                rows = []
+            if row is False or not rows:
+                deadline = time.monotonic() + self.flush_seconds
+        if rows:
+            self._write_chunk(rows)
+
+    def _write_chunk(self, rows):
+        frame_index, t, frame_time, exercise, has_pose, completed, dynamic, joints, wrist, hull, stage_r, stage_l, phases, timings = zip(*rows)
+        columns = {
+            "frame_index": np.array(frame_index, np.int64),
+            "t": np.array(t, np.float64),
+            "frame_time": np.array(frame_time, np.float32),
+            "exercise": np.array(exercise, np.int8),
+            "has_pose": np.array(has_pose, np.bool_),
+            "completed": np.array(completed, np.bool_),
+            "dynamic_angles": np.array(dynamic, np.float32),
+            "joint_angles": np.array(joints, np.float32),
+            "wrist_dist": np.array(wrist, np.float32),
+            "hull_area": np.array(hull, np.float32),
+            "stage_r": np.array(stage_r, np.int8),
+            "stage_l": np.array(stage_l, np.int8),
+            "phases": np.array(phases, np.int8),
+            "timings_ms": np.array([row if row is not None else (np.nan,) * len(TIMED_STAGES) for row in timings], np.float32),
+            # Code tables travel with every chunk so files stay readable on their own.
+            "exercise_names": np.array(EXERCISES), "stage_names": np.array(STAGES), "phase_names": np.array(PHASES),
+            "phase_columns": np.array(_PHASE_ATTRS), "dynamic_columns": np.array(DYNAMIC_JOINTS),
+            "joint_columns": np.array(STATIC_JOINTS), "timing_columns": np.array(TIMED_STAGES),
+        }
+        path = os.path.join(self.session_dir, f"chunk_{self.chunks_written:06d}.npz")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **columns)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.chunks_written += 1
+        self.rows_written += len(rows)
+        if self.max_chunks:
+            for old in sorted(glob.glob(os.path.join(self.session_dir, "chunk_*.npz")))[:-self.max_chunks]:
+                os.remove(old)
+
+def load_telemetry(session_dir):
+    """Concatenates every chunk of a session into one dict of column arrays."""
+    paths = sorted(glob.glob(os.path.join(session_dir, "chunk_*.npz")))
+    if not paths: return {}
+    chunks = [np.load(path) for path in paths]
+    return {name: (np.concatenate([chunk[name] for chunk in chunks]) if not name.endswith(("_names", "_columns")) else chunks[0][name])
+            for name in chunks[0].files}
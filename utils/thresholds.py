@@ -0,0 +1,162 @@
+import json
+import os
+from collections import namedtuple
+from types import MappingProxyType
+from utils.exercises import *
+
+# thresholds.json compiled once into immutable tuples so the per-frame code reads attributes
+# instead of walking nested dicts. ThresholdStore swaps in a new model when the file changes.
+
+GlobalConfig = namedtuple("GlobalConfig", "static_angle_tolerance dynamic_angle_buffer bad_frame_tolerance landmark_filter")
+# One-Euro landmark filter: cutoff in Hz at rest, increase per unit/s of speed, speed-estimate
+# cutoff, and the smallest visibility weight given to a measurement.
+FilterParams = namedtuple("FilterParams", "min_cutoff beta d_cutoff min_weight")
+DEFAULT_FILTER = FilterParams(2.0, 4.0, 1.0, 0.2)
+GenderThresholds = namedtuple("GenderThresholds", "static_angles convex_hull wrist_distance")
+ExerciseThresholds = namedtuple("ExerciseThresholds", "name detection dynamic genders scored_joints feedback_joints violation_joints keypoints landmark_filter "
+                                                     "stage_joints stage_rule static_joints")
+
+class ThresholdModel(namedtuple("ThresholdModel", "global_config exercises detection_index")):
+    __slots__ = ()
+
+    def gender(self, exercise_name, gender):
+        exercise = self.exercises.get(exercise_name)
+        return exercise.genders.get(gender) if exercise else None
+
+    def filter_params(self, exercise_name):
+        exercise = self.exercises.get(exercise_name)
+        return exercise.landmark_filter if exercise and exercise.landmark_filter else self.global_config.landmark_filter
+
+def _range(value, where):
+    if not (isinstance(value, (list, tuple)) and len(value) == 2 and all(isinstance(v, (int, float)) for v in value)):
+        raise ValueError(f"{where}: expected [low, high], got {value!r}")
+    if value[0] > value[1]:
+        raise ValueError(f"{where}: low {value[0]} is above high {value[1]}")
+    return (value[0], value[1])
+
+def _number(value, where):
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise ValueError(f"{where}: expected a number, got {value!r}")
+    return value
+
+def _ranges(section, where):
+    if not isinstance(section, dict):
+        raise ValueError(f"{where}: expected an object")
+    return MappingProxyType({key: _range(value, f"{where}.{key}") for key, value in section.items()})
+
+def _compile_filter(data, where, defaults):
+    if not isinstance(data, dict):
+        raise ValueError(f"{where}: expected an object")
+    unknown = set(data) - set(FilterParams._fields)
+    if unknown:
+        raise ValueError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+    params = FilterParams(*(_number(data.get(field, default), f"{where}.{field}") for field, default in zip(FilterParams._fields, defaults)))
+    if params.min_cutoff <= 0 or params.d_cutoff <= 0 or params.beta < 0 or not 0 < params.min_weight <= 1:
+        raise ValueError(f"{where}: cutoffs must be positive, beta non-negative and min_weight in (0, 1]")
+    return params
+
+def _compile_gender(data, where):
+    if not isinstance(data, dict):
+        raise ValueError(f"{where}: expected an object")
+    static_section = data.get("static_angles", {})
+    if not isinstance(static_section, dict):
+        raise ValueError(f"{where}.static_angles: expected an object")
+    static_angles = MappingProxyType({joint: _number(value, f"{where}.static_angles.{joint}") for joint, value in static_section.items()})
+    convex_hull = _ranges(data["convex_hull"], f"{where}.convex_hull") if "convex_hull" in data else None
+    wrist_distance = _range(data["wrist_distance"], f"{where}.wrist_distance") if "wrist_distance" in data else None
+    return GenderThresholds(static_angles, convex_hull, wrist_distance)
+
+SECTIONS = ("detection", "dynamic_angles", "landmark_filter")  # exercise keys that are not genders
+
+def _compile_exercise(name, data, global_filter):
+    if not isinstance(data, dict):
+        raise ValueError(f"{name}: expected an object")
+    spec = EXERCISE_REGISTRY.get(name)
+    detection = _ranges(data.get("detection", {}), f"{name}.detection")
+    dynamic = _ranges(data.get("dynamic_angles", {}), f"{name}.dynamic_angles")
+    if detection and spec:
+        missing = [key for key, _ in spec.detection if key not in detection]
+        if missing:
+            raise ValueError(f"{name}.detection: missing {', '.join(missing)}")
+    if dynamic and spec:
+        joints = set(spec.stage_joints) | {joint.split("_")[0] for joint in spec.scored_joints} | \
+                 {joint for _, _, joint in spec.feedback_joints} | {joint for _, _, joint in spec.violation_joints}
+        missing = [f"{joint}_{stage}" for joint in sorted(joints) for stage in ("up", "down") if f"{joint}_{stage}" not in dynamic]
+        if missing:
+            raise ValueError(f"{name}.dynamic_angles: missing {', '.join(missing)}")
+    # An empty gender section means "no thresholds", exactly like a missing one.
+    genders = MappingProxyType({gender: _compile_gender(section, f"{name}.{gender}")
+                                for gender, section in data.items() if gender not in SECTIONS and section})
+    landmark_filter = _compile_filter(data["landmark_filter"], f"{name}.landmark_filter", global_filter) if "landmark_filter" in data else None
+    if not spec:  # in thresholds.json but not registered: compiled for tools, never detected
+        return ExerciseThresholds(name, detection, dynamic, genders, (), (), (), MappingProxyType({}), landmark_filter, (), None, frozenset())
+
+    def stage_ranges(joint):
+        return (dynamic[f"{joint}_up"], dynamic[f"{joint}_down"])
+
+    feedback_joints = tuple((label, index, stage_ranges(joint)) for label, index, joint in spec.feedback_joints) if dynamic else ()
+    violation_joints = tuple((index, landmark, stage_ranges(joint)) for index, landmark, joint in spec.violation_joints) if dynamic else ()
+    # Per side, (angle index, up range, down range) of every joint the stage rule combines.
+    stage_joints = tuple(tuple((ANGLE_INDEX[f"{joint}_{side}"],) + stage_ranges(joint) for joint in spec.stage_joints)
+                         for side in ("r", "l")) if dynamic else ()
+    return ExerciseThresholds(name, detection, dynamic, genders, spec.scored_joints, feedback_joints, violation_joints,
+                              MappingProxyType(spec.keypoints), landmark_filter, stage_joints, STAGE_RULES[spec.stage_rule],
+                              frozenset(spec.static_joints))
+
+def _detection_index(exercises):
+    names, conditions = [], []
+    for name, spec in EXERCISE_REGISTRY.items():
+        exercise = exercises.get(name)
+        if not exercise or not exercise.detection: continue
+        names.append(name)
+        conditions.append(tuple((ANGLE_INDEX[angle], exercise.detection[key]) for key, angles in spec.detection for angle in angles))
+    return DetectionIndex(names, conditions)
+
+def compile_thresholds(data):
+    """Validates a parsed thresholds.json and compiles it into a ThresholdModel. Raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("thresholds: expected an object")
+    config = data.get("global_config", {})
+    global_config = GlobalConfig(
+        _number(config.get("static_angle_tolerance", 12), "global_config.static_angle_tolerance"),
+        _number(config.get("dynamic_angle_buffer", 10), "global_config.dynamic_angle_buffer"),
+        _number(config.get("bad_frame_tolerance", 5), "global_config.bad_frame_tolerance"),
+        _compile_filter(config.get("landmark_filter", {}), "global_config.landmark_filter", DEFAULT_FILTER),
+    )
+    exercises = MappingProxyType({name: _compile_exercise(name, section, global_config.landmark_filter) for name, section in data.items() if name != "global_config"})
+    return ThresholdModel(global_config, exercises, _detection_index(exercises))
+
+def load_threshold_model(path):
+    with open(path, "r") as f:
+        return compile_thresholds(json.load(f))
+
+class ThresholdStore:
+    """Holds the current ThresholdModel for a file and replaces it when the file changes.
+
+    Readers take `store.model` once per frame; a reload rebinds that attribute in one step, so
+    a frame never sees a half-updated model and counter state is untouched.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._stamp = self._file_stamp()
+        self.model = load_threshold_model(path)
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload_if_changed(self):
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp: return False
+        self._stamp = stamp
+        try:
+            model = load_threshold_model(self.path)
+        except (ValueError, OSError) as e:
+            print(f"❌ Keeping previous thresholds, {self.path} is invalid: {e}")
+            return False
+        self.model = model
+        print(f"✅ Reloaded thresholds from {self.path}")
+        return True
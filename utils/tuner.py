@@ -0,0 +1,127 @@
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from utils.features import extract_features, STATIC_JOINTS
+from utils.landmark_cache import LandmarkCache
+from utils.repetition import RepetitionCounter
+from utils.thresholds import compile_thresholds
+
+# Threshold tuning by replaying stored landmark sequences through RepetitionCounter.
+# Features are computed once per clip and shared by every candidate config.
+
+def load_labels(path):
+    """Labels file: {"clip.mp4": {"gender": "male", "reps": {"hammer_curl": 12}}, ...}."""
+    with open(path, "r") as f:
+        labels = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    return {os.path.join(base, video): {"gender": info.get("gender", "male"), "reps": info["reps"]} for video, info in labels.items()}
+
+def load_clip_landmarks(video_path, cache_dir, model_complexity):
+    cache = LandmarkCache(cache_dir, model_complexity)  # default size is batch.PROCESS_SIZE
+    key = cache.key(video_path)
+    cached = cache.load(key)
+    if cached is None:
+        # A full scoring pass fills the cache as a side effect.
+        from utils.batch import load_thresholds, score_video  # imports mediapipe, so only on a miss
+        print(f"No cached landmarks for {video_path}, running pose estimation once...")
+        score_video(video_path, load_thresholds(), "results//tuning", model_complexity=model_complexity, cache_dir=cache_dir)
+        cached = cache.load(key)
+    return cached[0]
+
+def precompute_clip(landmarks):
+    """Turns a (T, 33, 4) landmark sequence into per-frame Python values ready for the counter.
+    Frames without a pose become None, exactly as analyze_landmarks skips them."""
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    valid = ~np.isnan(landmarks[:, 0, 0])
+    features = extract_features(np.nan_to_num(landmarks))
+    frames = []
+    for i, ok in enumerate(valid):
+        if not ok:
+            frames.append(None)
+            continue
+        frames.append((tuple(features["dynamic_angles"][i].tolist()),
+                       dict(zip(STATIC_JOINTS, features["joint_angles"][i].tolist())),
+                       float(features["wrist_dist"][i]),
+                       float(features["hull_area"][i])))
+    return frames
+
+def set_path(config, dotted_path, value):
+    node = config
+    keys = dotted_path.split(".")
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+    node[keys[-1]] = value
+
+def expand_search_space(base_config, space, samples=None, seed=0):
+    """`space` maps dotted threshold paths (e.g. "hammer_curl.male.wrist_distance") to candidate
+    values. Yields the full grid, or `samples` random points of it."""
+    paths = list(space)
+    value_lists = [space[p] for p in paths]
+    if samples:
+        rng = random.Random(seed)
+        combos = ([rng.choice(values) for values in value_lists] for _ in range(samples))
+    else:
+        combos = itertools.product(*value_lists)
+    for combo in combos:
+        config = copy.deepcopy(base_config)
+        for path, value in zip(paths, combo):
+            set_path(config, path, value)
+        yield dict(zip(paths, combo)), config
+
+def replay_clip(frames, thresholds, gender):
+    """Counts reps for one precomputed clip under a compiled ThresholdModel.
+    Returns (correct, raw, rep scores)."""
+    counter = RepetitionCounter(recent_scores=None)
+    correct = {}
+    for frame in frames:
+        if frame is None: continue
+        dynamic_angles, joint_angles, wrist_dist, hull_area = frame
+        counter.update_angles(*dynamic_angles)
+        exercise = counter.detect_exercise(thresholds)
+        gender_thresholds = thresholds.gender(exercise, gender)
+        _, _, completed, _ = counter.count_repetitions(dynamic_angles, wrist_dist, hull_area, thresholds, gender_thresholds, joint_angles, [], 0.0)
+        if completed and exercise in counter.raw_reps:
+            correct[exercise] = correct.get(exercise, 0) + 1
+    return correct, dict(counter.raw_reps), list(counter.all_scores)
+
+def evaluate_config(clips, config, target="correct"):
+    """Sum of absolute rep-count errors over all labelled clips and exercises."""
+    thresholds = compile_thresholds(config)
+    error = 0
+    details = {}
+    for video, (frames, gender, true_reps) in clips.items():
+        correct, raw, _ = replay_clip(frames, thresholds, gender)
+        predicted = correct if target == "correct" else raw
+        clip_error = sum(abs(predicted.get(ex, 0) - count) for ex, count in true_reps.items())
+        error += clip_error
+        details[video] = {"predicted": {ex: predicted.get(ex, 0) for ex in true_reps}, "error": clip_error}
+    return error, details
+
+_worker_clips = None
+
+def _init_worker(clips):
+    global _worker_clips
+    _worker_clips = clips
+
+def _evaluate_job(job):
+    params, config, target = job
+    try:
+        error, details = evaluate_config(_worker_clips, config, target)
+    except ValueError as e:
+        return {"error": float("inf"), "params": params, "invalid": str(e)}
+    return {"error": error, "params": params, "clips": details}
+
+def tune(clips, base_config, space, samples=None, workers=None, target="correct", seed=0):
+    """Evaluates every candidate in `space` across worker processes and returns results sorted
+    by total count error (ties keep search order)."""
+    jobs = [(params, config, target) for params, config in expand_search_space(base_config, space, samples, seed)]
+    workers = workers or os.cpu_count() or 1
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(clips,)) as pool:
+        results = list(pool.map(_evaluate_job, jobs, chunksize=max(1, len(jobs) // (workers * 8))))
+    return sorted(results, key=lambda r: r["error"])
@@ -1,27 +1,30 @@
-import cv2
 import csv
 import datetime
-import os
-import numpy as np
-from utils.functions import *
-from utils.feedback import *
-from utils.gui import *
-import mediapipe as mp
 import json
+import os
+import threading
 import time
-
-mp_drawing = mp.solutions.drawing_utils
+import cv2
+import numpy as np
+from utils.functions import feedback_text_items, score_text_items, highlight_problematic_keypoints
+from utils.analysis import analyze_frame, analyze_landmarks
+from utils.pipeline import FramePipeline, END_OF_STREAM, SOURCE_ERROR
+from utils.profiler import NULL_PROFILER
+from utils.panel import FeedbackPanel, FONT
+from utils.video_source import VideoSource
 
 class Logger:
     def __init__(self):
         self.log_file = None
+        self.path = None
         self.csv_writer = None
         self.start_time = None
         self.headers = []
 
-    def start(self):
+    def start(self, path=None):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        self.log_file = open(f"logs//log_{timestamp}.csv", "w", newline='')
+        self.path = path or f"logs//log_{timestamp}.csv"
+        self.log_file = open(self.path, "w", newline='')
         self.csv_writer = csv.writer(self.log_file)
         
         self.headers = [
@@ -34,10 +37,10 @@ class Logger:
         self.start_time = datetime.datetime.now()
         print("Started logging to CSV")
 
-    def log(self, exercise, raw_rep_count, correct_rep_count, gender, rep_summary):
+    def log(self, exercise, raw_rep_count, correct_rep_count, gender, rep_summary, timestamp=None):
         if not self.csv_writer: return
 
-        timestamp = (datetime.datetime.now() - self.start_time).total_seconds()
+        if timestamp is None: timestamp = (datetime.datetime.now() - self.start_time).total_seconds()
         
         scores = rep_summary.get('scores', {})
         hull_score = scores.get("Hull Score", "")
@@ -55,162 +58,264 @@ class Logger:
             hull_score, wrist_score, static_avg, dynamic_avg
         ])
 
-    def stop(self):
+    def stop(self, session=None):
+        """`session`: a SessionSummary whose aggregates are written next to the CSV as <name>_summary.json."""
         if self.log_file:
             self.log_file.close()
+            if session is not None and session.reps:
+                with open(os.path.splitext(self.path)[0] + "_summary.json", "w") as f:
+                    json.dump(session.export(), f, indent=2, default=float)
             self.log_file = None
             self.csv_writer = None
             print("Stopped logging")
 
-class Recorder:
-    def __init__(self):
-        self.video_writer = None
-        self.filename = None
-
-    def start(self, frame):
-        if frame is None or frame.shape[0] == 0 or frame.shape[1] == 0:
-            print("❌ Cannot start recording: invalid frame.")
-            return
-        height, width = frame.shape[:2]
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        self.filename = f"recordings//recording_{timestamp}.avi"
-        fourcc = cv2.VideoWriter_fourcc(*'MJPG')
-        self.video_writer = cv2.VideoWriter(self.filename, fourcc, 20.0, (width, height))
-        if not self.video_writer.isOpened():
-            print("❌ VideoWriter failed to open."); self.video_writer = None
-        else:
-            print(f"✅ Recording started: {self.filename}")
-
-    def record_frame(self, frame):
-        if self.video_writer and frame is not None:
-            self.video_writer.write(frame)
-
-    def stop(self):
-        if self.video_writer:
-            self.video_writer.release()
-            print(f"✅ Recording saved: {self.filename}")
-            self.video_writer = None
-
 def setup_directories():
     os.makedirs("logs", exist_ok=True)
     os.makedirs("recordings", exist_ok=True)
     
-def run_main_loop(gui, pose, mp_pose, counter, logger, recorder, reference_data, exercise_counters, webcam_url, default_webcam):
+def draw_landmarks_array(image, landmarks, connections, visibility_threshold=0.5):
+    """Draws a (33, 4) landmark array in the style of mp_drawing.draw_landmarks."""
+    h, w = image.shape[:2]
+    visible = landmarks[:, 3] >= visibility_threshold
+    points = np.floor(landmarks[:, :2] * (w, h)).astype(np.int32)
+    visible &= (points[:, 0] >= 0) & (points[:, 0] < w) & (points[:, 1] >= 0) & (points[:, 1] < h)
+    for start, end in connections:
+        if visible[start] and visible[end]:
+            cv2.line(image, tuple(points[start]), tuple(points[end]), (224, 224, 224), 2)
+    for x, y in points[visible]:
+        cv2.circle(image, (int(x), int(y)), 3, (224, 224, 224), 2)
+        cv2.circle(image, (int(x), int(y)), 2, (0, 0, 255), 2)
+
+def render_frame(image, analysis, last_rep_score, mp_pose, panel=None):
+    """Annotated camera frame plus feedback panel. With a FeedbackPanel, the panel is updated in
+    place and returned (the same array every frame); otherwise a new one is drawn."""
+    display_frame = image.copy()
+    lm = analysis.landmarks
+    items = feedback_text_items(analysis.feedback_lines) + score_text_items(last_rep_score) if lm is not None else []
+    if panel is not None:
+        feedback_frame = panel.render(items)
+    else:
+        feedback_frame = np.zeros_like(image)
+        for line, origin, scale, color in items:
+            cv2.putText(feedback_frame, line, origin, FONT, scale, color, 1)
+    if lm is not None:
+        if analysis.static_feedback:
+            highlight_problematic_keypoints(display_frame, lm, analysis.static_feedback, analysis.keypoints)
+        for idx in analysis.violations:
+            if idx < len(lm): cv2.circle(display_frame, (int(lm[idx, 0] * 640), int(lm[idx, 1] * 480)), 10, (0, 0, 255), -1)
+
+        scaled_points = (lm[:, :2] * (image.shape[1], image.shape[0])).astype(np.int32)
+        if len(scaled_points) >= 3:
+            hull = cv2.convexHull(scaled_points)
+            cv2.polylines(display_frame, [hull], True, (0, 255, 0), 2)
+
+        draw_landmarks_array(display_frame, lm, mp_pose.POSE_CONNECTIONS)
+    return display_frame, feedback_frame
+
+IDLE_POLL_MS = 30
+STOP_POLL_MS = 5
+THRESHOLD_POLL_MS = 1000
+
+def run_main_loop(gui, pose, mp_pose, counter, logger, recorder, thresholds, exercise_counters, webcam_url, default_webcam, landmark_cache=None, profiler=NULL_PROFILER, telemetry=None, keyframes=None, on_analysis=None, landmark_filter=None, session_file=None):
     last_rep_score = {}
-    cap = None
+    pipeline = None
     current_source = None
+    cached_landmarks = None
+    cache_lock = threading.Lock()
+    video_opened = 0  # bumped per video, so a late background lookup cannot apply to the next one
+    replay = None
+    stopping = None  # a stopped pipeline whose inference thread has not exited yet
+    black = np.zeros((480, 640, 3), dtype=np.uint8)
+    panel = FeedbackPanel()
+    if telemetry: from utils.telemetry import TIMED_STAGES
 
-    def loop():
-        nonlocal last_rep_score, cap, current_source
-        start_time = time.time()
-
-        # Video Source Management
-        source_changed = current_source != gui.source_type
-        if gui.is_running and (cap is None or not cap.isOpened() or source_changed):
-            if cap: cap.release()
-            if gui.source_type == 'video':
-                cap = cv2.VideoCapture(gui.video_path)
-                current_source = 'video'
-                if not gui.video_path or not cap.isOpened():
-                    print(f"Error opening video: {gui.video_path}"); gui.toggle()
+    # Connects, and reconnects after a drop, on its own thread; the IP camera is preferred every time.
+    def open_webcam():
+        return VideoSource([webcam_url, default_webcam], name="webcam")
+
+    def use_cached_landmarks(path, key, opened):
+        nonlocal cached_landmarks
+        cached = landmark_cache.load(key) if key else None
+        if not cached: return
+        with cache_lock:
+            if opened != video_opened: return
+            cached_landmarks = cached[0]
+        print(f"Using cached landmarks for {path}")
+
+    def hash_and_use_cached_landmarks(path, opened):
+        try:
+            key = landmark_cache.key(path)
+        except OSError as e:
+            print(f"Landmark cache lookup failed for {path}: {e}")
+            return
+        use_cached_landmarks(path, key, opened)
+
+    def open_video():
+        nonlocal video_opened
+        path = gui.video_path
+        cap = VideoSource(path, is_file=True, name="video") if path else None
+        if cap is None or not cap.isOpened():
+            print(f"Error opening video: {path}")
+            return cap
+        with cache_lock:
+            video_opened += 1
+            opened = video_opened
+        if landmark_cache:
+            key = landmark_cache.known_key(path)
+            if key:
+                use_cached_landmarks(path, key, opened)
             else:
-                cap = cv2.VideoCapture(webcam_url)
-                if not cap.isOpened():
-                    print(f"IP Cam failed. Trying default."); cap = cv2.VideoCapture(default_webcam)
-                    if not cap.isOpened(): print("Webcam failed."); gui.toggle()
-                current_source = 'webcam'
+                # A file not hashed before is read in full for its key; pose runs until the cached
+                # landmarks, if any, take over.
+                threading.Thread(target=hash_and_use_cached_landmarks, args=(path, opened), name="landmark-cache-key", daemon=True).start()
+        return cap
 
-        if not gui.is_running:
-            if cap: cap.release(); cap = None; current_source = None
-            if logger.log_file: logger.stop()
-            if recorder.video_writer: recorder.stop()
-            black = np.zeros((480, 640, 3), dtype=np.uint8)
-            gui.update_frames(black, black)
-            return gui.root.after(10, loop)
-
-        if not cap or not cap.isOpened(): return gui.root.after(10, loop)
-
-        ret, frame = cap.read()
-        if not ret:
-            if gui.source_type == 'video': print("Video finished."); gui.toggle(); gui.use_webcam()
-            return gui.root.after(10, loop)
-
-        image = cv2.resize(frame, (640, 480))
-        results = pose.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-
-        current_exercise, stage_r, stage_l, raw_reps = "-", "-", "-", 0
-        display_frame, feedback_frame = image.copy(), np.zeros_like(image)
-
-        if results.pose_landmarks:
-            lm = results.pose_landmarks.landmark
-            norm = normalize_by_least_squares(lm)
-
-            joint_angles = {
-                "knee_r": angle_from_ids(24, 26, 28, lm), "knee_l": angle_from_ids(23, 25, 27, lm),
-                "hip_r": angle_from_ids(12, 24, 26, lm), "hip_l": angle_from_ids(11, 23, 25, lm),
-                "shoulder_r": angle_from_ids(14, 12, 24, lm), "shoulder_l": angle_from_ids(13, 11, 23, lm),
-            }
-            elbow_r = calculate_angle((norm[12]), (norm[14]), (norm[16]))
-            shoulder_r = calculate_angle((norm[14]), (norm[12]), (norm[24]))
-            elbow_l = calculate_angle((norm[11]), (norm[13]), (norm[15]))
-            shoulder_l = calculate_angle((norm[13]), (norm[11]), (norm[23]))
-            
-            dynamic_angles = (elbow_r, elbow_l, shoulder_r, shoulder_l)
-            counter.update_angles(*dynamic_angles)
-            current_exercise = counter.detect_exercise(shoulder_r, shoulder_l, reference_data)
-            
-            gender_thresholds = reference_data.get(current_exercise, {}).get(gui.gender, {})
-            dynamic_thresholds = reference_data.get(current_exercise, {}).get("dynamic_angles", {})
-            static_tolerance = reference_data.get("global_config", {}).get("static_angle_tolerance", 12)
-
-            wrist_dist = compute_distance(norm[15], norm[16])
-            hull_area = compute_convex_hull_area(norm)
-
-            feedback_lines = generate_feedback(current_exercise, dynamic_angles, gender_thresholds, joint_angles, wrist_dist, hull_area, static_tolerance)
-            visual_dynamic, log_dynamic = get_dynamic_feedback_lines(current_exercise, dynamic_angles, dynamic_thresholds)
-            violations = check_dynamic_angle_violations(current_exercise, dynamic_angles, dynamic_thresholds)
-            
-            feedback_text_list = [item[0] if isinstance(item, tuple) else item for item in feedback_lines] + log_dynamic
-            
-            stage_r, stage_l, completed, rep_summary = counter.count_repetitions(dynamic_angles, wrist_dist, hull_area, reference_data, gender_thresholds, joint_angles, feedback_text_list, time.time() - start_time)
-            raw_reps = counter.get_raw_reps(current_exercise)
-
-            if rep_summary:
-                last_rep_score = rep_summary.get('scores', {})
-                if gui.is_logging:
-                    if not logger.log_file: logger.start()
-                    correct_reps = exercise_counters.get(current_exercise, 0) + (1 if completed else 0)
-                    logger.log(current_exercise, raw_reps, correct_reps, gui.gender, rep_summary)
-            
-            if completed and current_exercise in exercise_counters:
-                exercise_counters[current_exercise] += 1
-            
+    def open_replay():
+        nonlocal replay
+        from utils.replay import ReplayCapture
+        try:
+            replay = ReplayCapture(gui.video_path, gui.replay)
+        except (OSError, ValueError) as e:
+            print(f"Error opening session file: {e}")
+            return None
+        print(f"Replaying {gui.video_path} ({len(replay.reader)} frames)")
+        return replay
+
+    # Runs on the inference thread: everything that mutates counter, logger and recorder state.
+    # Clear Reps is requested from the GUI and applied here, on the thread that owns the counter
+    # (the inference thread, or the Tk thread while no pipeline runs).
+    def apply_reset():
+        if not gui.reset_requested: return
+        gui.reset_requested = False
+        counter.reset_reps()
+        for name in exercise_counters: exercise_counters[name] = 0
+
+    def process(image, frame_time, frame_index, captured_at):
+        apply_reset()
+        analysis = analyze_and_record(image, frame_time, frame_index, captured_at)
+        if telemetry: telemetry.record(frame_index, captured_at, frame_time, analysis, counter, profiler.last_ms(TIMED_STAGES))
+        # Frames without a pose are kept too, so the session file has the real timeline.
+        if session_file:
+            if gui.is_logging:
+                if not session_file.is_recording:
+                    session_file.start({"gender": gui.gender, "source": gui.video_path or "webcam", "size": image.shape[1::-1],
+                                        "landmark_filter": landmark_filter is not None})
+                session_file.record(frame_index, captured_at, frame_time, analysis, image)
+            elif session_file.is_recording: session_file.stop()
+        return analysis
+
+    def analyze_and_record(image, frame_time, frame_index, captured_at):
+        if replay is not None:
+            # Recorded landmarks, frame times and gender, so the counter sees what it saw live.
+            landmarks, recorded_time = replay.frame(frame_index)
+            analysis = analyze_landmarks(landmarks, counter, thresholds.model, replay.gender or gui.gender, recorded_time or frame_time, profiler,
+                                         None if replay.filtered else landmark_filter)
+        elif (cached := cached_landmarks) is not None and frame_index < len(cached):
+            analysis = analyze_landmarks(cached[frame_index], counter, thresholds.model, gui.gender, frame_time, profiler, landmark_filter)
+        elif keyframes:
+            landmarks = keyframes.estimate(image, counter, thresholds.model)
+            analysis = analyze_landmarks(landmarks, counter, thresholds.model, gui.gender, frame_time, profiler, landmark_filter)
+        else:
+            analysis = analyze_frame(image, pose, counter, thresholds.model, gui.gender, frame_time, profiler, landmark_filter)
+        if analysis.landmarks is None: return analysis
+
+        if analysis.rep_summary and gui.is_logging:
+            with profiler.stage("logger"):
+                if not logger.log_file: logger.start()
+                correct_reps = exercise_counters.get(analysis.current_exercise, 0) + (1 if analysis.completed else 0)
+                logger.log(analysis.current_exercise, analysis.raw_reps, correct_reps, gui.gender, analysis.rep_summary)
+
+        if analysis.completed and analysis.current_exercise in exercise_counters:
+            exercise_counters[analysis.current_exercise] += 1
+
+        with profiler.stage("recorder"):
             if gui.is_logging:
-                if not recorder.video_writer: recorder.start(display_frame)
-                recorder.record_frame(image)
-            elif recorder.video_writer: recorder.stop()
-
-            # Drawing and Display
-            insert_idx = next((i + 1 for i, item in enumerate(feedback_lines) if "Wrist Distance" in (item[0] if isinstance(item, tuple) else item)), len(feedback_lines))
-            feedback_lines[insert_idx:insert_idx] = visual_dynamic
-            
-            if gender_thresholds:
-                feedback = check_static_angles(joint_angles, gender_thresholds.get("static_angles", {}), static_tolerance)
-                highlight_problematic_keypoints(display_frame, results.pose_landmarks, feedback, current_exercise)
-            for idx in violations:
-                if idx < len(lm): cv2.circle(display_frame, (int(lm[idx].x * 640), int(lm[idx].y * 480)), 10, (0, 0, 255), -1)
-
-            display_feedback_with_colors(feedback_frame, feedback_lines)
-            display_scores_on_frame(feedback_frame, last_rep_score)
-
-            scaled_points = np.array([ (int(p.x * image.shape[1]), int(p.y * image.shape[0])) for p in lm ], dtype=np.int32)
-            if len(scaled_points) >= 3:
-                hull = cv2.convexHull(scaled_points)
-                cv2.polylines(display_frame, [hull], True, (0, 255, 0), 2)
-
-        mp_drawing.draw_landmarks(display_frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-        gui.update_frames(display_frame, feedback_frame)
-        gui.update_info(current_exercise, exercise_counters["hammer_curl"], exercise_counters["overhead_press"], stage_r, stage_l, raw_reps)
-        gui.root.after(10, loop)
-
-    loop()
\ No newline at end of file
+                if not recorder.is_recording: recorder.start(image, pipeline.fps if pipeline else None)
+                recorder.record_frame(image, captured_at)
+            elif recorder.is_recording: recorder.stop()
+        return analysis
+
+    # Stopping only signals the pipeline, so the Tk thread (or the service's event loop) never waits
+    # on a frame in flight. The inference thread's state (counter, filters, recorders) is cleaned up
+    # by finish_stop once that thread has exited, and no new pipeline starts before then.
+    def stop_pipeline():
+        nonlocal pipeline, current_source, stopping, video_opened
+        pipeline.stop()
+        stopping = pipeline
+        pipeline = None; current_source = None
+        with cache_lock:
+            video_opened += 1
+        gui.update_frames(black, black)
+        panel.invalidate()
+
+    def finish_stop():
+        nonlocal stopping, cached_landmarks, replay
+        if isinstance(stopping.source, VideoSource): print(f"Source: {stopping.source.stats()}")
+        stopping = None; replay = None
+        with cache_lock:
+            cached_landmarks = None
+        if keyframes: keyframes.reset()
+        if landmark_filter: landmark_filter.reset()
+        if logger.log_file: logger.stop(counter.session)
+        if recorder.is_recording: recorder.stop()
+        if session_file and session_file.is_recording: session_file.stop()
+
+    def loop():
+        nonlocal last_rep_score, pipeline, current_source
+        started = time.perf_counter()
+
+        if pipeline and (not gui.is_running or current_source != gui.source_type): stop_pipeline()
+        if stopping:
+            if not stopping.stopped: return gui.root.after(STOP_POLL_MS, loop)
+            finish_stop()
+
+        if not gui.is_running:
+            apply_reset()
+            return gui.root.after(IDLE_POLL_MS, loop)
+
+        if pipeline is None:
+            open_source = {'video': open_video, 'replay': open_replay}.get(gui.source_type, open_webcam)
+            pipeline = FramePipeline(open_source, process, is_file=open_source is not open_webcam, profiler=profiler).start()
+            current_source = gui.source_type
+
+        item = pipeline.results.get_nowait()
+        if item is END_OF_STREAM:
+            print("Video finished."); gui.toggle(); gui.use_webcam()
+        elif item is SOURCE_ERROR:
+            gui.toggle()
+        elif item is not None:
+            captured_at, image, analysis = item
+            if analysis.rep_summary: last_rep_score = analysis.rep_summary.get('scores', {})
+            with profiler.stage("drawing"):
+                display_frame, feedback_frame = render_frame(image, analysis, last_rep_score, mp_pose, panel)
+                overlay_frame = profiler.draw_overlay(feedback_frame)
+            with profiler.stage("display"):
+                # An unchanged panel is already on screen.
+                gui.update_frames(display_frame, overlay_frame if panel.changed or overlay_frame is not feedback_frame else None)
+                gui.update_info(analysis.current_exercise, exercise_counters, analysis.stage_r, analysis.stage_l, analysis.raw_reps)
+            # Capture to on-screen, across all three threads.
+            profiler.record("glass_to_glass", int(captured_at * 1e9), time.perf_counter_ns())
+            if on_analysis: on_analysis(analysis)
+
+        # Wake up again when the next source frame should be ready rather than on a fixed poll;
+        # while waiting for a result, poll at a fraction of the frame period.
+        period_ms = pipeline.frame_period * 1000 if pipeline else IDLE_POLL_MS
+        if item is None or not pipeline:
+            delay = period_ms / 4
+        else:
+            delay = period_ms - (time.perf_counter() - started) * 1000 - period_ms / 4
+        gui.root.after(max(1, int(delay)), loop)
+
+    # thresholds.json may be edited mid-session; a valid new version replaces the model in place.
+    def watch_thresholds():
+        thresholds.reload_if_changed()
+        gui.root.after(THRESHOLD_POLL_MS, watch_thresholds)
+
+    # Lets a front end that shuts down (serve.py) wait until the inference thread is done.
+    def idle():
+        return pipeline is None and stopping is None
+
+    gui.update_frames(black, black)
+    loop()
+    watch_thresholds()
+    return idle
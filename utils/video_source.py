@@ -0,0 +1,168 @@
+import threading
+import time
+import cv2
+
+# Video sources read on their own thread. A live source (camera index or stream URL) keeps only the
+# newest frame and its capture time, so a consumer that falls behind never reads stale frames out of
+# a buffer, and it (re)connects with exponential backoff on that thread: a camera that is down never
+# blocks the caller. A file source hands over every frame in order instead. VideoSource stands in
+# for cv2.VideoCapture wherever FramePipeline or the stations engine open one. HTTP MJPEG streams
+# are read with MJPEGReader: each JPEG stays encoded until read() hands it out (or, through
+# read_encoded(), until the consumer actually uses it), so replaced frames are never decoded, and it
+# is decoded at a reduced scale when the stream is larger than the processing size.
+
+OPEN_TIMEOUT_MS = 5000
+READ_TIMEOUT_MS = 2000
+BACKOFF = (0.5, 8.0)  # first and longest wait between connection attempts, seconds
+
+def open_capture(source, size=(640, 480), open_timeout_ms=OPEN_TIMEOUT_MS, read_timeout_ms=READ_TIMEOUT_MS):
+    """Capture for a camera index (int or digit string), stream URL or file. HTTP MJPEG streams get
+    an MJPEGReader, other streams FFmpeg; both with connect and read timeouts instead of FFmpeg's
+    default of about 30 s."""
+    if isinstance(source, str) and source.isdigit(): source = int(source)
+    if isinstance(source, str) and source.startswith(("http://", "https://")):
+        from utils.mjpeg import MJPEGReader  # http.client and ssl are only needed for streams
+        reader = MJPEGReader(source, size, open_timeout_ms / 1000, read_timeout_ms / 1000)
+        if reader.isOpened() or not reader.reachable: return reader
+    if isinstance(source, str) and "://" in source:
+        return cv2.VideoCapture(source, cv2.CAP_FFMPEG, [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, open_timeout_ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, read_timeout_ms])
+    return cv2.VideoCapture(source)
+
+class VideoSource:
+    """`sources`: one source or a list tried in order on every connection attempt (e.g. an IP camera
+    with the built-in webcam as fallback). Counters: grabbed, delivered and dropped frames (newer
+    frame arrived before the old one was read), connects and failed_attempts; `staleness` is the
+    time since the newest frame was grabbed. `size` is the resolution the frames are processed at."""
+    def __init__(self, sources, is_file=False, loop=False, backoff=BACKOFF, name="source", size=(640, 480)):
+        self.sources = list(sources) if isinstance(sources, (list, tuple)) else [sources]
+        self.is_file = is_file
+        self.loop = loop
+        self.backoff = backoff
+        self.name = name
+        self.size = size
+        self.finished = False
+        self.connected = None    # the source currently delivering
+        self.fps = 0.0
+        self.captured_at = None  # capture time of the frame last returned by read()
+        self.grabbed = self.delivered = self.dropped = 0
+        self.connects = self.failed_attempts = 0
+        self.last_grab = None
+        self._frame = None       # (frame or encoded JPEG, captured_at, decoder) not read yet
+        self._ended = False
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._cap = None
+        # Opening a file is quick and its failure is final, so it is reported straight away.
+        if is_file and self._connect() is None:
+            self.finished = True
+            return
+        self._thread = threading.Thread(target=self._run, name=f"{name}-reader", daemon=True)
+        self._thread.start()
+
+    def isOpened(self):
+        return not (self.is_file and self._cap is None)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS: return self.fps
+        return 0.0
+
+    @property
+    def staleness(self):
+        return time.perf_counter() - self.last_grab if self.last_grab is not None else float("inf")
+
+    def stats(self):
+        return {"source": self.connected, "grabbed": self.grabbed, "delivered": self.delivered, "dropped": self.dropped,
+                "reconnects": max(0, self.connects - 1), "failed_attempts": self.failed_attempts, "staleness_s": round(self.staleness, 3),
+                "decode_scale": getattr(self._cap, "scale", 1)}
+
+    def read(self, timeout=0.1):
+        """(True, newest frame) or (False, None) if no new frame arrived within `timeout`."""
+        ret, frame, decode = self.read_encoded(timeout)
+        if ret and decode is not None:
+            frame = decode(frame)
+            if frame is None: return False, None
+        return ret, frame
+
+    def read_encoded(self, timeout=0.1):
+        """Like read(), but a frame that is still encoded comes back with the function that decodes
+        it, so a consumer can put off decoding until it knows it will use the frame. (ret, frame,
+        decode), with decode None if the frame is an image already."""
+        with self._cond:
+            if self._frame is None and not self._ended: self._cond.wait(timeout)
+            if self._frame is None:
+                if self._ended: self.finished = True
+                return False, None, None
+            frame, self.captured_at, decode = self._frame
+            self._frame = None
+            self.delivered += 1
+            self._cond.notify_all()
+        return True, frame, decode
+
+    def release(self):
+        self._stop.set()
+        with self._cond: self._cond.notify_all()
+
+    def _connect(self):
+        for source in self.sources:
+            if self._stop.is_set(): return None
+            cap = open_capture(source, self.size)
+            if cap.isOpened():
+                fps = cap.get(cv2.CAP_PROP_FPS)
+                if 1.0 <= fps <= 240.0: self.fps = fps
+                self.connects += 1
+                self.connected = source
+                if not self.is_file: print(f"✅ {self.name}: connected to {source}")
+                self._cap = cap
+                return cap
+            cap.release()
+            self.failed_attempts += 1
+            print(f"❌ {self.name}: cannot open {source}")
+        return None
+
+    def _run(self):
+        wait = 0.0
+        try:
+            while not self._stop.is_set():
+                if self._cap is None:
+                    if wait and self._stop.wait(wait): break
+                    if self._connect() is None:
+                        wait = min(max(wait * 2, self.backoff[0]), self.backoff[1])
+                        continue
+                decode = getattr(self._cap, "decode", None)
+                if decode is not None:
+                    ret = self._cap.grab()
+                    frame = self._cap.jpeg
+                else:
+                    ret, frame = self._cap.read()
+                if not ret:
+                    if self.is_file:
+                        if self.loop and self.grabbed:
+                            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                            continue
+                        break
+                    if self._stop.is_set(): break
+                    print(f"❌ {self.name}: lost {self.connected}, reconnecting")
+                    self._cap.release()
+                    self._cap, self.connected = None, None
+                    # Whatever arrived before the drop is stale by the time the stream is back.
+                    with self._cond:
+                        if self._frame is not None: self.dropped += 1
+                        self._frame = None
+                    wait = min(max(wait * 2, self.backoff[0]), self.backoff[1])
+                    continue
+                captured_at = time.perf_counter()
+                wait = 0.0
+                with self._cond:
+                    # A file waits for its reader; a live source replaces the unread frame.
+                    while self.is_file and self._frame is not None and not self._stop.is_set():
+                        self._cond.wait(0.1)
+                    if self._frame is not None: self.dropped += 1
+                    self._frame = (frame, captured_at, decode)
+                    self.grabbed += 1
+                    self.last_grab = captured_at
+                    self._cond.notify_all()
+        finally:
+            if self._cap is not None: self._cap.release()
+            with self._cond:
+                self._ended = True
+                self._cond.notify_all()